@@ -0,0 +1,284 @@
+import glob
+import heapq
+import re
+from os import path
+
+from .ErrorType import FileNotExistError
+from .Loader import JConfigLoader
+
+
+class Analyzer:
+    '''
+    static analysis of the whole config tree, built from config files alone (nothing is
+    resolved or prompted). every candidate of a $VAR path (existing directory matching the
+    path with $VAR as wildcard) is followed, so that all variants of the tree are covered.
+
+    symbols (items) and configs form a dependency graph, each depends on the variables of
+    its depend, the variables of its $VAR path and the config containing it. the analysis reports
+    cycle        symbols / configs depending on themselves through the graph
+    dangling     depend (or $VAR path) on a variable no item defines
+    duplicate    symbol defined more than once within the same variant of the tree
+    dead path    child config whose path (or every candidate of it) doesn't exist
+    invalid      config file which can't be decoded, or node without type
+    and gives a topological order of the graph, which Resolver can take as order to
+    resolve every item after what it depends on
+    '''
+
+    ITEM_TYPES = ('enum', 'bool', 'int', 'hex', 'string', 'tristate')
+    _PATH_VAR = re.compile(r'\$([^/$]*)')
+
+    @staticmethod
+    def get_candidates(base_dir, config_path):
+        '''
+        existing config files config_path may resolve to, with every $VAR taken as wildcard
+        '''
+        if '$' not in config_path:
+            config_file = path.abspath(path.join(base_dir, config_path))
+            return [config_file] if path.exists(config_file) else []
+        pattern = Analyzer._PATH_VAR.sub('*', config_path)
+        return sorted(path.abspath(config_file) for config_file in glob.glob(path.join(base_dir, pattern))
+                      if path.isfile(config_file))
+
+    def add_node(self, name, deps, origin):
+        '''
+        origin is (config file, name) of the node, for the report
+        '''
+        node_deps = self._deps.get(name)
+        if node_deps is None:
+            node_deps = {}
+            self._deps.update({name: node_deps})
+        for dep in deps:
+            node_deps[dep] = origin
+
+    def visit(self, config_file, container, context, stack):
+        if config_file in stack:
+            self._cycles.append([self.get_key(f) for f in stack[stack.index(config_file):]] +
+                                [self.get_key(config_file)])
+            return
+        if config_file in self._visited:
+            return
+        self._visited.add(config_file)
+        try:
+            config_json = self._loader.load(config_file)
+        except ValueError as err:
+            self._invalid.append((config_file, str(err)))
+            return
+        base_dir = path.dirname(config_file)
+        for name in config_json:
+            node = config_json[name]
+            if not isinstance(node, dict) or not isinstance(node.get('type'), str):
+                self._invalid.append((config_file, '{} has no type'.format(name)))
+                continue
+            node_type = node['type']
+            deps = list(node.get('depend', {}))
+            if container is not None:
+                deps.append(container)
+            if any(item_type in node_type for item_type in Analyzer.ITEM_TYPES):
+                self._symbols.setdefault(name, []).append((config_file, context))
+                self.add_node(name, deps, (config_file, name))
+            elif 'config' in node_type:
+                config_path = node.get('path', '')
+                path_vars = Analyzer._PATH_VAR.findall(config_path)
+                # names of configs are not variables and need not be unique, config is known by its node
+                config_node = (config_file, name)
+                self.add_node(config_node, deps + path_vars, config_node)
+                candidates = Analyzer.get_candidates(base_dir, config_path)
+                if len(candidates) == 0:
+                    self._dead.append((config_file, name, config_path))
+                for candidate in candidates:
+                    # childs of different candidates of the same $VAR path are alternatives
+                    sub_context = context + (((config_file, name), candidate),) if len(path_vars) > 0 else context
+                    self.visit(candidate, config_node, sub_context, stack + [config_file])
+
+    @staticmethod
+    def is_compatible(context, other):
+        '''
+        whether both contexts can be selected at once (no $VAR path takes different candidates)
+        '''
+        choices = dict(context)
+        return all(choices.get(reference, candidate) == candidate for reference, candidate in other)
+
+    def find_duplicates(self):
+        for name, definitions in self._symbols.items():
+            files = []
+            for idx, (config_file, context) in enumerate(definitions):
+                if any(Analyzer.is_compatible(context, other) for _, other in definitions[:idx]):
+                    files.append(config_file)
+            if len(files) > 0:
+                self._duplicates.append((name, [definitions[0][0]] + files))
+
+    def find_dangling(self):
+        for name, deps in self._deps.items():
+            for dep, origin in deps.items():
+                if dep not in self._deps:
+                    self._dangling.append(origin + (dep,))
+
+    def find_cycles(self):
+        '''
+        strongly connected components of the graph (iterative Tarjan), which have more
+        than one node or a node depending on itself
+        '''
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        for root in self._deps:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self._deps[root]))]
+            while len(work) > 0:
+                node, deps = work[-1]
+                for dep in deps:
+                    if dep not in self._deps:
+                        continue
+                    if dep not in index:
+                        index[dep] = low[dep] = len(index)
+                        stack.append(dep)
+                        on_stack.add(dep)
+                        work.append((dep, iter(self._deps[dep])))
+                        break
+                    if dep in on_stack:
+                        low[node] = min(low[node], index[dep])
+                else:
+                    work.pop()
+                    if len(work) > 0:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] != index[node]:
+                        continue
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in self._deps[node]:
+                        component.reverse()
+                        self._cycles.append([self.get_label(member) for member in component + [component[0]]])
+
+    def sort(self):
+        '''
+        topological order of the graph, ties are broken by order of definition (tree order).
+        nodes in (or depending on) a cycle are left out
+        '''
+        seq = {name: idx for idx, name in enumerate(self._deps)}
+        pending = {}
+        dependants = {}
+        for name, deps in self._deps.items():
+            known = [dep for dep in deps if dep in self._deps and dep != name]
+            pending[name] = len(known)
+            for dep in known:
+                dependants.setdefault(dep, []).append(name)
+            if name in deps:
+                pending[name] += 1
+        ready = [(seq[name], name) for name in self._deps if pending[name] == 0]
+        heapq.heapify(ready)
+        while len(ready) > 0:
+            _, name = heapq.heappop(ready)
+            self._order.append(name)
+            for dependant in dependants.get(name, []):
+                pending[dependant] -= 1
+                if pending[dependant] == 0:
+                    heapq.heappush(ready, (seq[dependant], dependant))
+
+    def run(self):
+        self.visit(self._root_file, None, (), [])
+        self.find_cycles()
+        self.find_dangling()
+        self.find_duplicates()
+        self.sort()
+        return self
+
+    def get_key(self, config_file):
+        return path.relpath(config_file, self._root_dir)
+
+    def get_cycles(self):
+        return list(self._cycles)
+
+    def get_dangling(self):
+        '''
+        [(config file, name, undefined variable)]
+        '''
+        return list(self._dangling)
+
+    def get_duplicates(self):
+        '''
+        [(name, [config files])]
+        '''
+        return list(self._duplicates)
+
+    def get_dead_paths(self):
+        '''
+        [(config file, name, path)]
+        '''
+        return list(self._dead)
+
+    def get_invalid(self):
+        '''
+        [(config file, error)]
+        '''
+        return list(self._invalid)
+
+    def get_label(self, node):
+        if isinstance(node, tuple):
+            return '{0} ({1})'.format(node[1], self.get_key(node[0]))
+        return node
+
+    def get_order(self):
+        '''
+        symbols in topological order
+        '''
+        return [name for name in self._order if not isinstance(name, tuple)]
+
+    def get_ranks(self):
+        '''
+        {symbol: position in topological order}, to be given to Resolver as order
+        '''
+        return {name: rank for rank, name in enumerate(self.get_order())}
+
+    def get_files(self):
+        return sorted(self._visited)
+
+    def has_errors(self):
+        return len(self._cycles) + len(self._dangling) + len(self._duplicates) + len(self._dead) + \
+            len(self._invalid) > 0
+
+    def report(self):
+        report_str = 'Analysis of {0} : {1} config file(s), {2} symbol(s)\n'.format(
+            self._root_file, len(self._visited), len(self._symbols))
+        for cycle in self._cycles:
+            report_str += 'cycle : {}\n'.format(' -> '.join(cycle))
+        for config_file, name, var in self._dangling:
+            report_str += 'dangling : {0} in {1} depends on undefined {2}\n'.format(name, self.get_key(config_file),
+                                                                                   var)
+        for name, files in self._duplicates:
+            report_str += 'duplicate : {0} defined in {1}\n'.format(name, ', '.join(self.get_key(f) for f in files))
+        for config_file, name, config_path in self._dead:
+            report_str += 'dead path : {0} in {1} -> {2}\n'.format(name, self.get_key(config_file), config_path)
+        for config_file, err in self._invalid:
+            report_str += 'invalid : {0} : {1}\n'.format(self.get_key(config_file), err)
+        if not self.has_errors():
+            report_str += 'no problem found\n'
+        return report_str
+
+    def __init__(self, config_file, loader=None):
+        self._root_file = path.abspath(config_file)
+        if not path.exists(self._root_file):
+            raise FileNotExistError(config_file)
+        self._root_dir = path.dirname(self._root_file)
+        self._loader = loader if loader is not None else JConfigLoader()
+        # name -> [(config file, context)]
+        self._symbols = {}
+        # symbol or (config file, name) of config -> {dependency: origin}, in order of definition
+        self._deps = {}
+        self._visited = set()
+        self._cycles = []
+        self._dangling = []
+        self._duplicates = []
+        self._dead = []
+        self._invalid = []
+        self._order = []
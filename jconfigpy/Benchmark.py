@@ -0,0 +1,262 @@
+import io
+import json
+import platform
+import random
+import time
+from os import path
+import os
+
+from .Config import JConfig
+from .Resolver import Resolver
+from .SavedConfig import SavedConfigReader
+from .VariableMonitor import Monitor
+from .Writer import ConfigWriter
+
+
+class TreeGenerator:
+    '''
+    write a synthetic config tree into a directory, to measure how jconfigpy scales.
+    every config file has items of randomly mixed types, a recipe and fanout child configs
+    down to depth. depend, $VAR paths and gen-lists are given to the ratio of items (or childs)
+    given. the same parameters & seed always generate the same tree
+    '''
+
+    DEFAULT_TYPES = {'bool': 4, 'int': 2, 'hex': 1, 'string': 1, 'enum': 1, 'tristate': 1}
+    CONFIG_FILE = 'config.json'
+    RECIPE_FILE = 'recipe.mk'
+    VALUES_FILE = 'saved.config'
+
+    def get_params(self):
+        return {'depth': self._depth, 'fanout': self._fanout, 'items': self._items, 'types': dict(self._types),
+                'depend': self._depend, 'var_path': self._var_path, 'genlist': self._genlist, 'seed': self._seed}
+
+    def get_stats(self):
+        return dict(self._stats)
+
+    def get_path_vars(self):
+        '''
+        variables of $VAR paths with the values selecting generated childs
+        '''
+        return dict(self._path_vars)
+
+    def make_depend(self, bools):
+        count = 2 if len(bools) > 1 and self._rng.random() < 0.3 else 1
+        self._stats['depends'] += count
+        return {name: 'y' for name in self._rng.sample(bools, count)}
+
+    def make_item(self, name, item_type, bools):
+        rng = self._rng
+        spec = {'type': item_type, 'prompt': 'synthetic {0} {1}'.format(item_type, name),
+                'help': ['generated by TreeGenerator']}
+        if item_type == 'bool':
+            spec.update({'default': 'y' if rng.random() < 0.8 else 'n'})
+        elif item_type == 'tristate':
+            spec.update({'default': rng.choice(('y', 'm', 'n'))})
+        elif item_type == 'int':
+            spec.update({'default': rng.randrange(1 << 16), 'range': [0, 1 << 16]})
+            if rng.random() < self._genlist:
+                spec.update({'gen-list': {'{}_X4'.format(name): 'this * 4'}})
+                self._stats['genlists'] += 1
+        elif item_type == 'hex':
+            spec.update({'default': hex(rng.randrange(1 << 24)), 'range': ['0x0', '0xffffff']})
+        elif item_type == 'string':
+            spec.update({'default': 'str_{}'.format(name.lower())})
+        elif item_type == 'enum':
+            spec.update({'default': 0, 'enum': ['OPT_A', 'OPT_B', 'OPT_C']})
+        if len(bools) > 0 and rng.random() < self._depend:
+            spec.update({'depend': self.make_depend(bools)})
+        return spec
+
+    def make_value(self, spec):
+        '''
+        value of the item in saved configuration, None to leave it to default
+        '''
+        rng = self._rng
+        if rng.random() < 0.5:
+            return None
+        if spec['type'] == 'bool':
+            return rng.choice(('y', 'n'))
+        if spec['type'] == 'int':
+            return str(rng.randrange(spec['range'][1]))
+        if spec['type'] == 'enum':
+            return rng.choice(spec['enum'])
+        return None
+
+    def write_config(self, config_dir, level, bools, values):
+        node = self._stats['configs']
+        self._stats['configs'] += 1
+        os.makedirs(config_dir, exist_ok=True)
+        types = list(self._types)
+        weights = [self._types[t] for t in types]
+        config_json = {}
+        bools = list(bools)
+        for idx in range(self._items):
+            name = 'N{0}_I{1}'.format(node, idx)
+            spec = self.make_item(name, self._rng.choices(types, weights)[0], bools)
+            config_json.update({name: spec})
+            val = self.make_value(spec)
+            if val is not None:
+                values.update({name: val})
+            if spec['type'] == 'bool':
+                bools.append(name)
+        self._stats['items'] += self._items
+        config_json.update({'N{}_RECIPE'.format(node): {'type': 'recipe', 'path': './' + self.RECIPE_FILE}})
+        with open(path.join(config_dir, self.RECIPE_FILE), 'w') as fp:
+            fp.write('# recipe of synthetic config {}\n'.format(node))
+        if level < self._depth:
+            for idx in range(self._fanout):
+                child_dir = 'c{}'.format(idx)
+                child_path = './{0}/{1}'.format(child_dir, self.CONFIG_FILE)
+                if self._rng.random() < self._var_path:
+                    var = 'N{0}_SEL{1}'.format(node, idx)
+                    config_json.update({var: {'type': 'string', 'default': child_dir}})
+                    self._path_vars.update({var: child_dir})
+                    child_path = './${0}/{1}'.format(var, self.CONFIG_FILE)
+                    self._stats['var_paths'] += 1
+                child_spec = {'type': 'config', 'path': child_path}
+                if len(bools) > 0 and self._rng.random() < self._depend:
+                    child_spec.update({'depend': self.make_depend(bools)})
+                config_json.update({'N{0}_CHILD{1}'.format(node, idx): child_spec})
+                self.write_config(path.join(config_dir, child_dir), level + 1, bools, values)
+        with open(path.join(config_dir, self.CONFIG_FILE), 'w') as fp:
+            json.dump(config_json, fp, indent=2)
+
+    def generate(self, out_dir):
+        '''
+        write the tree into out_dir, returns (root config file, saved configuration file)
+        '''
+        self._rng = random.Random(self._seed)
+        self._stats = {'configs': 0, 'items': 0, 'depends': 0, 'var_paths': 0, 'genlists': 0}
+        self._path_vars = {}
+        values = {}
+        self.write_config(out_dir, 0, [], values)
+        values_file = path.join(out_dir, self.VALUES_FILE)
+        with open(values_file, 'w') as fp:
+            for name in values:
+                fp.write('CONFIG_{0}={1}\n'.format(name, values[name]))
+        return path.join(out_dir, self.CONFIG_FILE), values_file
+
+    def __init__(self, depth=3, fanout=3, items=20, types=None, depend=0.3, var_path=0.1, genlist=0.1, seed=0):
+        if depth < 0 or fanout < 0 or items < 0:
+            raise ValueError('depth, fanout and items should not be negative')
+        self._depth = depth
+        self._fanout = fanout
+        self._items = items
+        self._types = types if types is not None else dict(TreeGenerator.DEFAULT_TYPES)
+        unknown = [t for t in self._types if t not in TreeGenerator.DEFAULT_TYPES]
+        if len(unknown) > 0:
+            raise ValueError('unknown item types : {}'.format(unknown))
+        self._depend = depend
+        self._var_path = var_path
+        self._genlist = genlist
+        self._seed = seed
+        self._rng = None
+        self._stats = {}
+        self._path_vars = {}
+
+
+class Benchmark:
+    '''
+    time each phase of jconfigpy separately on a config tree (e.g. one from TreeGenerator)
+
+    parse       build the tree and parse every config file of it (no value is resolved, $VAR
+                paths take saved values and path_vars, configs of missing files are skipped)
+    propagate   toggle every variable something depends on, through Monitor of the parsed tree
+    resolve     resolve a new tree from saved configuration (as -s -n does)
+    emit        write .config & autogen.h (recipes and gen-lists) of the resolved tree into memory
+
+    each phase is repeated and every run is kept in the result, which is plain JSON
+    so that results of different runs (or revisions) can be compared by compare()
+    '''
+
+    PHASES = ('parse', 'propagate', 'resolve', 'emit')
+    _VERSION = 1
+
+    @staticmethod
+    def summary(runs):
+        ordered = sorted(runs)
+        return {'min': ordered[0], 'median': ordered[len(ordered) // 2], 'mean': sum(runs) / len(runs),
+                'runs': runs}
+
+    @staticmethod
+    def compare(base, result):
+        '''
+        ratio of min time of each phase in result to the one in base (> 1 is slower)
+        '''
+        ratios = {}
+        for phase in result['phases']:
+            if phase in base.get('phases', {}) and base['phases'][phase]['min'] > 0:
+                ratios.update({phase: result['phases'][phase]['min'] / base['phases'][phase]['min']})
+        return ratios
+
+    def parse_tree(self):
+        with Monitor.scope() as monitor:
+            var_map = dict(self._values)
+            var_map.update(self._path_vars)
+            monitor.notify_variables(var_map)
+            root = JConfig(jconfig_file=self._config_file, root_dir=self._root_dir)
+        for config in root.walk():
+            if path.exists(config.get_resolved_file()):
+                config.parse()
+        return root
+
+    def run_parse(self):
+        start = time.perf_counter()
+        self.parse_tree()
+        return time.perf_counter() - start
+
+    def run_propagate(self):
+        root = self.parse_tree()
+        monitor = root.get_monitor()
+        names = set()
+        for config in root.walk():
+            names.update(config.get_depend())
+            for item in config.get_items():
+                names.update(item.get_depend())
+        start = time.perf_counter()
+        for name in names:
+            monitor.notify_variable_change(name, 'n')
+            monitor.notify_variable_change(name, 'y')
+        return time.perf_counter() - start
+
+    def resolve_tree(self):
+        with Monitor.scope():
+            root = JConfig(jconfig_file=self._config_file, root_dir=self._root_dir, lazy=True)
+        Resolver(dict(self._values)).resolve(root)
+        return root
+
+    def run_resolve(self):
+        start = time.perf_counter()
+        self.resolve_tree()
+        return time.perf_counter() - start
+
+    def run_emit(self):
+        root = self.resolve_tree()
+        start = time.perf_counter()
+        ConfigWriter(root).write(io.StringIO(), io.StringIO())
+        return time.perf_counter() - start
+
+    def run(self, repeat=5, phases=PHASES):
+        '''
+        returns result of the benchmark, {phase: {min, median, mean, runs}} under 'phases'
+        '''
+        if repeat < 1:
+            raise ValueError('repeat should be larger than 0')
+        result = {}
+        for phase in phases:
+            if phase not in Benchmark.PHASES:
+                raise ValueError('unknown phase : {}'.format(phase))
+            runner = getattr(self, 'run_' + phase)
+            result.update({phase: Benchmark.summary([runner() for _ in range(repeat)])})
+        return {'version': Benchmark._VERSION, 'python': platform.python_version(), 'repeat': repeat,
+                'phases': result}
+
+    def __init__(self, config_file, values_file=None, path_vars=None, root_dir=None):
+        '''
+        path_vars gives values of $VAR paths (not in values_file) for the parse phase,
+        which resolves nothing itself
+        '''
+        self._config_file = path.abspath(config_file)
+        self._root_dir = root_dir if root_dir is not None else path.dirname(self._config_file)
+        self._values = SavedConfigReader().read(values_file) if values_file is not None else {}
+        self._path_vars = path_vars if path_vars is not None else {}
@@ -0,0 +1,156 @@
+import marshal
+import os
+import sys
+from os import path
+
+from .Config import JConfig
+from .Fetcher import RepoFetcher
+from .Item import JConfigItem
+from .Loader import JConfigLoader
+from .VariableMonitor import Monitor
+
+
+class BundleCompiler(JConfigLoader):
+    '''
+    compile every config file statically reachable from the root config into a single bundle.
+    each file is parsed once (items validated, gen-lists compiled) and stored decoded together
+    with compiled gen-list code. childs whose path has $VAR (or doesn't exist) are kept as
+    references, loaded from disk when they are resolved.
+    paths are stored relative to the directory of the root config
+    '''
+
+    def load(self, config_file):
+        config_json = JConfigLoader.load(self, config_file)
+        self._files.update({self.get_key(config_file): config_json})
+        return config_json
+
+    def remove_stale(self, file_name):
+        # compiling never touches outputs of the tree
+        pass
+
+    def get_key(self, config_file):
+        return path.relpath(config_file, self._root_dir)
+
+    def add_config(self, config_file):
+        '''
+        parse config_file and returns static child config files of it
+        '''
+        with Monitor.scope():
+            config = JConfig(jconfig_file=config_file, root_dir=self._root_dir, loader=self, fetcher=RepoFetcher())
+        config.parse()
+        key = self.get_key(config_file)
+        config_json = self._files[key]
+        childs = []
+        for name in config_json:
+            node = config_json[name]
+            gen_list = node.get('gen-list')
+            if gen_list:
+                codes = JConfigItem.compile_genlist(name, gen_list, validate=False)
+                self._genlists.update({(key, name): (tuple(codes), tuple(codes.values()))})
+            if 'config' not in node['type']:
+                continue
+            child = path.abspath(path.join(path.dirname(config_file), node['path']))
+            if '$' in node['path'] or not path.exists(child):
+                self._references.append((key, name, node['path']))
+            else:
+                childs.append(child)
+        config.reset()
+        config.release()
+        return childs
+
+    def compile(self, config_file):
+        pending = [path.abspath(config_file)]
+        while len(pending) > 0:
+            config_file = pending.pop()
+            if self.get_key(config_file) not in self._files:
+                pending.extend(reversed(self.add_config(config_file)))
+        return self
+
+    def get_files(self):
+        return list(self._files)
+
+    def get_references(self):
+        return list(self._references)
+
+    def write(self, bundle_file):
+        bundle = (SchemaBundle.VERSION, self.get_key(self._root_file), self._files, self._references,
+                  SchemaBundle.get_code_tag(), marshal.dumps(self._genlists))
+        temp_file = '{0}.{1}'.format(bundle_file, os.getpid())
+        with open(temp_file, 'wb') as fp:
+            marshal.dump(bundle, fp)
+        os.replace(temp_file, bundle_file)
+
+    def __init__(self, config_file):
+        self._root_file = path.abspath(config_file)
+        self._root_dir = path.dirname(self._root_file)
+        self._files = {}
+        self._references = []
+        self._genlists = {}
+
+
+class SchemaBundle(JConfigLoader):
+    '''
+    loader serving config files from a bundle written by BundleCompiler, read in one go.
+    files of the bundle were validated when compiled and are trusted, files which
+    are not in the bundle (references) are left to loader.
+    compiled gen-list code is used only by the same python version which compiled it
+    '''
+
+    VERSION = 2
+    DEFAULT_FILE = 'config.jcb'
+
+    @staticmethod
+    def get_code_tag():
+        return '{0}.{1}'.format(sys.version_info[0], sys.version_info[1])
+
+    def load(self, config_file):
+        config_json = self._files.get(config_file)
+        if config_json is None:
+            return self._loader.load(config_file)
+        return config_json
+
+    def is_trusted(self, config_file):
+        return config_file in self._files or self._loader.is_trusted(config_file)
+
+    def on_validated(self, config_file):
+        self._loader.on_validated(config_file)
+
+    def remove_stale(self, file_name):
+        self._loader.remove_stale(file_name)
+
+    def get_root_file(self):
+        return self._root_file
+
+    def get_references(self):
+        '''
+        [(config file, name, path)] of childs left to be loaded from disk
+        '''
+        return list(self._references)
+
+    def __len__(self):
+        return len(self._files)
+
+    def __init__(self, bundle_file, root_dir=None, loader=None):
+        '''
+        paths of the bundle are relative to root_dir, which is the directory of bundle_file by default
+        '''
+        with open(bundle_file, 'rb') as fp:
+            data = fp.read()
+        try:
+            bundle = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            raise ValueError('{} is not a config bundle'.format(bundle_file))
+        if not isinstance(bundle, tuple) or len(bundle) != 6 or bundle[0] != SchemaBundle.VERSION:
+            raise ValueError('{} is not a config bundle of version {}'.format(bundle_file, SchemaBundle.VERSION))
+        _, root_file, files, references, code_tag, genlists = bundle
+        root_dir = path.abspath(root_dir if root_dir is not None else path.dirname(path.abspath(bundle_file)))
+        self._loader = loader if loader is not None else JConfigLoader()
+        self._root_file = path.normpath(path.join(root_dir, root_file))
+        self._files = {path.normpath(path.join(root_dir, key)): files[key] for key in files}
+        self._references = [(path.normpath(path.join(root_dir, key)), name, config_path)
+                            for key, name, config_path in references]
+        if code_tag == SchemaBundle.get_code_tag():
+            # (config file, name) -> (keys, codes) of gen-list
+            genlists = marshal.loads(genlists)
+            for (key, name), (keys, codes) in genlists.items():
+                JConfigItem.preload_genlist(name, files[key][name]['gen-list'], dict(zip(keys, codes)))
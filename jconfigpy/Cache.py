@@ -0,0 +1,186 @@
+import glob
+import hashlib
+import json
+import marshal
+import os
+import re
+import shutil
+import sys
+import threading
+from os import path
+
+from .ErrorType import FileNotExistError
+from .Loader import JConfigLoader
+
+
+class ParseCache(JConfigLoader):
+    '''
+    on-disk cache of decoded & validated config.json files.
+    each file is stored in its own entry keyed by absolute path and checked
+    against mtime / size first and content hash second, so that a touched but
+    unchanged file is still a cache hit.
+    '''
+
+    DEFAULT_DIR = '.jconfig_cache'
+    _VERSION = 1
+
+    @staticmethod
+    def digest(data):
+        return hashlib.sha1(data).hexdigest()
+
+    def entry_file(self, config_file):
+        return path.join(self._cache_dir, hashlib.sha1(config_file.encode('utf-8')).hexdigest())
+
+    def read_entry(self, config_file):
+        try:
+            with open(self.entry_file(config_file), 'rb') as fp:
+                entry = marshal.load(fp)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(entry, tuple) or len(entry) != 6:
+            return None
+        if entry[0] != self._tag or entry[1] != config_file:
+            return None
+        return entry
+
+    def write_entry(self, config_file, entry):
+        entry_file = self.entry_file(config_file)
+        temp_file = '{0}.{1}'.format(entry_file, os.getpid())
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            with open(temp_file, 'wb') as fp:
+                marshal.dump(entry, fp)
+            os.replace(temp_file, entry_file)
+        except (OSError, ValueError):
+            # cache is only an optimization, failing to store it is not an error
+            if path.exists(temp_file):
+                os.remove(temp_file)
+
+    def load(self, config_file):
+        try:
+            st = os.stat(config_file)
+        except OSError:
+            raise FileNotExistError(config_file)
+        entry = self.read_entry(config_file)
+        if entry is not None and entry[3] == st.st_size:
+            _, _, mtime, _, digest, config_json = entry
+            if mtime == st.st_mtime_ns:
+                self._trusted.add(config_file)
+                self.hits += 1
+                return config_json
+            with open(config_file, 'rb') as fp:
+                data = fp.read()
+            if ParseCache.digest(data) == digest:
+                # touched but unchanged, refresh stamp to skip hashing next time
+                self.write_entry(config_file, (self._tag, config_file, st.st_mtime_ns, st.st_size, digest, config_json))
+                self._trusted.add(config_file)
+                self.hits += 1
+                return config_json
+        else:
+            with open(config_file, 'rb') as fp:
+                data = fp.read()
+        self.misses += 1
+        config_json = json.loads(data.decode('utf-8'))
+        self._pending.update({config_file: (st.st_mtime_ns, st.st_size, ParseCache.digest(data), config_json)})
+        return config_json
+
+    def is_trusted(self, config_file):
+        return config_file in self._trusted
+
+    def on_validated(self, config_file):
+        pending = self._pending.pop(config_file, None)
+        if pending is None:
+            return
+        mtime, size, digest, config_json = pending
+        self.write_entry(config_file, (self._tag, config_file, mtime, size, digest, config_json))
+        self._trusted.add(config_file)
+
+    def __init__(self, cache_dir=DEFAULT_DIR):
+        self._cache_dir = path.abspath(cache_dir)
+        self._tag = '{0}-{1}.{2}'.format(ParseCache._VERSION, sys.version_info[0], sys.version_info[1])
+        self._trusted = set()
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+
+
+class RepoBuildCache:
+    '''
+    local store of build outputs of repos.
+    an entry is keyed by commit hash of the source, content of package.json, values of
+    variables used in the path of the repo and of environment variables referred to by
+    the build commands. entries are written into a temporary directory and renamed into
+    place, so an existing entry is always complete.
+    '''
+
+    DEFAULT_DIR = path.join(ParseCache.DEFAULT_DIR, 'repo')
+    _VERSION = 2
+    _ENV_PATTERN = re.compile(r'\$\{?([A-Za-z_][A-Za-z0-9_]*)')
+
+    @staticmethod
+    def get_build_vars(package_json):
+        '''
+        names of environment variables expanded by the build commands run by shell (strings)
+        '''
+        names = set()
+        for cmd in package_json.get('buildcmd', []):
+            if isinstance(cmd, str):
+                names.update(RepoBuildCache._ENV_PATTERN.findall(cmd))
+        return sorted(names)
+
+    def make_key(self, repo, package_data, timeout=None):
+        '''
+        returns None when the source has no revision (not a git work tree) or its tracked
+        files are modified, such repo is not cached
+        '''
+        revision = repo.get_revision(timeout)
+        if revision is None or repo.is_modified(timeout):
+            return None
+        sha = hashlib.sha1()
+        sha.update('{0}\0{1}\0{2}\0'.format(RepoBuildCache._VERSION, repo.get_name(), revision).encode('utf-8'))
+        sha.update(package_data)
+        path_vars = repo.get_path_vars()
+        for var in sorted(path_vars):
+            sha.update('\0{0}={1}'.format(var, path_vars[var]).encode('utf-8'))
+        for var in RepoBuildCache.get_build_vars(json.loads(package_data.decode('utf-8'))):
+            sha.update('\0${0}={1}'.format(var, os.environ.get(var)).encode('utf-8'))
+        return sha.hexdigest()
+
+    def lookup(self, key):
+        if key is None:
+            return None
+        entry_dir = path.join(self._cache_dir, key)
+        if not path.isdir(entry_dir):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry_dir
+
+    def store(self, key, src_dir, outputs):
+        '''
+        copy outputs (glob patterns relative to src_dir) of a finished build into the entry of key
+        '''
+        if key is None:
+            return
+        entry_dir = path.join(self._cache_dir, key)
+        temp_dir = '{0}.{1}.{2}'.format(entry_dir, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            for out in outputs:
+                for src in glob.glob(path.join(src_dir, out)):
+                    dst = path.join(temp_dir, path.relpath(src, src_dir))
+                    os.makedirs(path.dirname(dst), exist_ok=True)
+                    shutil.copy2(src, dst)
+            os.makedirs(temp_dir, exist_ok=True)
+            os.rename(temp_dir, entry_dir)
+        except OSError:
+            # cache is only an optimization, an entry stored concurrently is as good as ours
+            pass
+        finally:
+            if path.exists(temp_dir):
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def __init__(self, cache_dir=DEFAULT_DIR):
+        self._cache_dir = path.abspath(cache_dir)
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,55 @@
+import json
+import socket
+
+
+class ConfigClient:
+    '''
+    thin client of ConfigServer, imports nothing but socket & json to start quickly
+    '''
+
+    DEFAULT_SOCKET = '.jconfig.sock'
+
+    def request(self, op, **kwargs):
+        kwargs.update({'op': op})
+        self._fp.write(json.dumps(kwargs).encode('utf-8') + b'\n')
+        self._fp.flush()
+        lin = self._fp.readline()
+        if len(lin) == 0:
+            raise OSError('connection closed by server')
+        response = json.loads(lin.decode('utf-8'))
+        if not response.pop('ok', False):
+            raise ValueError(response.get('error'))
+        return response
+
+    def query(self, keys=None):
+        return self.request('query', keys=keys)['values']
+
+    def resolve(self, values):
+        return self.request('resolve', values=values)['values']
+
+    def symbol(self, keys, recursive=False):
+        return self.request('symbol', keys=keys, recursive=recursive)['symbols']
+
+    def search(self, prefix):
+        return self.request('search', prefix=prefix)['names']
+
+    def emit(self, config, header, keep_unchanged=False, symbols=None):
+        return self.request('emit', config=config, header=header, keep_unchanged=keep_unchanged,
+                            symbols=symbols)
+
+    def close(self):
+        self._fp.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def __init__(self, socket_path, timeout=None):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(socket_path)
+        self._fp = self._sock.makefile('rwb')
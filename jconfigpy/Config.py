@@ -1,41 +1,33 @@
-import json
 from os import path
-import os
 import io
 
-try:
-    from jconfigpy.ErrorType import FileNotExistError
-    from jconfigpy.Item import JConfigEnum
-    from jconfigpy.Item import JConfigBool
-    from jconfigpy.Item import JConfigHex
-    from jconfigpy.Item import JConfigInt
-    from jconfigpy.Item import JConfigString
-    from jconfigpy.Item import JConfigTristate
-    from jconfigpy.Recipe import JConfigRecipe
-    from jconfigpy.Recipe import JConfigRepo
-    from jconfigpy.VariableMonitor import Monitor
-except ImportError:
-    from .ErrorType import FileNotExistError
-    from .Item import JConfigEnum
-    from .Item import JConfigBool
-    from .Item import JConfigHex
-    from .Item import JConfigInt
-    from .Item import JConfigString
-    from .Item import JConfigTristate
-    from .Recipe import JConfigRecipe
-    from .Recipe import JConfigRepo
-    from .VariableMonitor import Monitor
+from .ErrorType import FileNotExistError
+from .Item import JConfigEnum
+from .Item import JConfigBool
+from .Item import JConfigHex
+from .Item import JConfigInt
+from .Item import JConfigString
+from .Item import JConfigTristate
+from .Loader import JConfigLoader
+from .Recipe import JConfigRecipe
+from .Recipe import JConfigRepo
+from .SymbolIndex import SymbolIndex
+from .VariableMonitor import Monitor
 
 
 class JConfig:
 
-    def on_update_var(self, var, updated_val):
-        if var in self._var_map:
-            self._var_map.update({var: updated_val})
-        if var in self._depend:
-            self._visibility = self._var_pub.check_depend(**self._depend)
-        if var in self._unresolved_path:
-            self._unresolved_path.update({var: updated_val})
+    def on_update_vars(self, updates):
+        dirty = False
+        if not self._depend.keys().isdisjoint(updates):
+            self._visibility = self._var_pub.is_satisfied(self)
+            dirty = True
+        for var, updated_val in updates.items():
+            if var in self._unresolved_path:
+                self._unresolved_path.update({var: updated_val})
+                dirty = True
+        if dirty:
+            self._var_pub.mark_dirty(self)
 
     def set_config(self, config_file):
         if not path.exists(config_file):
@@ -43,12 +35,37 @@ class JConfig:
         self._jconfig_file = config_file
         self._base_dir = path.split(config_file)[0]
 
+    def get_name(self):
+        return self._name
+
     def get_childs(self):
         return self._child
 
+    def get_parent(self):
+        return self._parent
+
     def get_items(self):
         return self._items
 
+    def get_recipes(self):
+        return self._recipes
+
+    def get_depend(self):
+        return self._depend
+
+    def walk(self, visible_only=False):
+        '''
+        iterate this config and all of its descendants in depth-first (pre-)order,
+        with visible_only, invisible configs are skipped together with their descendants
+        '''
+        stack = [self]
+        while len(stack) > 0:
+            config = stack.pop()
+            if visible_only and not config.is_visible():
+                continue
+            yield config
+            stack.extend(reversed(config.get_childs()))
+
     def write_recipe(self, fp, fmt="include {0}\n"):
         if not isinstance(fp, io.IOBase):
             return
@@ -70,55 +87,117 @@ class JConfig:
             child.write_genlist(fp, fmt)
 
     def is_visible(self):
+        if len(self._depend) > 0:
+            return self._var_pub.is_satisfied(self)
         return self._visibility
 
+    def get_monitor(self):
+        return self._var_pub
+
+    def get_loader(self):
+        return self._loader
+
+    def get_symbols(self):
+        '''
+        index of symbols of the whole tree, shared with the root
+        '''
+        return self._symbols
+
+    def create_item(self, item_class, name, spec, validate):
+        if self._lazy:
+            return item_class(name, self._var_pub, validate, spec=spec)
+        return item_class(name, self._var_pub, validate, **spec)
+
+    def get_resolved_file(self):
+        '''
+        path of config file with variables substituted by their current values
+        '''
+        config_file = self._template_file
+        for pv in self._unresolved_path:
+            config_file = config_file.replace('$' + pv, self._unresolved_path[pv])
+        return config_file
+
+    def is_parsed(self):
+        return self._parsed
+
+    def is_stale(self):
+        '''
+        whether config is parsed from a path which doesn't match current value of its variables
+        '''
+        return self._parsed and self.get_resolved_file() != self._jconfig_file
+
+    def reset(self):
+        '''
+        drop parsed items, childs, recipes and repos so that config can be parsed again
+        '''
+        for item in self._items:
+            self._symbols.remove(item)
+            item.release()
+        for child in self._child:
+            child.reset()
+            child.release()
+            self._symbols.remove_config(child)
+        self._items = []
+        self._child = []
+        self._recipes = []
+        self._repos = []
+        self._jconfig_file = self._template_file
+        self._parsed = False
+
     def parse(self):
-        if len(self._unresolved_path) > 0:
-            # resolve path before opening the file
-            for pv in self._unresolved_path:
-                path_var = '$' + pv
-                self._jconfig_file = self._jconfig_file.replace(path_var, self._unresolved_path[pv])
-        if not path.exists(self._jconfig_file):
-            raise FileNotExistError(self._jconfig_file)
-        with open(self._jconfig_file, 'r') as fp:
-            config_json = json.load(fp)
-            for key in config_json:
-                config_type = config_json[key]['type']
-                if 'enum' in config_type:
-                    self._items.append(JConfigEnum(key, self._var_pub, **config_json[key]))
-                elif 'bool' in config_type:
-                    self._items.append(JConfigBool(key, self._var_pub, **config_json[key]))
-                elif 'int' in config_type:
-                    self._items.append(JConfigInt(key, self._var_pub, **config_json[key]))
-                elif 'hex' in config_type:
-                    self._items.append(JConfigHex(key, self._var_pub, **config_json[key]))
-                elif 'string' in config_type:
-                    self._items.append(JConfigString(key, self._var_pub, **config_json[key]))
-                elif 'tristate' in config_type:
-                    self._items.append(JConfigTristate(key, self._var_pub, **config_json[key]))
-                elif 'config' in config_type:
-                    config_path = config_json[key]['path']
-                    config_path = path.abspath(path.join(self._base_dir, config_path))
-                    self._child.append(JConfig(name=key,
-                                               jconfig_file=config_path,
-                                               root_dir=self._root,
-                                               **config_json[key]))
-                elif 'recipe' in config_type:
-                    self._recipes.append(JConfigRecipe(key,
-                                                       self._var_pub,
-                                                       self._base_dir,
-                                                       self._var_map,
-                                                       **config_json[key]))
-                elif 'repo' in config_type:
-                    repositoy = JConfigRepo(var_pub=self._var_pub,
-                                            base_dir=self._base_dir,
-                                            root_dir=self._root,
-                                            var_map=self._var_map,
-                                            **config_json[key])
-                    print(self._base_dir)
-                    print(self._root)
+        # resolve path before opening the file
+        self._jconfig_file = self.get_resolved_file()
+        self._parsed = True
+        config_json = self._loader.load(self._jconfig_file)
+        validate = not self._loader.is_trusted(self._jconfig_file)
+        items = len(self._items)
+        for key in config_json:
+            config_type = config_json[key]['type']
+            if 'enum' in config_type:
+                self._items.append(self.create_item(JConfigEnum, key, config_json[key], validate))
+            elif 'bool' in config_type:
+                self._items.append(self.create_item(JConfigBool, key, config_json[key], validate))
+            elif 'int' in config_type:
+                self._items.append(self.create_item(JConfigInt, key, config_json[key], validate))
+            elif 'hex' in config_type:
+                self._items.append(self.create_item(JConfigHex, key, config_json[key], validate))
+            elif 'string' in config_type:
+                self._items.append(self.create_item(JConfigString, key, config_json[key], validate))
+            elif 'tristate' in config_type:
+                self._items.append(self.create_item(JConfigTristate, key, config_json[key], validate))
+            elif 'config' in config_type:
+                config_path = config_json[key]['path']
+                config_path = path.abspath(path.join(self._base_dir, config_path))
+                self._child.append(JConfig(name=key,
+                                           jconfig_file=config_path,
+                                           root_dir=self._root,
+                                           parent=self,
+                                           loader=self._loader,
+                                           lazy=self._lazy,
+                                           fetcher=self._fetcher,
+                                           **config_json[key]))
+                self._symbols.add_config(self._child[-1])
+            elif 'recipe' in config_type:
+                self._recipes.append(JConfigRecipe(key,
+                                                   self._var_pub,
+                                                   self._base_dir,
+                                                   self._var_map,
+                                                   **config_json[key]))
+            elif 'repo' in config_type:
+                repositoy = JConfigRepo(var_pub=self._var_pub,
+                                        base_dir=self._base_dir,
+                                        root_dir=self._root,
+                                        var_map=self._var_map,
+                                        **config_json[key])
+                if self._fetcher is not None:
+                    self._fetcher.add_repo(repositoy)
+                else:
                     repositoy.resolve_repo()
-                    self._repos.append(repositoy)
+                self._repos.append(repositoy)
+        for item in self._items[items:]:
+            self._symbols.add(item, self._jconfig_file)
+        if validate:
+            self._loader.on_validated(self._jconfig_file)
 
     def __str__(self):
         report_str = str('>>> Config : {}\n'.format(self._name))
@@ -127,30 +206,43 @@ class JConfig:
         report_str += '<<< Config : {}\n'.format(self._name)
         return report_str
 
-    def __init__(self, name='root', jconfig_file='./config.json', root_dir=None, var_map=None, parent=None, **kwargs):
+    def __init__(self, name='root', jconfig_file='./config.json', root_dir=None, var_map=None, parent=None,
+                 loader=None, lazy=False, fetcher=None, **kwargs):
+        '''
+        with lazy, items keep reference to raw JSON node of config file and load
+        only what is needed to resolve the value, rest (prompt, help, range) on demand
+        with fetcher, repos are only collected into it while parsing and fetched by fetcher.run()
+        '''
         self._name = name
         self._root = root_dir
         self._jconfig_file = jconfig_file
         self._parent = parent
-        self._var_map = dict(var_map) if var_map else {}
         self._unresolved_path = {}
         self._items = []
         self._child = []
         self._recipes = []
         self._repos = []
         self._visibility = True
+        self._loader = loader if loader is not None else JConfig._DEFAULT_LOADER
+        self._lazy = lazy
+        self._fetcher = fetcher
 
-        self._var_pub = Monitor()
+        # childs share monitor of the root, even when parsed outside of its scope
+        self._var_pub = parent.get_monitor() if parent is not None else Monitor()
+        # live view of variables layered over given var_map (values of monitor take precedence),
+        # shared with recipes & repos instead of copying variables into each of them
+        self._var_map = self._var_pub.get_scope(var_map)
+        self._symbols = parent.get_symbols() if parent is not None else SymbolIndex()
 
         self._depend = kwargs.get('depend', {})
         self._name = name
-        self._var_pub.get_update(self._var_map)
         self._base_dir = path.abspath(path.abspath(path.dirname(jconfig_file)))
         self._jconfig_file = path.abspath(jconfig_file)
+        # path as given, may contain $VAR to be substituted on parse
+        self._template_file = self._jconfig_file
+        self._parsed = False
         autogen_file = path.abspath(path.join(self._base_dir, './autorecipe.mk'))
-        print(autogen_file)
-        if path.exists(autogen_file):
-            os.remove(autogen_file)
+        self._loader.remove_stale(autogen_file)
 
         if '$' in self._jconfig_file:
             '''
@@ -168,18 +260,17 @@ class JConfig:
                 config_path, p = path.split(config_path)
 
         if len(self._depend) > 0:
-            self._visibility = self._var_pub.check_depend(**self._depend)
-            for key in self._depend:
-                self._var_pub.subscribe_variable_change(key, self)
+            self._visibility = self._var_pub.subscribe_depend(self, self._depend)
 
-    def __del__(self):
+    def release(self):
+        self._var_pub.unsubscribe_depend(self)
         if len(self._unresolved_path) > 0:
             for upath in self._unresolved_path:
                 self._var_pub.unsubscribe_variable_change(upath, self)
 
-        if len(self._var_map) > 0:
-            for var in self._var_map:
-                self._var_pub.unsubscribe_variable_change(var, self)
+    def __del__(self):
+        self.release()
 
     _DEFAULT_FILE = './config.json'
+    _DEFAULT_LOADER = JConfigLoader()
 
@@ -1,21 +1,11 @@
-try:
-    from jconfigpy.Config import JConfig
-    from jconfigpy.Config import JConfigEnum
-    from jconfigpy.Config import JConfigInt
-    from jconfigpy.Config import JConfigString
-    from jconfigpy.Config import JConfigHex
-    from jconfigpy.Config import JConfigBool
-    from jconfigpy.Config import JConfigTristate
-    from jconfigpy.Item import JConfigItem
-except ImportError:
-    from .Config import JConfig
-    from .Config import JConfigEnum
-    from .Config import JConfigInt
-    from .Config import JConfigString
-    from .Config import JConfigHex
-    from .Config import JConfigBool
-    from .Config import JConfigTristate
-    from .Item import JConfigItem
+from .Config import JConfig
+from .Config import JConfigEnum
+from .Config import JConfigInt
+from .Config import JConfigString
+from .Config import JConfigHex
+from .Config import JConfigBool
+from .Config import JConfigTristate
+from .Item import JConfigItem
 
 
 class Dialog:
@@ -39,21 +29,23 @@ class CMDDialog(Dialog):
         if not config.is_visible():
             return
         config.parse()
-        for item in config.get_items():
-            if item.is_visible():
-                item_type = item.get_type()
-                if item_type == 'enum':
-                    CMDDialog.prompt_enum(item, pre_def)
-                elif item_type == 'int':
-                    CMDDialog.prompt_int(item, pre_def)
-                elif item_type == 'hex':
-                    CMDDialog.prompt_hex(item, pre_def)
-                elif item_type == 'bool':
-                    CMDDialog.prompt_bool(item, pre_def)
-                elif item_type == 'tristate':
-                    CMDDialog.prompt_tristate(item, pre_def)
-                elif item_type == 'string':
-                    CMDDialog.prompt_string(item, pre_def)
+        # items of a config are committed at once, a failure rolls back the whole config
+        with config.get_monitor().batch():
+            for item in config.get_items():
+                if item.is_visible():
+                    item_type = item.get_type()
+                    if item_type == 'enum':
+                        CMDDialog.prompt_enum(item, pre_def)
+                    elif item_type == 'int':
+                        CMDDialog.prompt_int(item, pre_def)
+                    elif item_type == 'hex':
+                        CMDDialog.prompt_hex(item, pre_def)
+                    elif item_type == 'bool':
+                        CMDDialog.prompt_bool(item, pre_def)
+                    elif item_type == 'tristate':
+                        CMDDialog.prompt_tristate(item, pre_def)
+                    elif item_type == 'string':
+                        CMDDialog.prompt_string(item, pre_def)
 
         for child in config.get_childs():
             child_dialog = CMDDialog()
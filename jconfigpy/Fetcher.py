@@ -0,0 +1,103 @@
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .ErrorType import FileNotExistError
+from .Recipe import JConfigRepo
+
+
+class RepoFetcher:
+    '''
+    collect repo nodes while the config tree is parsed and fetch / build them
+    afterwards on a bounded pool of workers, each driving its own subprocesses.
+    repos sharing a checkout path are handled by the same worker one after another.
+    with build_cache (RepoBuildCache), unchanged repos are restored instead of rebuilt.
+    '''
+
+    # errors of a repo reported per repo, FileNotExistError is not an Exception
+    ERRORS = (FileNotExistError, OSError, ValueError, subprocess.TimeoutExpired)
+
+    @staticmethod
+    def describe_error(err):
+        '''
+        message of err, with output captured (stdout & stderr) until a command timed out
+        '''
+        if isinstance(err, subprocess.TimeoutExpired) and err.output:
+            output = err.output.decode('utf-8', 'replace') if isinstance(err.output, bytes) else err.output
+            return '{0}\n{1}'.format(err, output)
+        return str(err)
+
+    def add_repo(self, repo):
+        assert isinstance(repo, JConfigRepo)
+        self._repos.append(repo)
+
+    def get_repos(self):
+        return self._repos
+
+    def get_errors(self):
+        '''
+        list of (repo name, error message) of repos failed in the last run, in the order repos were collected
+        '''
+        return self._errors
+
+    def get_timings(self):
+        '''
+        list of (repo name, [(step, seconds), ...], total seconds) in the order repos were collected
+        '''
+        return self._timings
+
+    def fetch_group(self, repos):
+        '''
+        returns (repo, timings, total seconds) of each repo, with timings None and
+        the error for a failed repo (the following ones are still tried)
+        '''
+        results = []
+        for repo in repos:
+            begin = time.perf_counter()
+            try:
+                timings = repo.resolve_repo(self._timeout, self._build_cache)
+            except RepoFetcher.ERRORS as err:
+                results.append((repo, None, err))
+                continue
+            results.append((repo, timings, time.perf_counter() - begin))
+        return results
+
+    def run(self):
+        '''
+        fetch & build every collected repo. once all workers are finished, an OSError
+        listing every failed repo with its error (and output of failed command) is raised
+        '''
+        groups = {}
+        for repo in self._repos:
+            groups.setdefault(repo.prepare(), []).append(repo)
+        results = {}
+        with ThreadPoolExecutor(max_workers=self._workers) as pool:
+            futures = [pool.submit(self.fetch_group, groups[key]) for key in groups]
+            for future in futures:
+                for repo, timings, total in future.result():
+                    results.update({repo: (repo.get_name(), timings, total)})
+        self._timings = [results[repo] for repo in self._repos if results[repo][1] is not None]
+        self._errors = [(results[repo][0], RepoFetcher.describe_error(results[repo][2]))
+                        for repo in self._repos if results[repo][1] is None]
+        self._repos = []
+        if len(self._errors) > 0:
+            raise OSError(''.join('Repo {0} failed : {1}\n'.format(name, message) for name, message in self._errors))
+        return self._timings
+
+    def report(self):
+        report_str = ''
+        for name, timings, total in self._timings:
+            steps = ' '.join('{0} {1:.2f}s'.format(step, elapsed) for step, elapsed in timings)
+            report_str += 'Repo {0} : {1} (total {2:.2f}s)\n'.format(name, steps, total)
+        return report_str
+
+    def __len__(self):
+        return len(self._repos)
+
+    def __init__(self, workers=None, timeout=None, build_cache=None):
+        self._workers = workers
+        self._timeout = timeout
+        self._build_cache = build_cache
+        self._repos = []
+        self._timings = []
+        self._errors = []
@@ -1,22 +1,47 @@
+import ast
 import os
 import random
 import re
+import sys
 import time
+from collections import OrderedDict
 from os import environ
 
-try:
-    import jconfigpy.VariableMonitor as VariableMonitor
-except ImportError:
-    from . import VariableMonitor
+from . import VariableMonitor
 
 
 class JConfigItem:
+    __slots__ = ('_user_val', '_def_val', '_var_pub', '_name', '_depend', '_type', '_spec',
+                 '_gen_code', '_gen_ns', '_gen_cache', '_isforced')
     _NIE_MESSAGE = '{} is not implemented'
     _REPORT_FORMAT = 'name : {name} \n' \
                      'default value : {dval}\n' \
                      'user value : {uval}\n' \
                      'depends on : {deplist}\n' \
                      'is_visible : {visible}\n'
+    _GENLIST_NAMES = frozenset(('this', 'to_int', 'to_bool', 'to_tristate', 'to_hex', 'to_string', 'rand', 'ctime'))
+    _DEFAULT_PROMPT = '{0}'
+    _DEFAULT_HELP = [
+        'No Help Message'
+    ]
+    # shared by items without depend / gen-list, never modified
+    _NO_DEPEND = {}
+    _NO_GENLIST = {}
+    _NO_SPEC = {}
+    # attributes looked up after construction, the only ones kept from spec given as keyword arguments
+    _KEPT_ATTRS = ('prompt', 'help', 'import')
+    # (name, gen-list) -> (compiled gen-list, whether it is validated), least recently used first
+    _GENLIST_CACHE = OrderedDict()
+    _GENLIST_CACHE_SIZE = 1024
+    _GENLIST_BUILTINS = {
+        'int': int,
+        'str': str,
+        'hex': hex,
+        'len': len,
+        'min': min,
+        'max': max,
+        'abs': abs
+    }
 
     @staticmethod
     def rand(max_byte):
@@ -30,14 +55,70 @@ class JConfigItem:
     def get_time():
         return int(time.time())
 
+    @staticmethod
+    def compile_genlist(name, gen_list, validate=True):
+        '''
+        compile gen-list expressions into code objects, expressions are checked
+        to use only the helper names (and a few builtins) available in get_resolved_genlist.
+        compiled gen-lists are shared by items built from the same spec (e.g. trees of each variant)
+        '''
+        cache_key = (name, tuple(gen_list.items()))
+        entry = JConfigItem._GENLIST_CACHE.get(cache_key)
+        if entry is not None and (entry[1] or not validate):
+            JConfigItem._GENLIST_CACHE.move_to_end(cache_key)
+            return entry[0]
+        codes = {}
+        for key in gen_list:
+            expr = gen_list[key]
+            fname = '<gen-list {0}.{1}>'.format(name, key)
+            if not validate:
+                codes.update({key: compile(expr, fname, 'eval')})
+                continue
+            try:
+                tree = ast.parse(expr, fname, 'eval')
+            except SyntaxError as se:
+                raise ValueError('invalid gen-list expression for {0} in {1} : {2}'.format(key, name, se.msg))
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Name) and node.id not in JConfigItem._GENLIST_NAMES and \
+                        node.id not in JConfigItem._GENLIST_BUILTINS:
+                    raise ValueError('\'{0}\' is not allowed in gen-list {1} of {2}'.format(node.id, key, name))
+                if isinstance(node, ast.Attribute) and node.attr.startswith('_'):
+                    raise ValueError('\'{0}\' is not allowed in gen-list {1} of {2}'.format(node.attr, key, name))
+            codes.update({key: compile(tree, fname, 'eval')})
+        JConfigItem.cache_genlist(cache_key, codes, validate)
+        return codes
+
+    @staticmethod
+    def cache_genlist(cache_key, codes, validated):
+        '''
+        cache is bounded, so that a long running process parsing trees again and again
+        (e.g. resolver daemon) doesn't keep gen-lists of every file it has ever seen
+        '''
+        cache = JConfigItem._GENLIST_CACHE
+        cache[cache_key] = (codes, validated)
+        cache.move_to_end(cache_key)
+        while len(cache) > JConfigItem._GENLIST_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    @staticmethod
+    def preload_genlist(name, gen_list, codes):
+        '''
+        put gen-list compiled beforehand (e.g. loaded from bundle) into the cache of compile_genlist
+        '''
+        JConfigItem.cache_genlist((name, tuple(gen_list.items())), codes, False)
+
     def is_forced(self):
         return self._isforced == 'y'
 
     def get_prompt(self):
-        raise NotImplementedError(JConfigItem._NIE_MESSAGE.format(JConfigItem.get_prompt))
+        # prompt / help are looked up from the item spec only when asked
+        prompt = self._spec.get('prompt')
+        if prompt is None:
+            return self._DEFAULT_PROMPT.format(self._name)
+        return prompt
 
     def get_help(self):
-        raise NotImplementedError(JConfigItem._NIE_MESSAGE.format(JConfigItem.get_help))
+        return self._spec.get('help', self._DEFAULT_HELP)
 
     def get_user_value(self):
         if self._user_val is None:
@@ -53,49 +134,83 @@ class JConfigItem:
     def get_name(self):
         return self._name
 
+    def get_depend(self):
+        return self._depend
+
+    def get_genlist_keys(self):
+        '''
+        outputs (macros) defined by gen-list of the item
+        '''
+        return list(self._gen_code)
+
+    def is_imported(self):
+        '''
+        whether value of the item can be taken from the environment variable of its name
+        '''
+        return self._spec.get('import', False)
+
     def set_user_value(self, val):
         if self._user_val != val:
+            self._var_pub.add_undo(self._restore_user_value, self._user_val)
             self._var_pub.notify_variable_change(self._name, val)
         self._user_val = val
+        self._gen_cache = None
+
+    def clear_user_value(self):
+        '''
+        drop value of the item (e.g. when it becomes invisible) so that it's resolved again
+        '''
+        if self._user_val is not None:
+            self._var_pub.add_undo(self._restore_user_value, self._user_val)
+        self._var_pub.unset_variable(self._name)
+        self._user_val = None
+        self._gen_cache = None
+
+    def _restore_user_value(self, val):
+        self._user_val = val
+        self._gen_cache = None
 
-    def on_update_var(self, var, update_val):
-        if var in self._depend:
-            self._depend.update({var: update_val})
-            self._visibility = self._var_pub.check_depend(**self._depend)
+    def on_update_vars(self, updates):
+        if not self._depend.keys().isdisjoint(updates):
+            self._gen_cache = None
+            self._var_pub.mark_dirty(self)
             return True
         return False
 
     def get_resolved_genlist(self):
+        '''
+        resolved value is cached until user value or dependency of the item changes
+        '''
+        if self._gen_cache is not None:
+            return self._gen_cache
         genlist = {}
-        if not len(self._gen_list) > 0:
+        if not len(self._gen_code) > 0:
             return genlist
-        to_int = self.to_int
-        to_bool = self.to_bool
-        to_tristate = self.to_tristate
-        to_hex = self.to_hex
-        to_string = self.to_string
-        rand = JConfigItem.rand
-        ctime = JConfigItem.get_time
-        this = self.get_user_value()
-        no_opt = (to_int,
-                  to_bool,
-                  this,
-                  ctime,
-                  rand,
-                  to_string,
-                  to_hex,
-                  to_tristate)
-        assert no_opt[0] is not None
-        assert no_opt[-1] is not None
-        for key in self._gen_list:
-            genlist.update({key: eval(self._gen_list[key])})
+        if self._gen_ns is None:
+            self._gen_ns = {
+                '__builtins__': JConfigItem._GENLIST_BUILTINS,
+                'to_int': self.to_int,
+                'to_bool': self.to_bool,
+                'to_tristate': self.to_tristate,
+                'to_hex': self.to_hex,
+                'to_string': self.to_string,
+                'rand': JConfigItem.rand,
+                'ctime': JConfigItem.get_time
+            }
+        self._gen_ns['this'] = self.get_user_value()
+        for key in self._gen_code:
+            genlist.update({key: eval(self._gen_code[key], self._gen_ns)})
+        self._gen_cache = genlist
         return genlist
 
     def get_type(self):
         return self._type
 
     def is_visible(self):
-        return self._visibility
+        if len(self._depend) > 0:
+            # always up to date, even while notification is deferred by a batch
+            return self._var_pub.is_satisfied(self)
+        return True
 
     def to_hex(self, val):
         raise NotImplementedError(JConfigItem._NIE_MESSAGE.format(JConfigItem.to_hex))
@@ -112,25 +227,40 @@ class JConfigItem:
     def to_string(self, val):
         raise NotImplementedError(JConfigItem._NIE_MESSAGE.format(JConfigItem.to_string))
 
-    def __init__(self, name, type_, var_pub, **kwargs):
-        self._user_val = None
-        self._def_val = kwargs.get('default', '')
+    def __init__(self, name, type_, var_pub, validate=True, spec=None, **kwargs):
+        '''
+        attributes of the item are given as keyword arguments or, in lazy mode, as spec
+        which is the raw JSON node kept by reference (never modified) and only the parts
+        needed to resolve the value (default, depend, gen-list) are loaded eagerly.
+        of keyword arguments, only prompt, help and import are kept
+        '''
         self._var_pub = None
-        self._name = name
-        self._visibility = True
-        self._depend = kwargs.get('depend', {})
-        self._type = type_
-        self._gen_list = kwargs.get('gen-list', {})
-        self._isforced = kwargs.get('force', 'n')
-        if self.is_forced():
+        self._user_val = None
+        if spec is not None:
+            self._spec = spec
+        else:
+            spec = kwargs
+            self._spec = {key: kwargs[key] for key in JConfigItem._KEPT_ATTRS if key in kwargs} or \
+                JConfigItem._NO_SPEC
+        self._name = sys.intern(name)
+        self._type = sys.intern(type_)
+        self._def_val = spec.get('default', '')
+        self._depend = spec.get('depend', JConfigItem._NO_DEPEND)
+        gen_list = spec.get('gen-list')
+        if gen_list:
+            self._gen_code = JConfigItem.compile_genlist(name, gen_list, validate)
+        else:
+            self._gen_code = JConfigItem._NO_GENLIST
+        self._gen_ns = None
+        self._gen_cache = None
+        self._isforced = spec.get('force', 'n')
+        if validate and self.is_forced():
             assert self._def_val != ''
         assert isinstance(var_pub, VariableMonitor.Monitor)
         self._var_pub = var_pub
 
         if len(self._depend) > 0:
-            self._visibility = var_pub.check_depend(**self._depend)
-            for var in self._depend:
-                self._var_pub.subscribe_variable_change(var, self)  # subscribe variable change
+            var_pub.subscribe_depend(self, self._depend)  # subscribe variable change
 
     def __str__(self):
 
@@ -138,17 +268,20 @@ class JConfigItem:
                                                  dval=self._def_val,
                                                  uval=self._user_val,
                                                  deplist=self._depend,
-                                                 visible=self._visibility)
+                                                 visible=self.is_visible())
 
-    def __del__(self):
+    def release(self):
         if self._var_pub is None:
             return
-        for var in self._depend:
-            self._var_pub.unsubscribe_variable_change(var, self)
+        self._var_pub.unsubscribe_depend(self)
+
+    def __del__(self):
+        self.release()
 
 
 class JConfigString(JConfigItem):
 
+    __slots__ = ()
     _DEFAULT_PROMPT = 'Enter {0} (string) '
     _DEFAULT_HELP = [
         'No Help Message'
@@ -157,12 +290,6 @@ class JConfigString(JConfigItem):
     def to_string(self, val):
         return '\"{}\"'.format(val)
 
-    def get_help(self):
-        return self._help
-
-    def get_prompt(self):
-        return self._prompt
-
     def set_user_value(self, val):
         if len(val) == 0:
             raise ValueError('string type should not be empty ')
@@ -192,19 +319,10 @@ class JConfigString(JConfigItem):
         else:
             return "n"
 
-    def __init__(self, name, var_pub, **kwargs):
-
-        self._prompt = ""
-        self._help = []
-        self._import = False
-
-        JConfigItem.__init__(self, name, 'string', var_pub, **kwargs)
+    def __init__(self, name, var_pub, validate=True, spec=None, **kwargs):
+        JConfigItem.__init__(self, name, 'string', var_pub, validate, spec, **kwargs)
 
-        self._prompt = kwargs.get('prompt', JConfigString._DEFAULT_PROMPT.format(self._name))
-        self._help = kwargs.get('help', JConfigString._DEFAULT_HELP)
-        self._import = kwargs.get('import', False)
-
-        if self._import and name in environ:
+        if self.is_imported() and name in environ:
             self.set_user_value(environ[name])
 
     def __del__(self):
@@ -213,6 +331,7 @@ class JConfigString(JConfigItem):
 
 class JConfigTristate(JConfigItem):
 
+    __slots__ = ()
     _DEFAULT_PROMPT = 'Use {0} (y/m/n)'
     _RANGE = ('y', 'm', 'n')
     _DEFAULT_HELP = [
@@ -248,30 +367,15 @@ class JConfigTristate(JConfigItem):
             return "DYNAMIC"
         return "NONE"
 
-    def get_help(self):
-        return self._help
-
-    def get_prompt(self):
-        return self._prompt
-
     def set_user_value(self, val):
         if val not in JConfigTristate._RANGE:
             raise ValueError('value should be one of (y/m/n)')
         JConfigItem.set_user_value(self, val)
 
-    def __init__(self, name, var_pub, **kwargs):
-
-        self._prompt = ""
-        self._help = []
-        self._import = False
-
-        JConfigItem.__init__(self, name, 'tristate', var_pub, **kwargs)
+    def __init__(self, name, var_pub, validate=True, spec=None, **kwargs):
+        JConfigItem.__init__(self, name, 'tristate', var_pub, validate, spec, **kwargs)
 
-        self._prompt = kwargs.get('prompt', JConfigTristate._DEFAULT_PROMPT.format(self._name))
-        self._help = kwargs.get('help', JConfigTristate._DEFAULT_HELP)
-        self._import = kwargs.get('import', False)
-
-        if self._import and name in environ:
+        if self.is_imported() and name in environ:
             self.set_user_value(environ[name])
 
     def __del__(self):
@@ -280,6 +384,7 @@ class JConfigTristate(JConfigItem):
 
 class JConfigBool(JConfigItem):
 
+    __slots__ = ()
     _DEFAULT_PROMPT = 'Use {0} (y/n)'
     _RANGE = ('y', 'n')
     _DEFAULT_HELP = [
@@ -309,29 +414,15 @@ class JConfigBool(JConfigItem):
             return 'y'
         return 'n'
 
-    def get_help(self):
-        return self._help
-
-    def get_prompt(self):
-        return self._prompt
-
     def set_user_value(self, val):
         if val not in JConfigBool._RANGE:
             raise ValueError('value should be \'y\' or \'n\'')
         JConfigItem.set_user_value(self, val)
 
-    def __init__(self, name, var_pub, **kwargs):
-        self._prompt = ""
-        self._help = []
-        self._import = False
-
-        JConfigItem.__init__(self, name, 'bool', var_pub, **kwargs)
-
-        self._prompt = kwargs.get('prompt', JConfigBool._DEFAULT_PROMPT.format(self._name))
-        self._help = kwargs.get('help', JConfigBool._DEFAULT_HELP)
-        self._import = kwargs.get('import', False)
+    def __init__(self, name, var_pub, validate=True, spec=None, **kwargs):
+        JConfigItem.__init__(self, name, 'bool', var_pub, validate, spec, **kwargs)
 
-        if self._import and name in environ:
+        if self.is_imported() and name in environ:
             self.set_user_value(environ[name])
 
     def __del__(self):
@@ -340,6 +431,7 @@ class JConfigBool(JConfigItem):
 
 class JConfigEnum(JConfigItem):
 
+    __slots__ = ('_enum',)
     _DEFAULT_PROMPT = 'Choose Option 0~{0} :'
     _DEFAULT_HELP = [
         'No Help Message'
@@ -363,30 +455,22 @@ class JConfigEnum(JConfigItem):
     def get_enum(self):
         return self._enum
 
-    def __init__(self, name, var_pub, **kwargs):
-        self._enum = []
-        self._prompt = ''
-        self._help = []
-        self._import = False
+    def __init__(self, name, var_pub, validate=True, spec=None, **kwargs):
+        self._enum = (spec if spec is not None else kwargs).get('enum', [])
 
-        JConfigItem.__init__(self, name, 'enum', var_pub, **kwargs)
+        JConfigItem.__init__(self, name, 'enum', var_pub, validate, spec, **kwargs)
 
-        self._type = 'enum'
-        self._enum = kwargs.get('enum', [])
-        self._prompt = kwargs.get('prompt', JConfigEnum._DEFAULT_PROMPT.format(len(self._enum)))
-        self._help = kwargs.get('help', JConfigEnum._DEFAULT_HELP)
-        self._import = kwargs.get('import', False)
-        if self._import and name in environ:
+        if self.is_imported() and name in environ:
             self.set_user_value(environ[name])
 
     def get_elements(self):
         return self._enum
 
-    def get_help(self):
-        return self._help
-
     def get_prompt(self):
-        return self._prompt
+        prompt = self._spec.get('prompt')
+        if prompt is None:
+            return JConfigEnum._DEFAULT_PROMPT.format(len(self._enum))
+        return prompt
 
     def set_user_value(self, val):
         ival = int(val)
@@ -400,7 +484,9 @@ class JConfigEnum(JConfigItem):
 
 class JConfigHex(JConfigItem):
 
+    __slots__ = ('_range',)
     _DEFAULT_PROMPT = 'Input Hex Value for {}'
+    _PATTERN = re.compile('0x[0-9a-fA-F]+')
     _DEFAULT_HELP = [
         'No Help Message'
     ]
@@ -424,50 +510,50 @@ class JConfigHex(JConfigItem):
     def to_hex(self, val):
         return val
 
-    def __init__(self, name, var_pub, **kwargs):
-        self._prompt = ''
-        self._help = []
-        self._import = False
-        self._range = []
-        self._pattern = re.compile('0x[0-9a-fA-F]+')
+    @staticmethod
+    def parse_range(_range, validate=True):
+        if validate:
+            for i in _range:
+                if not JConfigHex._PATTERN.match(i):
+                    raise ValueError('value in range attribute should be formatted as \'0x[0-9a-fA-F]\'')
+        return [int(i, 16) for i in _range]
+
+    def get_range(self, validate=True):
+        if self._range is None:
+            # only in lazy mode, range of eager item is parsed on construction
+            self._range = JConfigHex.parse_range(self._spec.get('range', []), validate)
+        return self._range
 
-        JConfigItem.__init__(self, name, 'hex', var_pub, **kwargs)
+    def __init__(self, name, var_pub, validate=True, spec=None, **kwargs):
+        self._range = None
 
-        self._prompt = kwargs.get('prompt', JConfigHex._DEFAULT_PROMPT.format(name))
-        self._help = kwargs.get('help', JConfigHex._DEFAULT_HELP)
-        self._import = kwargs.get('import', False)
-        _range = kwargs.get('range', [])
-        for i in _range:
-            if not self._pattern.match(i):
-                raise ValueError('value in range attribute should be formatted as \'0x[0-9a-fA-F]\'')
+        JConfigItem.__init__(self, name, 'hex', var_pub, validate, spec, **kwargs)
 
-        self._range = [int(i, 16) for i in _range]
+        if spec is None or validate:
+            # range of trusted (already validated) file is converted on first use in lazy mode
+            self._range = JConfigHex.parse_range((spec if spec is not None else kwargs).get('range', []), validate)
 
-        if self._import and name in environ:
+        if self.is_imported() and name in environ:
             self.set_user_value(environ[name])
 
     def set_user_value(self, val):
-        if not self._pattern.match(val):
+        if not JConfigHex._PATTERN.match(val):
             raise ValueError('value should be formatted as \'0x[0-9a-fA-F]\'')
         ival = int(val, 16)
-        if len(self._range) > 1:
-            if self._range[0] > ival or self._range[1] < ival:
-                raise ValueError('value should be within 0x{min:x}~0x{max:x}'.format(min=self._range[0],
-                                                                                     max=self._range[1]))
+        _range = self.get_range()
+        if len(_range) > 1:
+            if _range[0] > ival or _range[1] < ival:
+                raise ValueError('value should be within 0x{min:x}~0x{max:x}'.format(min=_range[0],
+                                                                                     max=_range[1]))
         JConfigItem.set_user_value(self, val)
 
-    def get_help(self):
-        return self._help
-
-    def get_prompt(self):
-        return self._prompt
-
     def __del__(self):
         JConfigItem.__del__(self)
 
 
 class JConfigInt(JConfigItem):
 
+    __slots__ = ('_range',)
     _DEFAULT_PROMPT = 'Input Integer Value for {}'
     _DEFAULT_HELP = [
         'No Help Message'
@@ -492,18 +578,11 @@ class JConfigInt(JConfigItem):
     def to_int(self, val):
         return val
 
-    def __init__(self, name, var_pub, **kwargs):
-        self._prompt = ''
-        self._help = []
-        self._import = False
+    def __init__(self, name, var_pub, validate=True, spec=None, **kwargs):
+        JConfigItem.__init__(self, name, 'int', var_pub, validate, spec, **kwargs)
 
-        JConfigItem.__init__(self, name, 'int', var_pub, **kwargs)
-
-        self._prompt = kwargs.get('prompt', JConfigInt._DEFAULT_PROMPT.format(name))
-        self._help = kwargs.get('help', JConfigInt._DEFAULT_HELP)
-        self._import = kwargs.get('import', False)
-        self._range = kwargs.get('range', [])
-        if self._import and name in environ:
+        self._range = (spec if spec is not None else kwargs).get('range', [])
+        if self.is_imported() and name in environ:
             self.set_user_value(environ[name])
 
     def set_user_value(self, val):
@@ -513,11 +592,5 @@ class JConfigInt(JConfigItem):
                 raise ValueError('value should between {min} ~ {max}'.format(min=self._range[0], max=self._range[1]))
         JConfigItem.set_user_value(self, val)
 
-    def get_help(self):
-        return self._help
-
-    def get_prompt(self):
-        return self._prompt
-
     def __del__(self):
         JConfigItem.__del__(self)
\ No newline at end of file
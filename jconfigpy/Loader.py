@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+from os import path
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
+
+from .ErrorType import FileNotExistError
+
+
+class JConfigLoader:
+
+    def load(self, config_file):
+        if not path.exists(config_file):
+            raise FileNotExistError(config_file)
+        with open(config_file, 'r') as fp:
+            return json.load(fp)
+
+    def is_trusted(self, config_file):
+        '''
+        whether items loaded from config_file were already validated
+        '''
+        return False
+
+    def on_validated(self, config_file):
+        pass
+
+    def remove_stale(self, file_name):
+        '''
+        remove output left by the previous run (e.g. autorecipe.mk)
+        '''
+        if path.exists(file_name):
+            os.remove(file_name)
+
+
+class ParallelLoader(JConfigLoader):
+
+    @staticmethod
+    def static_childs(config_file, config_json):
+        '''
+        child config paths which can be resolved without any variable
+        '''
+        base_dir = path.dirname(config_file)
+        childs = []
+        for key in config_json:
+            node = config_json[key]
+            if not isinstance(node, dict) or 'config' not in node.get('type', ''):
+                continue
+            config_path = node.get('path')
+            if config_path is None or '$' in config_path:
+                continue
+            childs.append(path.abspath(path.join(base_dir, config_path)))
+        return childs
+
+    def prefetch(self, config_file):
+        '''
+        read and decode every statically reachable config file on a thread pool.
+        files which fail here are left to the synchronous load so that errors
+        are raised in the same order (and only under the same depend gating) as before
+        '''
+        config_file = path.abspath(config_file)
+        if config_file in self._docs:
+            return
+        seen = {config_file}
+        with ThreadPoolExecutor(max_workers=self._workers) as pool:
+            pending = {pool.submit(self._loader.load, config_file): config_file}
+            while len(pending) > 0:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    fname = pending.pop(future)
+                    try:
+                        config_json = future.result()
+                    except (OSError, ValueError, FileNotExistError):
+                        continue
+                    self._docs[fname] = config_json
+                    for child in ParallelLoader.static_childs(fname, config_json):
+                        if child in seen:
+                            continue
+                        seen.add(child)
+                        pending.update({pool.submit(self._loader.load, child): child})
+
+    def load(self, config_file):
+        config_json = self._docs.get(config_file)
+        if config_json is None:
+            return self._loader.load(config_file)
+        return config_json
+
+    def is_trusted(self, config_file):
+        return self._loader.is_trusted(config_file)
+
+    def on_validated(self, config_file):
+        self._loader.on_validated(config_file)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __init__(self, workers=None, loader=None):
+        self._workers = workers
+        self._loader = loader if loader is not None else JConfigLoader()
+        self._docs = {}
+
+
+class MemoryLoader(JConfigLoader):
+    '''
+    keep decoded config files in memory to build the same tree many times (e.g. for each variant).
+    a file validated once is trusted afterwards, stale outputs are removed only once
+    '''
+
+    def load(self, config_file):
+        config_json = self._docs.get(config_file)
+        if config_json is None:
+            config_json = self._loader.load(config_file)
+            self._docs[config_file] = config_json
+        return config_json
+
+    def is_trusted(self, config_file):
+        return config_file in self._trusted or self._loader.is_trusted(config_file)
+
+    def on_validated(self, config_file):
+        self._trusted.add(config_file)
+        self._loader.on_validated(config_file)
+
+    def remove_stale(self, file_name):
+        if file_name in self._removed:
+            return
+        self._removed.add(file_name)
+        self._loader.remove_stale(file_name)
+
+    def __init__(self, loader=None):
+        self._loader = loader if loader is not None else JConfigLoader()
+        self._docs = {}
+        self._trusted = set()
+        self._removed = set()
+
+
+class AsyncLoader(JConfigLoader):
+    '''
+    loader for Resolver.resolve_async. reads of config files and removal of stale
+    outputs run on a thread pool so that event loop is never blocked, reads of statically
+    reachable childs are started as soon as their parent is decoded
+    '''
+
+    def try_load(self, config_file):
+        try:
+            return self._loader.load(config_file)
+        except (OSError, ValueError, FileNotExistError):
+            # raised again by synchronous load, in the same order as before
+            return None
+
+    def on_loaded(self, config_file, future):
+        config_json = future.result()
+        if config_json is None:
+            return
+        for child in ParallelLoader.static_childs(config_file, config_json):
+            self.fetch(child)
+
+    def fetch(self, config_file):
+        '''
+        start reading config_file (once) and return its future
+        '''
+        with self._lock:
+            future = self._futures.get(config_file)
+            if future is not None:
+                return future
+            future = self._executor.submit(self.try_load, config_file)
+            self._futures[config_file] = future
+        future.add_done_callback(lambda done: self.on_loaded(config_file, done))
+        return future
+
+    async def wait(self, config_file):
+        '''
+        wait until config_file is read and stale outputs next to it are removed
+        '''
+        # imported on first use, importing asyncio costs more than the rest of the package
+        import asyncio
+        removal = self._removals.pop(path.join(path.dirname(config_file), 'autorecipe.mk'), None)
+        if removal is not None:
+            await asyncio.wrap_future(removal)
+        await asyncio.wrap_future(self.fetch(config_file))
+
+    def load(self, config_file):
+        future = self._futures.get(config_file)
+        if future is not None and future.done() and future.result() is not None:
+            return future.result()
+        return self._loader.load(config_file)
+
+    def is_trusted(self, config_file):
+        return self._loader.is_trusted(config_file)
+
+    def on_validated(self, config_file):
+        self._loader.on_validated(config_file)
+
+    def remove_stale(self, file_name):
+        self._removals[file_name] = self._executor.submit(JConfigLoader.remove_stale, self, file_name)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __init__(self, workers=None, loader=None):
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._loader = loader if loader is not None else JConfigLoader()
+        self._futures = {}
+        self._removals = {}
+        # fetch is called from worker threads as well when a parent is decoded
+        self._lock = threading.Lock()
@@ -0,0 +1,109 @@
+from os import path
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .Bundle import SchemaBundle
+from .Cache import ParseCache
+from .Config import JConfig
+from .Fetcher import RepoFetcher
+from .Loader import MemoryLoader
+from .Resolver import Resolver
+from .SavedConfig import SavedConfigReader
+from .VariableMonitor import Monitor
+from .Writer import ConfigWriter
+
+
+class MatrixResolver:
+    '''
+    resolve one config tree against many saved configurations (variants) in a single process.
+    config files are decoded & validated once and shared by the trees of every variant,
+    each variant is resolved in its own Monitor scope and written into its own directory.
+    repos are collected but not fetched.
+    '''
+
+    CONFIG_FILE = '.config'
+    HEADER_FILE = 'autogen.h'
+
+    # per process resolver used by pool workers, keyed by config file, cache dir & bundle file
+    _WORKERS = {}
+
+    @staticmethod
+    def variant_name(values_file):
+        name = path.basename(values_file)
+        if name.endswith('.config') and name != '.config':
+            name = name[:-len('.config')]
+        return name
+
+    def resolve_variant(self, values_file, out_dir, keep_unchanged=False):
+        '''
+        returns list of files written for the variant
+        '''
+        values = SavedConfigReader().read(values_file)
+        with Monitor.scope():
+            root = JConfig(jconfig_file=self._config_file, root_dir=self._root_dir, loader=self._loader,
+                           lazy=True, fetcher=RepoFetcher())
+            Resolver(values).resolve(root)
+        if not path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+        writer = ConfigWriter(root, bool_macros=self._bool_macros)
+        return writer.emit(path.join(out_dir, MatrixResolver.CONFIG_FILE),
+                           path.join(out_dir, MatrixResolver.HEADER_FILE), keep_unchanged)
+
+    @staticmethod
+    def create_loader(config_file, cache_dir=None, bundle_file=None):
+        '''
+        loader reading through parse cache in cache_dir and / or from bundle_file
+        '''
+        loader = ParseCache(cache_dir) if cache_dir is not None else None
+        if bundle_file is not None:
+            loader = SchemaBundle(bundle_file, path.dirname(config_file), loader)
+        return loader
+
+    @staticmethod
+    def resolve_in_worker(config_file, root_dir, bool_macros, cache_dir, bundle_file, values_file, out_dir,
+                          keep_unchanged):
+        key = (config_file, cache_dir, bundle_file)
+        matrix = MatrixResolver._WORKERS.get(key)
+        if matrix is None:
+            matrix = MatrixResolver(config_file, root_dir, bool_macros=bool_macros, cache_dir=cache_dir,
+                                    bundle_file=bundle_file)
+            MatrixResolver._WORKERS.update({key: matrix})
+        return matrix.resolve_variant(values_file, out_dir, keep_unchanged)
+
+    def run(self, values_files, out_dir, workers=None, keep_unchanged=False):
+        '''
+        resolve each of values_files into out_dir/<variant name>, on a process pool of
+        workers processes if given. returns {variant name: [written files]}
+        '''
+        jobs = [(MatrixResolver.variant_name(values_file), values_file) for values_file in values_files]
+        names = [name for name, _ in jobs]
+        if len(set(names)) != len(names):
+            raise ValueError('variants should have distinct names : {}'.format(names))
+        result = {}
+        if workers is None:
+            for name, values_file in jobs:
+                result.update({name: self.resolve_variant(values_file, path.join(out_dir, name), keep_unchanged)})
+            return result
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(name, pool.submit(MatrixResolver.resolve_in_worker, self._config_file, self._root_dir,
+                                          self._bool_macros, self._cache_dir, self._bundle_file,
+                                          path.abspath(values_file),
+                                          path.abspath(path.join(out_dir, name)), keep_unchanged))
+                       for name, values_file in jobs]
+            for name, future in futures:
+                result.update({name: future.result()})
+        return result
+
+    def __init__(self, config_file, root_dir=None, loader=None, bool_macros=False, cache_dir=None, bundle_file=None):
+        '''
+        without loader, files are loaded through parse cache in cache_dir and / or from bundle_file,
+        which pool workers build the same way (a loader can't be passed to them)
+        '''
+        self._config_file = path.abspath(config_file)
+        self._root_dir = root_dir if root_dir is not None else path.abspath('./')
+        self._cache_dir = path.abspath(cache_dir) if cache_dir is not None else None
+        self._bundle_file = path.abspath(bundle_file) if bundle_file is not None else None
+        if loader is None:
+            loader = MatrixResolver.create_loader(self._config_file, self._cache_dir, self._bundle_file)
+        self._loader = MemoryLoader(loader)
+        self._bool_macros = bool_macros
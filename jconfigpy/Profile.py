@@ -0,0 +1,151 @@
+import importlib
+import threading
+import time
+
+
+class Profiler:
+    '''
+    phase level timing of jconfigpy. while enabled (e.g. with Profiler() as profiler: ...),
+    methods listed in HOOKS are replaced by wrappers recording the time spent in them and
+    the original methods are put back when disabled, so nothing is paid while disabled.
+    time of nested calls within a phase (e.g. emit -> write_genlist) is counted once,
+    phases themselves may nest (parse includes load of the file)
+
+    besides time per phase, time of parsing each config file and fan-out of
+    notifications (subscribers notified per variable) are recorded
+    '''
+
+    # phase -> [(module, class, method)]
+    HOOKS = {
+        'load': [('Loader', 'JConfigLoader', 'load'), ('Loader', 'ParallelLoader', 'load'),
+                 ('Loader', 'MemoryLoader', 'load'), ('Loader', 'AsyncLoader', 'load'),
+                 ('Cache', 'ParseCache', 'load')],
+        'parse': [('Config', 'JConfig', 'parse')],
+        'notify': [('VariableMonitor', 'Monitor', 'notify_variables'), ('VariableMonitor', 'Monitor', '_dispatch')],
+        'genlist': [('Item', 'JConfigItem', 'get_resolved_genlist')],
+        'repo': [('Recipe', 'JConfigRepo', 'resolve_repo')],
+        'emit': [('Writer', 'ConfigWriter', 'write'), ('Writer', 'ConfigWriter', 'emit_symbols'),
+                 ('Config', 'JConfig', 'write_recipe'), ('Config', 'JConfig', 'write_genlist')]
+    }
+
+    def add(self, phase, elapsed):
+        with self._lock:
+            stat = self._phases.setdefault(phase, [0, 0.0])
+            stat[0] += 1
+            stat[1] += elapsed
+
+    def on_parse(self, elapsed, config, *args):
+        with self._lock:
+            file_name = config.get_resolved_file()
+            self._files[file_name] = self._files.get(file_name, 0.0) + elapsed
+
+    def on_dispatch(self, elapsed, monitor, var_list, *args):
+        with self._lock:
+            for var in var_list:
+                stat = self._fanout.setdefault(var, [0, 0])
+                stat[0] += 1
+                stat[1] += monitor.count_subscribers(var)
+
+    def wrap(self, phase, func, record=None):
+        '''
+        returns func recording its time into phase (only the outermost call of the phase
+        in each thread), record(elapsed, *args) is called for every call
+        '''
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            depth = getattr(profiler._depth, phase, 0)
+            setattr(profiler._depth, phase, depth + 1)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                setattr(profiler._depth, phase, depth)
+                if depth == 0:
+                    profiler.add(phase, elapsed)
+                if record is not None:
+                    record(elapsed, *args)
+
+        wrapper.__wrapped__ = func
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+    def enable(self):
+        if self._patched:
+            raise ValueError('profiler is already enabled')
+        records = {'parse': self.on_parse, '_dispatch': self.on_dispatch}
+        for phase in Profiler.HOOKS:
+            for module, class_name, method in Profiler.HOOKS[phase]:
+                cls = getattr(importlib.import_module('.' + module, __package__), class_name)
+                func = cls.__dict__[method]
+                self._patched.append((cls, method, func))
+                setattr(cls, method, self.wrap(phase, func, records.get(method)))
+        self._start = time.perf_counter()
+
+    def disable(self):
+        if self._start is not None:
+            self._wall += time.perf_counter() - self._start
+            self._start = None
+        while len(self._patched) > 0:
+            cls, method, func = self._patched.pop()
+            setattr(cls, method, func)
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disable()
+        return False
+
+    def get_wall_time(self):
+        return self._wall
+
+    def get_phases(self):
+        '''
+        {phase: (calls, seconds)}
+        '''
+        return {phase: tuple(stat) for phase, stat in self._phases.items()}
+
+    def get_slowest_files(self, count=10):
+        '''
+        [(seconds, config file)] of the count slowest config files to parse
+        '''
+        return sorted(((elapsed, file_name) for file_name, elapsed in self._files.items()), reverse=True)[:count]
+
+    def get_fanout(self, count=10):
+        '''
+        [(subscribers notified, notifications, variable)] of the count variables notifying most subscribers
+        '''
+        return sorted(((stat[1], stat[0], var) for var, stat in self._fanout.items()), reverse=True)[:count]
+
+    def report(self, count=10):
+        report_str = 'Profile : {0:.4f}s wall\n'.format(self._wall)
+        for phase in Profiler.HOOKS:
+            if phase in self._phases:
+                calls, elapsed = self._phases[phase]
+                report_str += '  {0:<8} {1:>10.4f}s {2:>8} call(s)\n'.format(phase, elapsed, calls)
+        files = self.get_slowest_files(count)
+        if len(files) > 0:
+            report_str += 'Slowest config files ({0} parsed) :\n'.format(len(self._files))
+            for elapsed, file_name in files:
+                report_str += '  {0:>10.4f}s {1}\n'.format(elapsed, file_name)
+        fanout = self.get_fanout(count)
+        if len(fanout) > 0:
+            report_str += 'Notification fan-out ({0} variables) :\n'.format(len(self._fanout))
+            for subscribers, notifications, var in fanout:
+                report_str += '  {0:>8} subscriber(s) {1:>6} notification(s) {2}\n'.format(subscribers, notifications,
+                                                                                           var)
+        return report_str
+
+    def __init__(self):
+        self._phases = {}
+        self._files = {}
+        self._fanout = {}
+        self._patched = []
+        self._lock = threading.Lock()
+        self._depth = threading.local()
+        self._start = None
+        self._wall = 0.0
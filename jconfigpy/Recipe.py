@@ -1,23 +1,22 @@
+import glob
 import json
 from os import path
 import os
+import shutil
+import subprocess
+import threading
+import time
 
-try:
-    from jconfigpy.ErrorType import FileNotExistError
-    from jconfigpy.VariableMonitor import Monitor
-except ImportError:
-    from .ErrorType import FileNotExistError
-    from .VariableMonitor import Monitor
+from .ErrorType import FileNotExistError
+from .VariableMonitor import Monitor
 
 
 class JConfigRecipe:
 
-    def on_update_var(self, var, update_val):
-
-        if var in self._var_map:
-            self._var_map.update({var: update_val})
-        if var in self._unresolved_path:
-            self._unresolved_path.update({var: update_val})
+    def on_update_vars(self, updates):
+        for var, update_val in updates.items():
+            if var in self._unresolved_path:
+                self._unresolved_path.update({var: update_val})
 
     def get_resolved_path(self):
         return self._var_pub.resolve_path(self._path)
@@ -25,13 +24,13 @@ class JConfigRecipe:
     def __del__(self):
         if len(self._unresolved_path) > 0:
             for key in self._unresolved_path:
-                self._var_pub.unsubscribe_variable_change(key)
+                self._var_pub.unsubscribe_variable_change(key, self)
 
     def __init__(self, name='recipe', var_pub=None, base_dir='./', var_map=None, **kwargs):
         self._name = name
         self._path = None
         self._var_pub = var_pub
-        self._var_map = dict(var_map)
+        self._var_map = var_map if var_map is not None else {}
         self._base_dir = base_dir
         self._unresolved_path = {}
 
@@ -55,85 +54,164 @@ class JConfigRecipe:
 class JConfigRepo:
 
     LIB_DIR = []
+    _LIB_DIR_LOCK = threading.Lock()
 
-    def on_update_var(self, var, update_val):
-
-        if var in self._var_map:
-            self._var_map.update({var: update_val})
-        if var in self._unresolved_path:
-            self._unresolved_path.update({var: update_val})
+    def on_update_vars(self, updates):
+        for var, update_val in updates.items():
+            if var in self._unresolved_path:
+                self._unresolved_path.update({var: update_val})
 
     def get_resolved_path(self):
         return self._var_pub.resolve_path(self._path)
 
     @staticmethod
-    def build_repo(**kwargs):
-        make_cmd = kwargs.get('buildcmd')
+    def run_command(cmd, cwd, timeout=None):
+        '''
+        run cmd (list of arguments or shell command string) in cwd without touching
+        working directory of this process, returns captured output
+        '''
+        proc = subprocess.run(cmd, cwd=cwd, shell=isinstance(cmd, str), timeout=timeout,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = proc.stdout.decode('utf-8', 'replace')
+        if proc.returncode != 0:
+            raise OSError('command \'{0}\' failed ({1}) in {2}\n{3}'.format(cmd, proc.returncode, cwd, output))
+        return output
+
+    @staticmethod
+    def build_repo(repo_path, timeout=None, **kwargs):
+        make_cmd = kwargs.get('buildcmd', [])
         for cmd in make_cmd:
-            os.system(cmd)
+            JConfigRepo.run_command(cmd, repo_path, timeout)
 
-    def copy_output(self, out):
-        os.system('cp {0} {1}'.format(path.join(self._path, out), self._out_path))
+    def copy_output(self, out, src_dir=None):
+        for src in glob.glob(path.join(src_dir or self._path, out)):
+            shutil.copy(src, self._out_path)
 
-    def resolve_repo(self):
+    def get_name(self):
+        return self._name
+
+    def get_base_dir(self):
+        return self._base_dir
+
+    def prepare(self):
+        '''
+        substitute variables in paths with their current values
+        '''
         if len(self._unresolved_path) > 0:
             for idx, pv in enumerate(self._unresolved_path):
                 path_var = '$' + pv
                 self._path = self._path.replace(path_var, self._unresolved_path[pv])
+                # clone runs in and autorecipe.mk is written into base dir
+                self._base_dir = self._base_dir.replace(path_var, self._unresolved_path[pv])
                 self._out_path = self._out_path.replace(path_var, self._unresolved_path[pv])
+        return self._path
 
+    def fetch(self, timeout=None):
         print('Url : {0} / Path : {1}'.format(self._url, self._path))
         if not path.exists(self._path):
-            os.system('git clone {0} {1}'.format(self._url, self._path))
+            try:
+                JConfigRepo.run_command(['git', 'clone', self._url, self._path], self._base_dir, timeout)
+            except OSError as err:
+                raise FileNotExistError('Git operation fail {0}\n{1}'.format(self._url, err))
         if not path.exists(self._path):
             raise FileNotExistError('Git operation fail {}'.format(self._url))
-        os.chdir(self._path)
-        if path.abspath(os.curdir) != self._path:
-            raise OSError('chdir doesn\'t work curdir : {}'.format(path.abspath(os.curdir)))
-        if not path.exists(self._pkg):
+
+    def read_package(self):
+        '''
+        returns decoded package.json of the repo and its raw content
+        '''
+        pkg_file = path.join(self._path, self._pkg)
+        if not path.exists(pkg_file):
             raise FileNotExistError('File {} doesn\'t exists'.format(self._pkg))
-        package_headers = None
-        package_inc = None
-        output = None
-        output_inc = None
-        with open(self._pkg, 'r') as fp:
-            package_json = json.load(fp)
-            if package_json['name'] != self._name:
-                raise ValueError('Unexpected Package name : {}'.format(package_json['name']))
-            JConfigRepo.build_repo(**package_json)
-            package_headers = package_json['include']
-            package_inc = ''
-            output_inc = ''
-            output = package_json['output']
-            # version = package_json['version']
-        assert package_headers is not None
-        assert package_inc is not None
-        assert output is not None
-        assert output_inc is not None
-        os.chdir('../')
-        for inc in package_headers:
+        with open(pkg_file, 'rb') as fp:
+            data = fp.read()
+        package_json = json.loads(data.decode('utf-8'))
+        if package_json['name'] != self._name:
+            raise ValueError('Unexpected Package name : {}'.format(package_json['name']))
+        return package_json, data
+
+    def get_revision(self, timeout=None):
+        '''
+        commit hash of checked out source or None if it is not a git work tree
+        '''
+        try:
+            return JConfigRepo.run_command(['git', 'rev-parse', 'HEAD'], self._path, timeout).strip()
+        except OSError:
+            return None
+
+    def is_modified(self, timeout=None):
+        '''
+        whether tracked files of the checked out source differ from its revision
+        (untracked files, e.g. outputs of a previous build, are not counted)
+        '''
+        status = JConfigRepo.run_command(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                         self._path, timeout)
+        return len(status.strip()) > 0
+
+    def get_path_vars(self):
+        return self._unresolved_path
+
+    def build(self, timeout=None):
+        package_json, _ = self.read_package()
+        JConfigRepo.build_repo(self._path, timeout, **package_json)
+        return package_json
+
+    def install(self, package_json, src_dir=None):
+        '''
+        copy outputs of the package (from src_dir if given, otherwise from the source)
+        into out path and write autorecipe.mk next to config.json
+        '''
+        package_inc = ''
+        output_inc = ''
+        for inc in package_json['include']:
             package_inc += 'INC-y+={0}\n'.format(path.abspath(path.join(self._path, inc)))
         if not path.exists(self._out_path):
-            os.mkdir(self._out_path)
-        for out in output:
-            self.copy_output(out)
+            os.makedirs(self._out_path, exist_ok=True)
+        for out in package_json['output']:
+            self.copy_output(out, src_dir)
             if '.a' in out:
                 output_inc += 'SLIB-y+={0}\n'.format(out)
             elif '.so' in out:
                 output_inc += 'DLIB-y+={0}\n'.format(out)
-        with open('autorecipe.mk', 'w+') as fp:
+        with open(path.join(self._base_dir, 'autorecipe.mk'), 'w+') as fp:
             fp.write(output_inc)
             fp.write(package_inc)
             fp.write('REPO-y+={0}\n'.format(self._path))
-            if self._out_path not in JConfigRepo.LIB_DIR:
-                JConfigRepo.LIB_DIR.append(self._out_path)
-                fp.write('LDIR-y+={0}\n'.format(self._out_path))
-        os.chdir(self._root_dir)
+            with JConfigRepo._LIB_DIR_LOCK:
+                if self._out_path not in JConfigRepo.LIB_DIR:
+                    JConfigRepo.LIB_DIR.append(self._out_path)
+                    fp.write('LDIR-y+={0}\n'.format(self._out_path))
+
+    def resolve_repo(self, timeout=None, build_cache=None):
+        '''
+        fetch, build and install the repository, returns elapsed time of each step.
+        with build_cache, build is skipped and outputs are restored from the cache
+        when the revision, package.json and path variables are the same as a cached build
+        '''
+        self.prepare()
+        begin = time.perf_counter()
+        self.fetch(timeout)
+        fetched = time.perf_counter()
+        package_json, data = self.read_package()
+        key = None
+        entry_dir = None
+        if build_cache is not None:
+            key = build_cache.make_key(self, data, timeout)
+            entry_dir = build_cache.lookup(key)
+        if entry_dir is None:
+            JConfigRepo.build_repo(self._path, timeout, **package_json)
+            if build_cache is not None:
+                build_cache.store(key, self._path, package_json['output'])
+        built = time.perf_counter()
+        self.install(package_json, entry_dir)
+        timings = [('clone', fetched - begin), ('build' if entry_dir is None else 'cached', built - fetched),
+                   ('install', time.perf_counter() - built)]
+        return timings
 
     def __del__(self):
         if len(self._unresolved_path) > 0:
             for key in self._unresolved_path:
-                self._var_pub.unsubscribe_variable_change(key)
+                self._var_pub.unsubscribe_variable_change(key, self)
 
     def __init__(self, name='repo', var_pub=None, base_dir='./', root_dir=None, var_map=None, **kwargs):
         self._name = name
@@ -142,7 +220,7 @@ class JConfigRepo:
         self._var_pub = var_pub
         self._base_dir = base_dir
         self._root_dir = root_dir
-        self._var_map = dict(var_map)
+        self._var_map = var_map if var_map is not None else {}
         self._unresolved_path = {}
         self._url = kwargs.get('url')
         self._out_path = path.abspath(path.join(self._base_dir, kwargs.get('out', './dep/')))
@@ -0,0 +1,247 @@
+from contextlib import contextmanager
+
+from .Config import JConfig
+from .Loader import AsyncLoader
+
+
+class Resolver:
+    '''
+    resolve whole config tree from given values without any user interaction.
+    the resolved tree can be updated incrementally with changed values by update()
+    '''
+
+    # items without value take their default value
+    POLICY_DEFAULT = 'default'
+    # items without value are left unset
+    POLICY_SKIP = 'skip'
+    # every visible item which is not forced should have value
+    POLICY_STRICT = 'strict'
+
+    @staticmethod
+    def to_enum_index(item, val):
+        return item.get_enum().index(val)
+
+    # conversion of given value into value accepted by set_user_value of the type
+    _CONVERTERS = {
+        'enum': to_enum_index.__func__
+    }
+
+    def parse(self, config):
+        config.parse()
+        for item in config.get_items():
+            self._index.setdefault(item.get_name(), []).append(item)
+            self._owner.update({item: config})
+
+    def get_items(self, config):
+        '''
+        items of config, in the given order if any (e.g. an item before what it depends on)
+        '''
+        if self._order is None:
+            return config.get_items()
+        return sorted(config.get_items(), key=lambda item: self._order.get(item.get_name(), len(self._order)))
+
+    def get_childs(self, config):
+        '''
+        childs of config, with order given a child comes after those defining what it depends on
+        '''
+        if self._order is None:
+            return config.get_childs()
+        return sorted(config.get_childs(), key=lambda child: max((self._order.get(var, -1)
+                                                                  for var in child.get_depend()), default=-1))
+
+    def resolve_items(self, config):
+        self._active.add(config)
+        with config.get_monitor().batch():
+            for item in self.get_items(config):
+                if item.is_visible():
+                    self.resolve_item(item)
+
+    def resolve(self, config):
+        assert isinstance(config, JConfig)
+        if not config.is_visible():
+            return config
+        if not config.is_parsed():
+            self.parse(config)
+        self.resolve_items(config)
+        for child in self.get_childs(config):
+            self.resolve(child)
+        return config
+
+    async def resolve_async(self, config):
+        '''
+        same as resolve() for config created with AsyncLoader, but without blocking event loop.
+        configs are still resolved in the same order as resolve() (a subtree may depend on values
+        of subtrees before it), while the files of childs are read ahead concurrently
+        '''
+        assert isinstance(config, JConfig)
+        loader = config.get_loader()
+        assert isinstance(loader, AsyncLoader)
+        if not config.is_visible():
+            return config
+        if not config.is_parsed():
+            await loader.wait(config.get_resolved_file())
+            self.parse(config)
+        self.resolve_items(config)
+        for child in config.get_childs():
+            if child.is_visible():
+                loader.fetch(child.get_resolved_file())
+        for child in self.get_childs(config):
+            await self.resolve_async(child)
+        return config
+
+    def update(self, config, values):
+        '''
+        apply changed values onto config tree previously resolved by resolve() and
+        re-resolve only what is affected by the change. items and configs whose depend
+        or $VAR path refers to a changed variable report themselves through the monitor,
+        they are refreshed (and may report others in turn) until nothing is left
+        '''
+        self._values.update(values)
+        return self.reresolve(config, values)
+
+    def reresolve(self, config, names):
+        '''
+        resolve items of names again from current values and refresh what is affected
+        '''
+        assert isinstance(config, JConfig)
+        monitor = config.get_monitor()
+        with monitor.track() as dirty:
+            with monitor.batch():
+                for name in names:
+                    for item in self._index.get(name, []):
+                        if self._owner[item] in self._active and item.is_visible():
+                            if not self.resolve_item(item):
+                                item.clear_user_value()
+            while len(dirty) > 0:
+                target = dirty.popleft()
+                if isinstance(target, JConfig):
+                    self.refresh_config(target)
+                else:
+                    self.refresh_item(target)
+        return config
+
+    @contextmanager
+    def what_if(self, config, values):
+        '''
+        evaluate resolved config tree with hypothetical values within the block
+        (e.g. to see autogen.h with USE_MMU=y). values are applied by update() and
+        taken back the same way when the block exits, nothing of the tree is copied
+        '''
+        saved = self.get_values(values)
+        try:
+            yield self.update(config, values)
+        finally:
+            self.restore(config, values, saved)
+
+    def get_values(self, names):
+        '''
+        current values given for names, to be taken back by restore()
+        '''
+        return {name: self._values[name] for name in names if name in self._values}
+
+    def restore(self, config, names, saved):
+        '''
+        take values of names back to saved (by get_values()) and refresh what is affected
+        '''
+        for name in names:
+            if name in saved:
+                self._values[name] = saved[name]
+            else:
+                self._values.pop(name, None)
+        return self.reresolve(config, names)
+
+    def refresh_item(self, item):
+        config = self._owner.get(item)
+        if config is None or config not in self._active:
+            return
+        is_set = config.get_monitor().lookup_variable(item.get_name()) is not None
+        if item.is_visible():
+            if not is_set:
+                self.resolve_item(item)
+        elif is_set and not self.is_defined(item.get_name()):
+            item.clear_user_value()
+
+    def refresh_config(self, config):
+        parent = config.get_parent()
+        if parent is not None and (parent not in self._active or config not in parent.get_childs()):
+            # parent is inactive or config is dropped from the parent by reset
+            return
+        if config.is_stale():
+            # $VAR in the path is changed, config is parsed again from the new path
+            self.deactivate(config)
+            self.forget(config)
+            config.reset()
+        if config.is_visible():
+            if config not in self._active:
+                self.resolve(config)
+        elif config in self._active:
+            self.deactivate(config)
+
+    def is_defined(self, name):
+        '''
+        whether any visible item of active config has the name
+        '''
+        for item in self._index.get(name, []):
+            if self._owner[item] in self._active and item.is_visible():
+                return True
+        return False
+
+    def deactivate(self, config):
+        '''
+        drop values of every item in config and its descendants
+        '''
+        configs = [sub_config for sub_config in config.walk() if sub_config in self._active]
+        self._active.difference_update(configs)
+        with config.get_monitor().batch():
+            for sub_config in configs:
+                for item in sub_config.get_items():
+                    if not self.is_defined(item.get_name()):
+                        item.clear_user_value()
+
+    def forget(self, config):
+        for sub_config in config.walk():
+            for item in sub_config.get_items():
+                self._owner.pop(item, None)
+                items = self._index.get(item.get_name(), [])
+                if item in items:
+                    items.remove(item)
+
+    def resolve_item(self, item):
+        '''
+        returns whether a value is assigned to the item
+        '''
+        if item.is_forced():
+            item.set_user_value(item.get_default_value())
+            return True
+        name = item.get_name()
+        if name in self._values:
+            val = self._values[name]
+            converter = Resolver._CONVERTERS.get(item.get_type())
+            if converter is not None:
+                val = converter(item, val)
+            item.set_user_value(val)
+            return True
+        if self._policy == Resolver.POLICY_STRICT:
+            raise ValueError('no value for CONFIG_{}'.format(name))
+        if self._policy == Resolver.POLICY_DEFAULT:
+            val = item.get_default_value()
+            if val is not None and val != '':
+                item.set_user_value(val)
+                return True
+        return False
+
+    def __init__(self, values=None, policy=POLICY_DEFAULT, order=None):
+        '''
+        order is {name: rank} of symbols (e.g. Analyzer.get_ranks()), items of each config are
+        resolved by the rank and childs after what their depend refers to, so that a single pass
+        resolves items depending on what is defined after them
+        '''
+        if policy not in (Resolver.POLICY_DEFAULT, Resolver.POLICY_SKIP, Resolver.POLICY_STRICT):
+            raise ValueError('unknown policy : {}'.format(policy))
+        self._values = values if values is not None else {}
+        self._policy = policy
+        self._order = order
+        # state of resolved tree kept for update()
+        self._index = {}
+        self._owner = {}
+        self._active = set()
@@ -0,0 +1,75 @@
+import mmap
+import os
+
+
+class SavedConfigReader:
+    '''
+    single pass reader of saved configuration (.config)
+
+    CONFIG_X=value          value of X (surrounding double quotes are removed)
+    # CONFIG_X is not set   X is 'n'
+    # comment, empty line   ignored
+    anything else           ignored (make directives like include / DEF+= written with .config)
+    '''
+
+    # files larger than this are read through mmap
+    MMAP_THRESHOLD = 1 << 20
+    _PREFIX = 'CONFIG_'
+    _NOT_SET_PREFIX = '# CONFIG_'
+    _NOT_SET_SUFFIX = ' is not set'
+    _NOT_SET_VALUE = 'n'
+
+    @staticmethod
+    def unquote(val, lineno):
+        if len(val) < 2 or val[-1] != '"':
+            raise ValueError('line {0} : unterminated quote in {1}'.format(lineno, val))
+        val = val[1:-1]
+        if '\\' in val:
+            val = val.replace('\\"', '"').replace('\\\\', '\\')
+        return val
+
+    @staticmethod
+    def parse_line(lin, lineno=0):
+        '''
+        returns (key, value) of the line or None if line doesn't define any value
+        '''
+        if lin.startswith(SavedConfigReader._PREFIX):
+            key, sep, val = lin[len(SavedConfigReader._PREFIX):].partition('=')
+            if sep == '' or not key.replace('_', 'a').isalnum():
+                raise ValueError('line {0} : invalid config {1}'.format(lineno, lin.rstrip()))
+            val = val.rstrip()
+            if val.startswith('"'):
+                val = SavedConfigReader.unquote(val, lineno)
+            return key, val
+        if lin.startswith(SavedConfigReader._NOT_SET_PREFIX):
+            lin = lin.rstrip()
+            if lin.endswith(SavedConfigReader._NOT_SET_SUFFIX):
+                key = lin[len(SavedConfigReader._NOT_SET_PREFIX):-len(SavedConfigReader._NOT_SET_SUFFIX)]
+                return key, SavedConfigReader._NOT_SET_VALUE
+        return None
+
+    def read_lines(self, lines):
+        kv_map = {}
+        parse_line = SavedConfigReader.parse_line
+        for lineno, lin in enumerate(lines, 1):
+            if lin[:1] not in ('C', '#'):
+                continue
+            kv = parse_line(lin, lineno)
+            if kv is not None:
+                kv_map[kv[0]] = kv[1]
+        return kv_map
+
+    def read(self, config_file, use_mmap=None):
+        if use_mmap is None:
+            use_mmap = os.stat(config_file).st_size >= self._mmap_threshold
+        if not use_mmap:
+            with open(config_file, 'r') as fp:
+                return self.read_lines(fp)
+        with open(config_file, 'rb') as fp:
+            if os.fstat(fp.fileno()).st_size == 0:
+                return {}
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self.read_lines(lin.decode('utf-8') for lin in iter(mm.readline, b''))
+
+    def __init__(self, mmap_threshold=MMAP_THRESHOLD):
+        self._mmap_threshold = mmap_threshold
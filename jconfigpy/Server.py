@@ -0,0 +1,238 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+from os import path
+
+from .Client import ConfigClient
+from .Config import JConfig
+from .ErrorType import FileNotExistError
+from .Resolver import Resolver
+from .SavedConfig import SavedConfigReader
+from .VariableMonitor import Monitor
+from .Writer import ConfigWriter
+
+
+class ConfigRequestHandler(socketserver.StreamRequestHandler):
+    '''
+    each line of the connection is a JSON request {"op": ..., ...} answered by a JSON line
+    '''
+
+    def handle(self):
+        for lin in self.rfile:
+            if len(lin.strip()) == 0:
+                continue
+            try:
+                request = json.loads(lin.decode('utf-8'))
+                response = self.server.config_server.handle_request(request)
+                response.update({'ok': True})
+            except ConfigServer.ERRORS as err:
+                response = {'ok': False, 'error': '{0}: {1}'.format(type(err).__name__, err)}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ConfigServer:
+    '''
+    long running resolver keeping the parsed config tree in memory.
+    config files loaded into the tree are checked (by mtime) on each request, the tree is
+    built again when any of them is modified, while change of saved configuration is
+    applied incrementally.
+    the tree is built in its own Monitor scope, requests are served one at a time
+
+    ops :
+    ping                                    -> {}
+    query [keys]                            -> {"values": {key: value}}
+    resolve values                          -> {"values": {key: value}} changed values are applied
+    symbol keys [recursive]                 -> {"symbols": {key: summary}} of SymbolIndex.describe
+    search prefix                           -> {"names": [name]} of symbols starting with prefix
+    emit config header [keep_unchanged]     -> {"updated": [file], "changed": [key]}
+         [symbols]
+    reload                                  -> {} build the tree again
+    shutdown                                -> {}
+    '''
+
+    DEFAULT_SOCKET = ConfigClient.DEFAULT_SOCKET
+    # errors of a request answered to the client, FileNotExistError is not an Exception
+    ERRORS = (FileNotExistError, OSError, ValueError, KeyError, TypeError)
+
+    def get_files(self):
+        '''
+        config files loaded into the tree (and saved configuration)
+        '''
+        files = [config.get_resolved_file() for config in self._root.walk() if config.is_parsed()]
+        if self._values_file is not None:
+            files.append(self._values_file)
+        return files
+
+    @staticmethod
+    def stamp(file_name):
+        try:
+            return os.stat(file_name).st_mtime_ns
+        except OSError:
+            return None
+
+    def take_stamps(self):
+        self._stamps = {file_name: ConfigServer.stamp(file_name) for file_name in self.get_files()}
+
+    def read_values(self):
+        if self._values_file is None or not path.exists(self._values_file):
+            return {}
+        return SavedConfigReader().read(self._values_file)
+
+    def build(self):
+        self._root = None
+        loader = self._loader_factory(self._config_file) if self._loader_factory is not None else None
+        fetcher = self._fetcher_factory() if self._fetcher_factory is not None else None
+        self._values = self.read_values()
+        self._resolver = Resolver(dict(self._values))
+        with Monitor.scope():
+            self._root = JConfig(jconfig_file=self._config_file, root_dir=self._root_dir, loader=loader,
+                                 lazy=True, fetcher=fetcher)
+        self._resolver.resolve(self._root)
+        if fetcher is not None:
+            fetcher.run()
+        self.take_stamps()
+
+    def refresh(self):
+        '''
+        bring the tree up to date with files modified since the last request
+        '''
+        modified = [file_name for file_name in self._stamps
+                    if ConfigServer.stamp(file_name) != self._stamps[file_name]]
+        if len(modified) == 0:
+            return
+        if modified != [self._values_file]:
+            self.build()
+            return
+        values = self.read_values()
+        changed = {key: values[key] for key in values if self._values.get(key) != values[key]}
+        self._values = values
+        self.update(changed)
+
+    def update(self, values):
+        '''
+        values which can't be applied (e.g. $VAR path to a missing config) are taken back,
+        the tree is built again when even that fails
+        '''
+        saved = self._resolver.get_values(values)
+        try:
+            self._resolver.update(self._root, values)
+        except ConfigServer.ERRORS:
+            try:
+                self._resolver.restore(self._root, values, saved)
+            except ConfigServer.ERRORS:
+                self.build()
+            raise
+        finally:
+            self.take_stamps()
+
+    def query(self, keys=None):
+        var_map = {}
+        self._root.get_monitor().get_update(var_map)
+        if keys is None:
+            return var_map
+        return {key: var_map.get(key) for key in keys}
+
+    def describe(self, keys, recursive=False):
+        symbols = self._root.get_symbols()
+        return {key: symbols.describe(key, recursive) for key in keys}
+
+    def emit(self, config, header, keep_unchanged=False, symbols=None):
+        writer = ConfigWriter(self._root)
+        updated = writer.emit(config, header, keep_unchanged)
+        if symbols is not None:
+            writer.emit_symbols(symbols)
+        # outputs may overwrite saved configuration being watched
+        self.take_stamps()
+        return {'updated': updated, 'changed': writer.get_changed_keys()}
+
+    def handle_request(self, request):
+        op = request['op']
+        with self._lock:
+            if op == 'shutdown':
+                threading.Thread(target=self._server.shutdown).start()
+                return {}
+            if op == 'reload':
+                self.build()
+                return {}
+            self.refresh()
+            if op == 'ping':
+                return {}
+            if op == 'query':
+                return {'values': self.query(request.get('keys'))}
+            if op == 'resolve':
+                values = request['values']
+                self.update(values)
+                return {'values': self.query(list(values))}
+            if op == 'symbol':
+                return {'symbols': self.describe(request['keys'], request.get('recursive', False))}
+            if op == 'search':
+                return {'names': self._root.get_symbols().search(request['prefix'])}
+            if op == 'emit':
+                return self.emit(request['config'], request['header'], request.get('keep_unchanged', False),
+                                 request.get('symbols'))
+        raise ValueError('unknown op : {}'.format(op))
+
+    def is_serving(self):
+        '''
+        whether a server answers on the socket path, a socket left by a server
+        which is not running anymore refuses connection
+        '''
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._socket_path)
+            return True
+        except ConnectionRefusedError:
+            return False
+        finally:
+            sock.close()
+
+    def bind(self):
+        '''
+        create the socket, the path is taken over only from a server which is not running anymore
+        '''
+        if path.exists(self._socket_path):
+            if not stat.S_ISSOCK(os.stat(self._socket_path).st_mode):
+                raise ValueError('{} exists and is not a socket'.format(self._socket_path))
+            if self.is_serving():
+                raise ValueError('another server is running on {}'.format(self._socket_path))
+            os.remove(self._socket_path)
+        self._server = ThreadingUnixServer(self._socket_path, ConfigRequestHandler)
+        self._server.config_server = self
+
+    def serve_forever(self):
+        if self._server is None:
+            self.bind()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if path.exists(self._socket_path):
+                os.remove(self._socket_path)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+    def __init__(self, config_file, values_file=None, socket_path=DEFAULT_SOCKET, root_dir=None,
+                 loader_factory=None, fetcher_factory=None):
+        self._config_file = path.abspath(config_file)
+        self._values_file = path.abspath(values_file) if values_file is not None else None
+        self._socket_path = path.abspath(socket_path)
+        self._root_dir = root_dir if root_dir is not None else path.abspath('./')
+        self._loader_factory = loader_factory
+        self._fetcher_factory = fetcher_factory
+        self._lock = threading.Lock()
+        self._server = None
+        self._stamps = {}
+        self._values = {}
+        self._resolver = None
+        self._root = None
+        self.build()
@@ -0,0 +1,67 @@
+import hashlib
+import marshal
+import os
+from os import path
+
+
+class BuildStamp:
+    '''
+    record of the files read and written by a non-interactive run (-s -n) kept in cache dir.
+    when none of them (nor any imported environment variable) has changed since, the outputs
+    are up to date and the run is skipped without loading the config tree.
+    only standard modules are imported here to keep the fast path cheap.
+    '''
+
+    _VERSION = 1
+
+    @staticmethod
+    def make_key(*args):
+        return hashlib.sha1('\0'.join(str(arg) for arg in args).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def stat(file_name):
+        try:
+            st = os.stat(file_name)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def is_fresh(self):
+        try:
+            with open(self._stamp_file, 'rb') as fp:
+                stamp = marshal.load(fp)
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        if not isinstance(stamp, tuple) or len(stamp) != 3 or stamp[0] != BuildStamp._VERSION:
+            return False
+        _, files, environ = stamp
+        for file_name, st in files:
+            if BuildStamp.stat(file_name) != st:
+                return False
+        for name, val in environ:
+            if os.environ.get(name) != val:
+                return False
+        return True
+
+    def save(self, files, environ_names=()):
+        '''
+        record current state of files, to be called once all outputs are written
+        '''
+        files = tuple((file_name, BuildStamp.stat(file_name)) for file_name in files)
+        environ = tuple((name, os.environ.get(name)) for name in sorted(set(environ_names)))
+        temp_file = '{0}.{1}'.format(self._stamp_file, os.getpid())
+        try:
+            os.makedirs(path.dirname(self._stamp_file), exist_ok=True)
+            with open(temp_file, 'wb') as fp:
+                marshal.dump((BuildStamp._VERSION, files, environ), fp)
+            os.replace(temp_file, self._stamp_file)
+        except (OSError, ValueError):
+            # stamp is only an optimization, failing to store it is not an error
+            if path.exists(temp_file):
+                os.remove(temp_file)
+
+    def __init__(self, cache_dir, *args):
+        '''
+        args identify the run (input / output files & options), each combination has its own stamp
+        '''
+        self._stamp_file = path.join(cache_dir, 'stamp', BuildStamp.make_key(*args))
@@ -0,0 +1,152 @@
+import bisect
+
+
+class SymbolIndex:
+    '''
+    symbols of a config tree, filled while its configs are parsed and shared by all of them
+    (like the monitor). each name is mapped to its item(s) and defining config file, each
+    variable to items & configs depending on it and each gen-list output to its item, so that
+    lookup and reverse dependency are dict accesses and prefix search is a bisect over the
+    sorted names (sorted again only after the tree has changed)
+    '''
+
+    def add(self, item, config_file):
+        name = item.get_name()
+        self._symbols.setdefault(name, {}).update({item: config_file})
+        for var in item.get_depend():
+            self._dependants.setdefault(var, {}).update({item: None})
+        for output in item.get_genlist_keys():
+            self._outputs.update({output: item})
+        self._names = None
+
+    def add_config(self, config):
+        for var in config.get_depend():
+            self._dependants.setdefault(var, {}).update({config: None})
+
+    def remove(self, item):
+        name = item.get_name()
+        definitions = self._symbols.get(name, {})
+        definitions.pop(item, None)
+        if len(definitions) == 0:
+            self._symbols.pop(name, None)
+            self._names = None
+        for var in item.get_depend():
+            self.discard_dependant(var, item)
+        for output in item.get_genlist_keys():
+            if self._outputs.get(output) is item:
+                self._outputs.pop(output)
+
+    def remove_config(self, config):
+        for var in config.get_depend():
+            self.discard_dependant(var, config)
+
+    def discard_dependant(self, var, dependant):
+        dependants = self._dependants.get(var)
+        if dependants is None:
+            return
+        dependants.pop(dependant, None)
+        if len(dependants) == 0:
+            self._dependants.pop(var)
+
+    def lookup_all(self, name):
+        '''
+        [(item, config file)] of every definition of name
+        '''
+        return list(self._symbols.get(name, {}).items())
+
+    def lookup(self, name):
+        '''
+        (item, config file) of name, the visible definition when defined more than once,
+        None when name is not defined
+        '''
+        definitions = self._symbols.get(name)
+        if definitions is None:
+            return None
+        if len(definitions) > 1:
+            for item, config_file in definitions.items():
+                if item.is_visible():
+                    return item, config_file
+        return next(iter(definitions.items()))
+
+    def get_item(self, name):
+        found = self.lookup(name)
+        return found[0] if found is not None else None
+
+    def get_file(self, name):
+        found = self.lookup(name)
+        return found[1] if found is not None else None
+
+    def get_dependants(self, name, recursive=False):
+        '''
+        items & configs depending on name, with recursive also those depending on them
+        '''
+        dependants = list(self._dependants.get(name, {}))
+        if not recursive:
+            return dependants
+        seen = set(dependants)
+        idx = 0
+        while idx < len(dependants):
+            dependant = dependants[idx]
+            idx += 1
+            if dependant.get_name() in self._symbols:
+                for sub in self._dependants.get(dependant.get_name(), {}):
+                    if sub not in seen:
+                        seen.add(sub)
+                        dependants.append(sub)
+        return dependants
+
+    def find_output(self, output):
+        '''
+        item whose gen-list defines output (macro), None when none does
+        '''
+        return self._outputs.get(output)
+
+    def search(self, prefix):
+        '''
+        sorted names starting with prefix
+        '''
+        if self._names is None:
+            self._names = sorted(self._symbols)
+        names = self._names
+        found = []
+        idx = bisect.bisect_left(names, prefix)
+        while idx < len(names) and names[idx].startswith(prefix):
+            found.append(names[idx])
+            idx += 1
+        return found
+
+    def describe(self, name, recursive=False):
+        '''
+        JSON friendly summary of name, None when name is not defined
+        '''
+        found = self.lookup(name)
+        if found is None:
+            return None
+        item, config_file = found
+        visible = item.is_visible()
+        genlist = item.get_resolved_genlist() if visible else dict.fromkeys(item.get_genlist_keys())
+        return {
+            'name': name,
+            'type': item.get_type(),
+            'file': config_file,
+            'value': item.get_user_value() if visible else None,
+            'visible': visible,
+            'depend': list(item.get_depend()),
+            'dependants': [dependant.get_name() for dependant in self.get_dependants(name, recursive)],
+            'gen-list': genlist
+        }
+
+    def __contains__(self, name):
+        return name in self._symbols
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def __init__(self):
+        # name -> {item: config file}, dicts are used as ordered sets
+        self._symbols = {}
+        # variable -> {item or config: None}
+        self._dependants = {}
+        # gen-list output -> item
+        self._outputs = {}
+        self._names = None
@@ -1,32 +1,240 @@
 from os import path
+from collections import ChainMap
+from collections import deque
+from types import MappingProxyType
+from contextlib import contextmanager
 import io
+import threading
 
 
 class Monitor:
 
     _SINGLE_OBJECT = None
     _FILE_WRITE_FORMAT = 'CONFIG_{var}={val}\n'
+    _MISSING = object()
+    # monitors of scopes entered by each thread, innermost last
+    _SCOPES = threading.local()
 
     def __new__(cls):
+        scopes = getattr(cls._SCOPES, 'stack', None)
+        if scopes:
+            return scopes[-1]
         if cls._SINGLE_OBJECT is None:
             cls._SINGLE_OBJECT = super(Monitor, cls).__new__(cls)
         return cls._SINGLE_OBJECT
 
+    @staticmethod
+    @contextmanager
+    def scope():
+        '''
+        within the block, Monitor() of the calling thread is a new monitor instead of the
+        process wide one, so that config trees built in the block are isolated from others.
+        the trees keep using the monitor after the block exits
+        '''
+        monitor = super(Monitor, Monitor).__new__(Monitor)
+        monitor.__init__()
+        scopes = getattr(Monitor._SCOPES, 'stack', None)
+        if scopes is None:
+            scopes = []
+            Monitor._SCOPES.stack = scopes
+        scopes.append(monitor)
+        try:
+            yield monitor
+        finally:
+            scopes.pop()
+
     def __init__(self):
         # Only initialize once
         if not hasattr(self, '_initialized'):
             self._var_map = {}
+            self._view = MappingProxyType(self._var_map)
+            # var -> {subscriber : subscription sequence}, insertion ordered set
             self._sub_map = {}
+            # var -> {subscriber : expected value}
+            self._dep_map = {}
+            # subscriber -> [number of satisfied conditions, depend]
+            self._dep_count = {}
+            # subscriber -> {var : None}, variables it subscribes
+            self._sub_vars = {}
+            # var -> subscriber named after the variable (the item which sets it)
+            self._publisher = {}
+            # subscriber -> rank in dependency order, dropped when subscriptions change
+            self._rank = {}
+            self._seq = 0
+            # var -> value before the batch, pending notification until commit
+            self._batch = None
+            self._undo = []
+            # subscribers reporting their state changed, collected only while tracking
+            self._dirty = None
             self._initialized = True
 
     def notify_variable_change(self, var, update_val):
-        if var not in self._var_map:
-            self._var_map.update({var: update_val})
+        self.notify_variables({var: update_val})
+
+    def notify_variables(self, var_map):
+        '''
+        update variables and propagate the change to subscribers.
+        dependency counters are updated per edge, then every affected subscriber
+        is notified once with all of its changed variables by on_update_vars().
+        subscribers are notified in dependency order: one whose variable is set by
+        another subscriber comes after it, otherwise in subscription order (parents
+        subscribe before their childs).
+        within a batch, values & counters are updated immediately but notification
+        is deferred until the batch is committed
+        '''
+        if self._batch is not None:
+            for var in var_map:
+                if var not in self._batch:
+                    self._batch[var] = self._var_map.get(var, Monitor._MISSING)
+            self._apply(var_map)
+            return
+        self._apply(var_map)
+        self._dispatch(var_map)
+
+    def _apply(self, var_map):
+        for var, update_val in var_map.items():
+            prev_val = self._var_map.get(var, None)
+            if update_val is Monitor._MISSING:
+                self._var_map.pop(var, None)
+                update_val = None
+            else:
+                self._var_map[var] = update_val
+            if prev_val != update_val and var in self._dep_map:
+                for subsc, expected in self._dep_map[var].items():
+                    was_met = prev_val is not None and prev_val == expected
+                    is_met = update_val is not None and update_val == expected
+                    if was_met != is_met:
+                        self._dep_count[subsc][0] += 1 if is_met else -1
+
+    def _get_rank(self, subsc):
+        '''
+        0 for subscriber not depending on other subscribers, otherwise one more than
+        the highest rank of subscribers setting its variables (cycles are cut)
+        '''
+        rank = self._rank.get(subsc)
+        if rank is not None:
+            return rank
+        self._rank[subsc] = 0
+        rank = 0
+        for var in self._sub_vars.get(subsc, ()):
+            pub = self._publisher.get(var)
+            if pub is not None and pub is not subsc:
+                rank = max(rank, self._get_rank(pub) + 1)
+        self._rank[subsc] = rank
+        return rank
+
+    def _dispatch(self, var_list):
+        if len(var_list) == 1:
+            # every subscriber gets the same (read-only) updates
+            var = next(iter(var_list))
+            subs = self._sub_map.get(var)
+            if not subs:
+                return
+            updates = MappingProxyType({var: self._var_map.get(var, None)})
+            affected = {subsc: (seq, updates) for subsc, seq in subs.items()}
         else:
-            self._var_map[var] = update_val
-        if var in self._sub_map:
-            for subsc in self._sub_map[var]:
-                subsc.on_update_var(var, update_val)
+            affected = {}
+            for var in var_list:
+                subs = self._sub_map.get(var)
+                if not subs:
+                    continue
+                update_val = self._var_map.get(var, None)
+                for subsc, seq in subs.items():
+                    if subsc in affected:
+                        affected[subsc][1][var] = update_val
+                    else:
+                        affected[subsc] = (seq, {var: update_val})
+        rank = self._rank
+        get_rank = self._get_rank
+        subscribers = sorted(affected, key=lambda sub: (rank[sub] if sub in rank else get_rank(sub), affected[sub][0]))
+        for subsc in subscribers:
+            subsc.on_update_vars(affected[subsc][1])
+
+    @contextmanager
+    def batch(self):
+        '''
+        collect variable changes and notify subscribers once when the block exits.
+        if the block raises (e.g. ValueError from set_user_value), every variable and
+        every registered undo action is rolled back and nothing is notified.
+        nested batches join the outermost one
+        '''
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = {}
+        self._undo = []
+        try:
+            yield self
+        except BaseException:
+            prev_map = self._batch
+            undo = self._undo
+            self._batch = None
+            self._undo = []
+            self._apply(prev_map)
+            for action, arg in reversed(undo):
+                action(arg)
+            raise
+        changed = [var for var, prev_val in self._batch.items()
+                   if self._var_map.get(var, Monitor._MISSING) != prev_val]
+        self._batch = None
+        self._undo = []
+        self._dispatch(changed)
+
+    def unset_variable(self, var):
+        '''
+        remove variable, subscribers are notified with None
+        '''
+        if var in self._var_map:
+            self.notify_variables({var: Monitor._MISSING})
+
+    @contextmanager
+    def track(self):
+        '''
+        collect subscribers which report (by mark_dirty) that their state is affected by
+        variable changes made within the block, in the order of the notification
+        '''
+        prev = self._dirty
+        self._dirty = deque()
+        try:
+            yield self._dirty
+        finally:
+            self._dirty = prev
+
+    def mark_dirty(self, subscriber):
+        if self._dirty is not None:
+            self._dirty.append(subscriber)
+
+    def apply(self, var_map):
+        with self.batch():
+            self.notify_variables(var_map)
+
+    def add_undo(self, action, arg):
+        '''
+        register action(arg) to be called when the current batch is rolled back
+        '''
+        if self._batch is not None:
+            self._undo.append((action, arg))
+
+    def in_batch(self):
+        return self._batch is not None
+
+    def get_view(self):
+        '''
+        read-only, always up to date view of variables
+        '''
+        return self._view
+
+    def get_scope(self, var_map=None):
+        '''
+        variables layered over var_map without copying either of them, lookups fall
+        back to var_map only for variables not (yet) set in this monitor
+        '''
+        if not var_map:
+            return ChainMap(self._view)
+        return ChainMap(self._view, var_map)
+
+    def count_subscribers(self, var):
+        return len(self._sub_map.get(var, ()))
 
     def lookup_variable(self, var):
         if var not in self._var_map:
@@ -41,17 +249,68 @@ class Monitor:
         return True
 
     def subscribe_variable_change(self, var, config_item):
-        try:
-            sub_list = self._sub_map[var]
-        except KeyError:
-            self._sub_map.update({var: []})
-            sub_list = self._sub_map[var]
-        sub_list.append(config_item)
+        subs = self._sub_map.get(var)
+        if subs is None:
+            subs = {}
+            self._sub_map.update({var: subs})
+        if config_item not in subs:
+            self._seq += 1
+            subs[config_item] = self._seq
+            sub_vars = self._sub_vars.get(config_item)
+            if sub_vars is None:
+                sub_vars = {}
+                self._sub_vars[config_item] = sub_vars
+            sub_vars[var] = None
+            self._rank.clear()
 
     def unsubscribe_variable_change(self, var, config_item):
         if var not in self._sub_map:
             return
-        self._sub_map[var].remove(config_item)
+        if self._sub_map[var].pop(config_item, None) is None:
+            return
+        sub_vars = self._sub_vars[config_item]
+        sub_vars.pop(var, None)
+        if len(sub_vars) == 0:
+            del self._sub_vars[config_item]
+        self._rank.clear()
+
+    def subscribe_depend(self, config_item, depend):
+        '''
+        subscribe changes of all variables in depend and keep count of satisfied conditions,
+        returns whether the whole depend is satisfied. config_item is taken as the one
+        setting the variable of its name (get_name()) for the order of notification
+        '''
+        self._publisher[config_item.get_name()] = config_item
+        self._rank.clear()
+        satisfied = 0
+        for var, expected in depend.items():
+            edges = self._dep_map.get(var)
+            if edges is None:
+                edges = {}
+                self._dep_map.update({var: edges})
+            edges[config_item] = expected
+            cval = self._var_map.get(var, None)
+            if cval is not None and cval == expected:
+                satisfied += 1
+            self.subscribe_variable_change(var, config_item)
+        self._dep_count[config_item] = [satisfied, depend]
+        return satisfied == len(depend)
+
+    def unsubscribe_depend(self, config_item):
+        state = self._dep_count.pop(config_item, None)
+        if state is None:
+            return
+        if self._publisher.get(config_item.get_name()) is config_item:
+            del self._publisher[config_item.get_name()]
+        for var in state[1]:
+            self._dep_map[var].pop(config_item, None)
+            self.unsubscribe_variable_change(var, config_item)
+
+    def is_satisfied(self, config_item):
+        state = self._dep_count.get(config_item)
+        if state is None:
+            return True
+        return state[0] == len(state[1])
 
     def resolve_path(self, pth):
         if '$' not in pth:
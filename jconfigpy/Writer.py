@@ -0,0 +1,201 @@
+import hashlib
+import os
+import tempfile
+from os import path
+
+from .SavedConfig import SavedConfigReader
+
+
+class AtomicFile:
+    '''
+    buffered file which is written to a temporary file next to the target
+    and renamed over the target only when the whole content is written
+    '''
+
+    BUFFER_SIZE = 1 << 16
+
+    @staticmethod
+    def digest(file_name):
+        sha = hashlib.sha1()
+        with open(file_name, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(AtomicFile.BUFFER_SIZE), b''):
+                sha.update(chunk)
+        return sha.digest()
+
+    def is_same(self):
+        if not path.exists(self._file_name):
+            return False
+        if os.stat(self._file_name).st_size != os.stat(self._temp_file).st_size:
+            return False
+        return AtomicFile.digest(self._file_name) == AtomicFile.digest(self._temp_file)
+
+    def is_changed(self):
+        return self._changed
+
+    @staticmethod
+    def file_mode(file_name):
+        if path.exists(file_name):
+            return os.stat(file_name).st_mode & 0o777
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+    def __enter__(self):
+        fd, self._temp_file = tempfile.mkstemp(dir=path.dirname(self._file_name),
+                                               prefix='.{}.'.format(path.basename(self._file_name)))
+        self._fp = os.fdopen(fd, 'w', buffering=AtomicFile.BUFFER_SIZE)
+        return self._fp
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self._fp.close()
+            if exc_type is None:
+                if self._keep_unchanged and self.is_same():
+                    # leave the file (and its mtime) as it is
+                    self._changed = False
+                else:
+                    os.chmod(self._temp_file, AtomicFile.file_mode(self._file_name))
+                    os.replace(self._temp_file, self._file_name)
+                    self._changed = True
+        finally:
+            if path.exists(self._temp_file):
+                os.remove(self._temp_file)
+        return False
+
+    def __init__(self, file_name, keep_unchanged=False):
+        self._file_name = path.abspath(file_name)
+        self._keep_unchanged = keep_unchanged
+        self._changed = False
+        self._temp_file = None
+        self._fp = None
+
+
+class ConfigWriter:
+    '''
+    write .config and autogen.h together in a single walk of the config tree
+    '''
+
+    _HEADER_BEGIN = '#ifndef ___AUTO_GEN_H\n' \
+                    '#define ___AUTO_GEN_H\n'
+    _HEADER_BOOL = '\n#ifndef FALSE\n#define FALSE (0 == 1)\n#endif\n' \
+                   '\n#ifndef TRUE\n#define TRUE (0 == 0)\n#endif\n'
+    _HEADER_END = '#endif\n'
+    _VAR_FORMAT = 'CONFIG_{0}={1}\n'
+    _RECIPE_FORMAT = 'include {0}\n'
+    _DEFINE_FORMAT = '#define {0} {1}\n'
+    _DEF_FORMAT = ' {0}={1}'
+    _SYMBOL_FORMAT = '/* CONFIG_{0}={1} */\n'
+    _SYMBOL_UNSET_FORMAT = '/* CONFIG_{0} is not set */\n'
+
+    def write(self, ofp, agen):
+        '''
+        variables are written in the order of the items in the tree, not in the order
+        they are set, so that the output is the same however the values are reached
+        '''
+        var_map = self._config.get_monitor().get_view()
+        written = set()
+        recipes = []
+        agen.write(ConfigWriter._HEADER_BEGIN)
+        if self._bool_macros:
+            agen.write(ConfigWriter._HEADER_BOOL)
+        defs = []
+        for config in self._config.walk(visible_only=True):
+            for recipe in config.get_recipes():
+                recipes.append(ConfigWriter._RECIPE_FORMAT.format(recipe.get_resolved_path()))
+            for item in config.get_items():
+                name = item.get_name()
+                if name in var_map and name not in written:
+                    written.add(name)
+                    ofp.write(ConfigWriter._VAR_FORMAT.format(name, var_map[name]))
+                gen = item.get_resolved_genlist()
+                for key in gen:
+                    agen.write(ConfigWriter._DEFINE_FORMAT.format(key, gen[key]))
+                    defs.append(ConfigWriter._DEF_FORMAT.format(key, gen[key]))
+        for name in var_map:
+            if name not in written:
+                ofp.write(ConfigWriter._VAR_FORMAT.format(name, var_map[name]))
+        ofp.write(''.join(recipes))
+        ofp.write('\nDEF+=')
+        ofp.write(''.join(defs))
+        ofp.write('\n')
+        agen.write(ConfigWriter._HEADER_END)
+
+    def get_changed_keys(self):
+        return self._changed_keys
+
+    def emit(self, config_file, header_file, keep_unchanged=False):
+        '''
+        with keep_unchanged, an output is replaced only when its content differs
+        from the existing file, and the CONFIG_ keys which differ from the existing
+        config_file are reported by get_changed_keys()
+        returns list of files which are actually written
+        '''
+        prev_vars = {}
+        if keep_unchanged and path.exists(config_file):
+            prev_vars = SavedConfigReader().read(config_file)
+        outputs = [AtomicFile(config_file, keep_unchanged), AtomicFile(header_file, keep_unchanged)]
+        with outputs[0] as ofp, outputs[1] as agen:
+            self.write(ofp, agen)
+        if keep_unchanged:
+            var_map = {}
+            self._config.get_monitor().get_update(var_map)
+            self._changed_keys = [key for key in var_map if prev_vars.get(key) != str(var_map[key])]
+            self._changed_keys.extend(key for key in prev_vars if key not in var_map)
+        return [file_name for output, file_name in zip(outputs, (config_file, header_file)) if output.is_changed()]
+
+    @staticmethod
+    def read_text(file_name):
+        '''
+        content of file_name, None when it doesn't exist
+        '''
+        if not path.exists(file_name):
+            return None
+        with open(file_name, 'r') as fp:
+            return fp.read()
+
+    def emit_symbols(self, symbol_dir):
+        '''
+        write one small header per CONFIG_ symbol into symbol_dir (like include/config of linux),
+        named exactly as the symbol (<SYMBOL>.h), holding the value of the symbol and the macros
+        generated from it.
+        only headers whose content changed are written, so that a build tracking
+        dependency on them rebuilds only objects using the changed symbols.
+        headers of symbols which no longer exist are rewritten as 'not set'.
+        returns the list of changed symbols
+        '''
+        var_map = {}
+        self._config.get_monitor().get_update(var_map)
+        contents = {}
+        for key in var_map:
+            contents.update({key: [ConfigWriter._SYMBOL_FORMAT.format(key, var_map[key])]})
+        for config in self._config.walk(visible_only=True):
+            for item in config.get_items():
+                content = contents.get(item.get_name())
+                if content is None:
+                    continue
+                gen = item.get_resolved_genlist()
+                for gkey in gen:
+                    content.append(ConfigWriter._DEFINE_FORMAT.format(gkey, gen[gkey]))
+        if not path.exists(symbol_dir):
+            os.makedirs(symbol_dir)
+        for file_name in os.listdir(symbol_dir):
+            if not file_name.endswith('.h'):
+                continue
+            key = file_name[:-len('.h')]
+            if key not in contents:
+                contents.update({key: [ConfigWriter._SYMBOL_UNSET_FORMAT.format(key)]})
+        changed = []
+        for key in contents:
+            header_file = path.join(symbol_dir, '{}.h'.format(key))
+            content = ''.join(contents[key])
+            if ConfigWriter.read_text(header_file) == content:
+                continue
+            with AtomicFile(header_file) as fp:
+                fp.write(content)
+            changed.append(key)
+        return changed
+
+    def __init__(self, config, bool_macros=False):
+        self._config = config
+        self._bool_macros = bool_macros
+        self._changed_keys = []
@@ -1,13 +1,28 @@
-try:
-    from jconfigpy.Dialog import Dialog
-    from jconfigpy.Dialog import CMDDialog
-    from jconfigpy.ErrorType import FileNotExistError
-    from jconfigpy.VariableMonitor import Monitor
-    from jconfigpy.Config import JConfig
-except ImportError:
-    from .Dialog import Dialog
-    from .Dialog import CMDDialog
-    from .ErrorType import FileNotExistError
-    from .VariableMonitor import Monitor
-    from .Config import JConfig
+import importlib
 
+# public name -> module defining it, modules are imported on first access of the name
+# so that a short lived command (e.g. from make) doesn't pay for what it never uses
+_EXPORTS = {
+    'Dialog': 'Dialog',
+    'CMDDialog': 'Dialog',
+    'FileNotExistError': 'ErrorType',
+    'Monitor': 'VariableMonitor',
+    'JConfig': 'Config',
+    'Resolver': 'Resolver',
+    'RepoFetcher': 'Fetcher',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError('module {0} has no attribute {1}'.format(__name__, name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
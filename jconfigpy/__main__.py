@@ -1,21 +1,17 @@
 #!/usr/bin/env python3
+import importlib
+import os
 import sys
 from os import path
 
-try:
-    # Try absolute import first (for direct script execution)
-    from jconfigpy.Dialog import CMDDialog
-    from jconfigpy.Config import JConfig
-    from jconfigpy.VariableMonitor import Monitor
-    from jconfigpy.ErrorType import FileNotExistError
-    from jconfigpy.Dialog import Dialog
-except ImportError:
-    # Fallback to relative import (for module execution)
-    from .Dialog import CMDDialog
-    from .Config import JConfig
-    from .VariableMonitor import Monitor
-    from .ErrorType import FileNotExistError
-    from .Dialog import Dialog
+
+def load(module, name):
+    '''
+    import name from module of the package on first use, so that each command imports
+    only what it needs (-h, query or an up to date -s -n run never load the config tree)
+    '''
+    return getattr(importlib.import_module('.' + module, __package__ or 'jconfigpy'), name)
+
 
 JCONFIG_HELP_STRING = '---------------------------------------------------------\n' \
                       '*\t\tjconfigpy {maj}.{minor}\t\t\t\t*\n' \
@@ -29,7 +25,51 @@ JCONFIG_HELP_STRING = '---------------------------------------------------------
                       '-s [file] : load configuration from file\n' \
                       '-g [file] : specify name of header file for preprocessor macro\n' \
                       '-t [file] : specify template config file\n' \
+                      '-j [n]    : load config files and fetch repos in parallel with n workers\n' \
+                      '-m [dir]  : cache parsed config files and repo builds in dir (e.g. .jconfig_cache)\n' \
+                      '            with -s -n, run is skipped when none of its inputs / outputs is changed\n' \
+                      '-n        : resolve without prompt, missing values take default (with -s)\n' \
+                      '-k        : keep output files untouched when their content is unchanged\n' \
+                      '-d [dir]  : write a header per CONFIG_ symbol into dir, only changed ones are touched\n' \
+                      '-b [file] : load config files from bundle compiled by compile (with -t / -i of -c)\n' \
+                      '-O [file] : resolve (with -s -n) in order of symbols written by analyze\n' \
+                      '--profile[=n] : print time of each phase, n slowest config files to parse and\n' \
+                      '                variables notifying most subscribers (default 10) to stderr\n' \
+                      '\n' \
+                      '\n' \
+                      'serve [-i file] [-s file] [-S socket] [-j n] [-m dir]\n' \
+                      '          : keep config tree of -i (values from -s) in memory and answer\n' \
+                      '            requests on unix socket (default .jconfig.sock)\n' \
+                      'client [-S socket] query [KEY ...] | symbol [-r] KEY ... | search PREFIX |\n' \
+                      '       resolve KEY=VALUE ... |\n' \
+                      '       emit [-o file] [-g file] [-k] [-d dir] | ping | reload | shutdown\n' \
+                      '          : send a request to running server\n' \
+                      '\n' \
+                      'query [-i file] [-p PREFIX] [-t file [-b file] [-r]] [KEY ...]\n' \
+                      '          : print values of keys (all when none given) and of keys starting with\n' \
+                      '            PREFIX from saved configuration file (default .config) without loading\n' \
+                      '            config tree, with -t also the file defining each key, its type, depend,\n' \
+                      '            dependants (-r : transitively) and gen-list from the resolved tree\n' \
+                      '\n' \
+                      'matrix -t file -o dir [-j n] [-m dir] [-b file] [-k] file ...\n' \
+                      '          : resolve template -t against each saved configuration file\n' \
+                      '            into dir/<name of file>/{{.config,autogen.h}} (on n processes)\n' \
+                      '\n' \
+                      'compile [-t file] [-o file]\n' \
+                      '          : compile config tree of -t into a single bundle (default config.jcb next to it)\n' \
+                      '            childs with $VAR paths are left to be loaded from disk\n' \
                       '\n' \
+                      'analyze [-t file] [-O file]\n' \
+                      '          : report dependency cycles, depend on undefined symbols, duplicate symbols\n' \
+                      '            and dead config paths over every variant of config tree, fails if any\n' \
+                      '            order of symbols to resolve them in one pass is written into -O file\n' \
+                      '\n' \
+                      'bench [-r n] [-o file] [-c file [-x ratio]] [-w dir] [-t file [-s file]] [key=value ...]\n' \
+                      '          : time parse, propagate, resolve and emit phases (n runs each) on a synthetic\n' \
+                      '            tree (written into dir if given) or on config -t with values -s, result\n' \
+                      '            is written as JSON and compared with result file -c (fails above ratio)\n' \
+                      '            keys : depth, fanout, items, types (e.g. bool:4,int:2), depend, var_path,\n' \
+                      '                   genlist (ratio of items / childs), seed\n' \
                       '\n' \
                       'initiate configuration in command line\n' \
                       'ex) python jconfigpy.py -c -ut -i config.json -o .config\n' \
@@ -40,158 +80,633 @@ JCONFIG_HELP_STRING = '---------------------------------------------------------
 
 
 
+def create_loader(config_file, jobs=None, cache_dir=None, bundle_file=None):
+    loader = None
+    if cache_dir is not None:
+        loader = load('Cache', 'ParseCache')(cache_dir)
+    if bundle_file is not None:
+        # files of the bundle are read at once, only its references are left to be loaded
+        return load('Bundle', 'SchemaBundle')(bundle_file, path.dirname(path.abspath(config_file)), loader)
+    if jobs is not None:
+        loader = load('Loader', 'ParallelLoader')(workers=jobs, loader=loader)
+        loader.prefetch(config_file)
+    return loader
+
+
+def create_fetcher(jobs=None, cache_dir=None):
+    build_cache = None
+    if cache_dir is not None:
+        build_cache = load('Cache', 'RepoBuildCache')(path.join(cache_dir, 'repo'))
+    return load('Fetcher', 'RepoFetcher')(workers=jobs, build_cache=build_cache)
+
+
+def fetch_repos(fetcher):
+    fetcher.run()
+    sys.stdout.write(fetcher.report())
+
+
+def write_output(root_config, config_file, header_file, keep_unchanged, symbol_dir=None, bool_macros=False):
+    writer = load('Writer', 'ConfigWriter')(root_config, bool_macros=bool_macros)
+    updated = writer.emit(config_file, header_file, keep_unchanged)
+    if symbol_dir is not None:
+        writer.emit_symbols(symbol_dir)
+    if not keep_unchanged:
+        return updated
+    for key in writer.get_changed_keys():
+        print('CONFIG_{0} is changed'.format(key))
+    for file_name in (config_file, header_file):
+        if file_name not in updated:
+            print('{0} is up to date'.format(file_name))
+    return updated
+
+
 def init_text_mode_config(argv, config_dialog):
     file_name = None
-    assert isinstance(config_dialog, Dialog)
+    jobs = None
+    cache_dir = None
+    keep_unchanged = False
+    symbol_dir = None
+    bundle_file = None
+    assert isinstance(config_dialog, load('Dialog', 'Dialog'))
     result_file = '.config'
     autogen_header = 'autogen.h'
     if '-i' not in argv:
         return
     for idx, arg in enumerate(argv):
-        if '-i' in arg:
+        if arg == '-i':
             if len(argv) <= idx + 1:
                 return
             file_name = argv[idx + 1]
-        if '-o' in arg:
+        if arg == '-o':
             if len(argv) <= idx + 1:
                 return
             result_file = argv[idx + 1]
-        if '-g' in arg:
+        if arg == '-g':
             if len(argv) <= idx + 1:
                 return
             autogen_header = argv[idx + 1]
+        if arg == '-j':
+            if len(argv) <= idx + 1:
+                return
+            jobs = int(argv[idx + 1])
+        if arg == '-m':
+            if len(argv) <= idx + 1:
+                return
+            cache_dir = argv[idx + 1]
+        if arg == '-k':
+            keep_unchanged = True
+        if arg == '-d':
+            if len(argv) <= idx + 1:
+                return
+            symbol_dir = argv[idx + 1]
+        if arg == '-b':
+            if len(argv) <= idx + 1:
+                return
+            bundle_file = argv[idx + 1]
 
     if not path.exists(file_name):
-        raise FileNotExistError(file_name)
+        raise load('ErrorType', 'FileNotExistError')(file_name)
 
-    root_config = JConfig(jconfig_file=file_name, root_dir=path.abspath('./'))
+    fetcher = create_fetcher(jobs, cache_dir)
+    root_config = load('Config', 'JConfig')(jconfig_file=file_name, root_dir=path.abspath('./'),
+                                            loader=create_loader(file_name, jobs, cache_dir, bundle_file),
+                                            fetcher=fetcher)
     config_dialog.prompt_config(root_config)
+    fetch_repos(fetcher)
 
-    monitor = Monitor()
-
-    with open(result_file, 'w+') as ofp:
-        monitor.write(ofp)
-        root_config.write_recipe(ofp)
-        ofp.write('\nDEF+=')
-        root_config.write_genlist(ofp, ' {0}={1}')
-        ofp.write('\n')
-
-    with open(autogen_header, 'w+') as agen:
-        agen.write('#ifndef ___AUTO_GEN_H\n')
-        agen.write('#define ___AUTO_GEN_H\n')
-
-        agen.write("\n#ifndef FALSE\n#define FALSE (0 == 1)\n#endif\n")
-        agen.write("\n#ifndef TRUE\n#define TRUE (0 == 0)\n#endif\n")
-
-
-        root_config.write_genlist(agen)
-
-        agen.write('#endif\n')
+    write_output(root_config, result_file, autogen_header, keep_unchanged, symbol_dir, bool_macros=True)
 
 
 def load_saved_config(argv, dialog):
     if '-i' not in argv:
         return
-    assert isinstance(dialog, Dialog)
+    assert dialog is None or isinstance(dialog, load('Dialog', 'Dialog'))
     config_file = './config.json'
     sconfig_file = None
     result_file = './.config'
     gen_file = './autogen.h'
+    jobs = None
+    cache_dir = None
+    interactive = True
+    keep_unchanged = False
+    symbol_dir = None
+    bundle_file = None
+    order_file = None
     for idx, arg in enumerate(argv):
-        if '-i' in arg:
+        if arg == '-i':
             '''
             input configuration file (saved .config)
             '''
             if len(argv) <= idx + 1:
                 return
             sconfig_file = argv[idx + 1]
-        if '-t' in arg:
+        if arg == '-t':
             '''
             config template file (root config.json)
             '''
             if len(argv) <= idx + 1:
                 return
             config_file = argv[idx + 1]
-        if '-o' in arg:
+        if arg == '-o':
             '''
             output configuratoin file (target .config)
             '''
             if len(argv) <= idx + 1:
                 return
             result_file = argv[idx + 1]
-        if '-g' in arg:
+        if arg == '-g':
             '''
             auto-generated file
             '''
             if len(argv) <= idx + 1:
                 return
             gen_file = argv[idx + 1]
+        if arg == '-j':
+            '''
+            number of workers to load config files
+            '''
+            if len(argv) <= idx + 1:
+                return
+            jobs = int(argv[idx + 1])
+        if arg == '-m':
+            '''
+            directory to cache parsed config files
+            '''
+            if len(argv) <= idx + 1:
+                return
+            cache_dir = argv[idx + 1]
+        if arg == '-n':
+            '''
+            resolve without any prompt
+            '''
+            interactive = False
+        if arg == '-k':
+            '''
+            keep output untouched if unchanged
+            '''
+            keep_unchanged = True
+        if arg == '-d':
+            '''
+            directory of per symbol headers
+            '''
+            if len(argv) <= idx + 1:
+                return
+            symbol_dir = argv[idx + 1]
+        if arg == '-b':
+            '''
+            compiled config bundle
+            '''
+            if len(argv) <= idx + 1:
+                return
+            bundle_file = argv[idx + 1]
+        if arg == '-O':
+            '''
+            order of symbols written by analyze
+            '''
+            if len(argv) <= idx + 1:
+                return
+            order_file = argv[idx + 1]
 
     if sconfig_file is None:
         return
 
-    kv_map = {}
-    with open(sconfig_file, 'r') as fp:
-        for flin in fp:
-            if 'CONFIG_' in flin:
-                lin = flin.split('CONFIG_')[1]
-                kv = lin.split('=')
-                kv_map.update({kv[0]: kv[1]})
-    print(kv_map)
-    klist = []
-    vlist = []
-    for key in kv_map:
-        klist.append(key)
-        vlist.append(kv_map[key].split('\n')[0])
-    kv_map = dict(zip(klist, vlist))
-    root_config = JConfig(jconfig_file=config_file,root_dir=path.abspath('./'))
-    dialog.prompt_config(root_config, kv_map)
-
-    monitor = Monitor()
-
-    with open(result_file, 'w+') as ofp:
-        monitor.write(ofp)
-        root_config.write_recipe(ofp)
-        ofp.write('\nDEF+=')
-        root_config.write_genlist(ofp, ' {0}={1}')
-        ofp.write('\n')
-
-    with open(gen_file, 'w+') as agen:
-        agen.write('#ifndef ___AUTO_GEN_H\n')
-        agen.write('#define ___AUTO_GEN_H\n')
-
-        root_config.write_genlist(agen)
-
-        agen.write('#endif\n')
+    stamp = None
+    if not interactive and cache_dir is not None:
+        stamp = load('Stamp', 'BuildStamp')(cache_dir, path.abspath('./'), *[
+            path.abspath(file_name) if file_name is not None else None
+            for file_name in (config_file, sconfig_file, result_file, gen_file, symbol_dir, bundle_file,
+                              order_file)] +
+            [keep_unchanged])
+        if stamp.is_fresh():
+            for file_name in (result_file, gen_file):
+                print('{0} is up to date'.format(file_name))
+            return
 
+    kv_map = load('SavedConfig', 'SavedConfigReader')().read(sconfig_file)
+    fetcher = create_fetcher(jobs, cache_dir)
+    root_config = load('Config', 'JConfig')(jconfig_file=config_file, root_dir=path.abspath('./'),
+                                            loader=create_loader(config_file, jobs, cache_dir, bundle_file),
+                                            lazy=not interactive, fetcher=fetcher)
+    if interactive:
+        dialog.prompt_config(root_config, kv_map)
+    else:
+        order = None
+        if order_file is not None:
+            import json
+            with open(order_file, 'r') as fp:
+                order = json.load(fp)
+        load('Resolver', 'Resolver')(kv_map, order=order).resolve(root_config)
+    fetch_repos(fetcher)
 
-def main(argv=None):
-    conf_dialog = CMDDialog()
+    write_output(root_config, result_file, gen_file, keep_unchanged, symbol_dir)
+    if stamp is not None:
+        inputs = [file_name for file_name in (sconfig_file, bundle_file, order_file) if file_name is not None]
+        save_stamp(stamp, root_config, inputs + [result_file, gen_file], symbol_dir)
+
+
+def save_stamp(stamp, root_config, files, symbol_dir=None):
+    '''
+    record config files of the tree, given files and symbol headers for the next run
+    '''
+    files = [config.get_resolved_file() for config in root_config.walk() if config.is_parsed()] + \
+        [path.abspath(file_name) for file_name in files]
+    if symbol_dir is not None and path.isdir(symbol_dir):
+        files += [path.abspath(path.join(symbol_dir, file_name)) for file_name in sorted(os.listdir(symbol_dir))]
+    imported = [item.get_name() for config in root_config.walk() for item in config.get_items()
+                if item.is_imported()]
+    stamp.save(files, imported)
+
+
+def print_symbol(key, info):
+    if info is None:
+        print('# {0} is not defined'.format(key))
+        return
+    if info['value'] is None or info['value'] == 'n':
+        print('# CONFIG_{0} is not set'.format(key))
+    else:
+        print('CONFIG_{0}={1}'.format(key, info['value']))
+    print('    file       : {}'.format(path.relpath(info['file'])))
+    print('    type       : {}'.format(info['type']))
+    if len(info['depend']) > 0:
+        print('    depend     : {}'.format(', '.join(info['depend'])))
+    if len(info['dependants']) > 0:
+        print('    dependants : {}'.format(', '.join(info['dependants'])))
+    for output, val in info['gen-list'].items():
+        print('    gen-list   : {0}={1}'.format(output, val))
+
+
+def query(argv):
+    '''
+    print values of keys from saved configuration without loading the config tree,
+    with -t the tree is resolved from it and definition, dependants and gen-list of keys
+    are printed from its symbol index
+    '''
+    sconfig_file = './.config'
+    config_file = None
+    bundle_file = None
+    prefix = None
+    recursive = False
+    keys = []
+    idx = 0
+    while idx < len(argv):
+        arg = argv[idx]
+        if arg in ('-i', '-t', '-b', '-p') and len(argv) <= idx + 1:
+            return
+        if arg == '-i':
+            sconfig_file = argv[idx + 1]
+        elif arg == '-t':
+            config_file = argv[idx + 1]
+        elif arg == '-b':
+            bundle_file = argv[idx + 1]
+        elif arg == '-p':
+            prefix = argv[idx + 1]
+        elif arg == '-r':
+            recursive = True
+        else:
+            keys.append(arg[len('CONFIG_'):] if arg.startswith('CONFIG_') else arg)
+            idx += 1
+            continue
+        idx += 1 if arg == '-r' else 2
+
+    if config_file is None:
+        if not path.exists(sconfig_file):
+            raise load('ErrorType', 'FileNotExistError')(sconfig_file)
+        values = load('SavedConfig', 'SavedConfigReader')().read(sconfig_file)
+        if prefix is not None:
+            keys += sorted(key for key in values if key.startswith(prefix))
+        for key in keys if len(keys) > 0 or prefix is not None else values:
+            val = values.get(key, 'n')
+            if val == 'n':
+                print('# CONFIG_{0} is not set'.format(key))
+            else:
+                print('CONFIG_{0}={1}'.format(key, val))
+        return
+
+    if not path.exists(config_file):
+        raise load('ErrorType', 'FileNotExistError')(config_file)
+    # without saved configuration, items take their default value
+    values = load('SavedConfig', 'SavedConfigReader')().read(sconfig_file) if path.exists(sconfig_file) else {}
+    # repos are only collected, never fetched
+    root_config = load('Config', 'JConfig')(jconfig_file=config_file, root_dir=path.abspath('./'),
+                                            loader=create_loader(config_file, None, None, bundle_file),
+                                            lazy=True, fetcher=load('Fetcher', 'RepoFetcher')())
+    load('Resolver', 'Resolver')(values).resolve(root_config)
+    symbols = root_config.get_symbols()
+    if prefix is not None:
+        keys += symbols.search(prefix)
+    for key in keys if len(keys) > 0 or prefix is not None else symbols.search(''):
+        print_symbol(key, symbols.describe(key, recursive))
+
+
+def serve(argv):
+    config_file = './config.json'
+    values_file = None
+    socket_path = load('Client', 'ConfigClient').DEFAULT_SOCKET
+    jobs = None
+    cache_dir = None
+    for idx, arg in enumerate(argv):
+        if len(argv) <= idx + 1:
+            break
+        if arg == '-i':
+            config_file = argv[idx + 1]
+        elif arg == '-s':
+            values_file = argv[idx + 1]
+        elif arg == '-S':
+            socket_path = argv[idx + 1]
+        elif arg == '-j':
+            jobs = int(argv[idx + 1])
+        elif arg == '-m':
+            cache_dir = argv[idx + 1]
+    if not path.exists(config_file):
+        raise load('ErrorType', 'FileNotExistError')(config_file)
+
+    server = load('Server', 'ConfigServer')(config_file, values_file, socket_path,
+                                            loader_factory=lambda file_name: create_loader(file_name, jobs, cache_dir),
+                                            fetcher_factory=lambda: create_fetcher(jobs, cache_dir))
+    try:
+        server.bind()
+    except ValueError as err:
+        sys.stderr.write('{}\n'.format(err))
+        sys.exit(1)
+    print('serving {0} on {1}'.format(config_file, socket_path))
+    server.serve_forever()
+
+
+def client(argv):
+    ConfigClient = load('Client', 'ConfigClient')
+    socket_path = ConfigClient.DEFAULT_SOCKET
+    if '-S' in argv:
+        idx = argv.index('-S')
+        socket_path = argv[idx + 1]
+        argv = argv[:idx] + argv[idx + 2:]
+    if len(argv) == 0:
+        return
+    op, args = argv[0], argv[1:]
+    with ConfigClient(socket_path) as conn:
+        if op == 'query':
+            values = conn.query(args if len(args) > 0 else None)
+            for key in values:
+                if values[key] is None:
+                    print('# CONFIG_{0} is not set'.format(key))
+                else:
+                    print('CONFIG_{0}={1}'.format(key, values[key]))
+        elif op == 'symbol':
+            recursive = '-r' in args
+            keys = [arg for arg in args if arg != '-r']
+            symbols = conn.symbol(keys, recursive)
+            for key in keys:
+                print_symbol(key, symbols[key])
+        elif op == 'search':
+            for name in conn.search(args[0] if len(args) > 0 else ''):
+                print(name)
+        elif op == 'resolve':
+            values = dict(arg.split('=', 1) for arg in args)
+            for key, val in conn.resolve(values).items():
+                print('CONFIG_{0}={1}'.format(key, val))
+        elif op == 'emit':
+            config_file = '.config'
+            header_file = 'autogen.h'
+            symbol_dir = None
+            for idx, arg in enumerate(args):
+                if arg == '-o' and len(args) > idx + 1:
+                    config_file = args[idx + 1]
+                elif arg == '-g' and len(args) > idx + 1:
+                    header_file = args[idx + 1]
+                elif arg == '-d' and len(args) > idx + 1:
+                    symbol_dir = path.abspath(args[idx + 1])
+            result = conn.emit(path.abspath(config_file), path.abspath(header_file), '-k' in args, symbol_dir)
+            for key in result['changed']:
+                print('CONFIG_{0} is changed'.format(key))
+        else:
+            conn.request(op)
+
+
+def matrix(argv):
+    config_file = './config.json'
+    out_dir = './variants'
+    jobs = None
+    cache_dir = None
+    keep_unchanged = False
+    bundle_file = None
+    values_files = []
+    idx = 0
+    while idx < len(argv):
+        arg = argv[idx]
+        if arg in ('-t', '-o', '-j', '-m', '-b') and len(argv) <= idx + 1:
+            return
+        if arg == '-t':
+            config_file = argv[idx + 1]
+        elif arg == '-o':
+            out_dir = argv[idx + 1]
+        elif arg == '-j':
+            jobs = int(argv[idx + 1])
+        elif arg == '-m':
+            cache_dir = argv[idx + 1]
+        elif arg == '-b':
+            bundle_file = argv[idx + 1]
+        elif arg == '-k':
+            keep_unchanged = True
+        else:
+            values_files.append(arg)
+            idx += 1
+            continue
+        idx += 1 if arg == '-k' else 2
+    if not path.exists(config_file):
+        raise load('ErrorType', 'FileNotExistError')(config_file)
+
+    resolver = load('Matrix', 'MatrixResolver')(config_file, path.abspath('./'), cache_dir=cache_dir,
+                                                bundle_file=bundle_file)
+    result = resolver.run(values_files, out_dir, jobs, keep_unchanged)
+    for name in result:
+        print('{0} : {1} file(s) written'.format(name, len(result[name])))
+
+
+def analyze(argv):
+    import json
+    config_file = './config.json'
+    order_file = None
+    for idx, arg in enumerate(argv):
+        if len(argv) <= idx + 1:
+            break
+        if arg == '-t':
+            config_file = argv[idx + 1]
+        elif arg == '-O':
+            order_file = argv[idx + 1]
+
+    analyzer = load('Analyzer', 'Analyzer')(config_file).run()
+    sys.stdout.write(analyzer.report())
+    if order_file is not None:
+        with open(order_file, 'w') as fp:
+            json.dump(analyzer.get_ranks(), fp, indent=2)
+    if analyzer.has_errors():
+        sys.exit(1)
+
+
+def compile_bundle(argv):
+    config_file = './config.json'
+    bundle_file = None
+    for idx, arg in enumerate(argv):
+        if len(argv) <= idx + 1:
+            break
+        if arg == '-t':
+            config_file = argv[idx + 1]
+        elif arg == '-o':
+            bundle_file = argv[idx + 1]
+    if not path.exists(config_file):
+        raise load('ErrorType', 'FileNotExistError')(config_file)
+    if bundle_file is None:
+        bundle_file = path.join(path.dirname(config_file), load('Bundle', 'SchemaBundle').DEFAULT_FILE)
+
+    compiler = load('Bundle', 'BundleCompiler')(config_file).compile(config_file)
+    compiler.write(bundle_file)
+    print('{0} : {1} config file(s), {2} reference(s)'.format(bundle_file, len(compiler.get_files()),
+                                                              len(compiler.get_references())))
+    for config_file, name, config_path in compiler.get_references():
+        print('  {0} of {1} -> {2}'.format(name, config_file, config_path))
+
+
+def bench(argv):
+    # only needed here, not imported at the top to keep other commands quick
+    import json
+    import shutil
+    import tempfile
+    params = {}
+    repeat = 5
+    out_file = None
+    base_file = None
+    max_ratio = None
+    work_dir = None
+    config_file = None
+    values_file = None
+    idx = 0
+    while idx < len(argv):
+        arg = argv[idx]
+        if arg in ('-r', '-o', '-c', '-x', '-w', '-t', '-s'):
+            if len(argv) <= idx + 1:
+                return
+            val = argv[idx + 1]
+            if arg == '-r':
+                repeat = int(val)
+            elif arg == '-o':
+                out_file = val
+            elif arg == '-c':
+                base_file = val
+            elif arg == '-x':
+                max_ratio = float(val)
+            elif arg == '-w':
+                work_dir = val
+            elif arg == '-t':
+                config_file = val
+            else:
+                values_file = val
+            idx += 2
+            continue
+        key, sep, val = arg.partition('=')
+        if sep == '':
+            raise ValueError('invalid benchmark parameter : {}'.format(arg))
+        if key == 'types':
+            val = {t: int(w) for t, w in (tw.split(':') for tw in val.split(','))}
+        elif key in ('depth', 'fanout', 'items', 'seed'):
+            val = int(val)
+        else:
+            val = float(val)
+        params.update({key: val})
+        idx += 1
+
+    Benchmark = load('Benchmark', 'Benchmark')
+    path_vars = None
+    tree = None
+    temp_dir = None
+    if config_file is None:
+        generator = load('Benchmark', 'TreeGenerator')(**params)
+        if work_dir is None:
+            temp_dir = tempfile.mkdtemp()
+            work_dir = temp_dir
+        config_file, values_file = generator.generate(work_dir)
+        path_vars = generator.get_path_vars()
+        tree = generator.get_params()
+        tree.update(generator.get_stats())
+    try:
+        result = Benchmark(config_file, values_file, path_vars).run(repeat)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+    result.update({'tree': tree if tree is not None else {'config': path.abspath(config_file)}})
+    ratios = None
+    if base_file is not None:
+        with open(base_file, 'r') as fp:
+            ratios = Benchmark.compare(json.load(fp), result)
+        result.update({'compare': ratios})
+    output = json.dumps(result, indent=2)
+    if out_file is None:
+        print(output)
+    else:
+        with open(out_file, 'w') as fp:
+            fp.write(output + '\n')
+    if ratios is not None and max_ratio is not None:
+        slower = [phase for phase in ratios if ratios[phase] > max_ratio]
+        if len(slower) > 0:
+            sys.exit('slower than {0} by more than x{1} : {2}'.format(base_file, max_ratio, ', '.join(slower)))
+
+
+def run(argv=None):
+    if argv is not None and len(argv) > 1 and argv[1] in ('serve', 'client', 'matrix', 'query', 'bench', 'compile', 'analyze'):
+        if argv[1] == 'serve':
+            serve(argv[2:])
+        elif argv[1] == 'client':
+            client(argv[2:])
+        elif argv[1] == 'query':
+            query(argv[2:])
+        elif argv[1] == 'bench':
+            bench(argv[2:])
+        elif argv[1] == 'compile':
+            compile_bundle(argv[2:])
+        elif argv[1] == 'analyze':
+            analyze(argv[2:])
+        else:
+            matrix(argv[2:])
+        return
     if argv is not None:
         for idx, arg in enumerate(argv):
-            if '-h' in arg or '--help' in arg:
+            if arg in ('-h', '--help'):
                 print(JCONFIG_HELP_STRING.format(maj=0, minor=4, author='doowoong', email='innocentevil0914@gmail.com'))
                 return
-            elif '-c' in arg:
+            elif arg == '-c':
                 if '-u' not in argv:
                     '''
                     configuration is performed with text based method
                     '''
-                    init_text_mode_config(argv, conf_dialog)
+                    init_text_mode_config(argv, load('Dialog', 'CMDDialog')())
                 else:
                     '''
                     ui type can be defined
                     '''
                     pass
                 return
-            elif '-s' in arg:
-                load_saved_config(argv, conf_dialog)
+            elif arg == '-s':
+                # dialog is only needed to prompt
+                load_saved_config(argv, load('Dialog', 'CMDDialog')() if '-n' not in argv else None)
                 return
 
-    jconfig = JConfig(jconfig_file='./example/config.json')
+    jconfig = load('Config', 'JConfig')(jconfig_file='./example/config.json')
     jconfig.parse()
     print(jconfig)
 
 
+def main(argv=None):
+    profile = [arg for arg in argv if arg.startswith('--profile')] if argv is not None else []
+    if len(profile) == 0:
+        run(argv)
+        return
+    argv = [arg for arg in argv if not arg.startswith('--profile')]
+    count = profile[-1].partition('=')[2]
+    profiler = load('Profile', 'Profiler')()
+    try:
+        with profiler:
+            run(argv)
+    finally:
+        sys.stderr.write(profiler.report(int(count) if count != '' else 10))
+
+
 if __name__ == '__main__':
     main(sys.argv)
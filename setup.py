@@ -21,7 +21,7 @@ setup(
     url="http://github.com/fritzprix/jconfigpy",
     download_url="http://github.com/fritzprix/jconfigpy/archive/0.2.3.tar.gz",
     packages=['jconfigpy'],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     long_description=read('README.md'),
     long_description_content_type="text/markdown",
     classifiers=[
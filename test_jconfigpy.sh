@@ -274,6 +274,1954 @@ EOF
     fi
 }
 
+##############################################################################
+# Test 8: Parallel Loader Test
+##############################################################################
+
+test_parallel_loader() {
+    log_section "Test 8: Parallel Loader Test"
+
+    log_info "Testing parallel prefetch of config files..."
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+from jconfigpy import JConfig
+from jconfigpy.Loader import ParallelLoader
+
+config_file = "$EXAMPLE_DIR/config.json"
+loader = ParallelLoader(workers=4)
+loader.prefetch(config_file)
+
+# only statically reachable files are prefetched (paths with variables are deferred)
+if len(loader) != 7:
+    print("✗ Unexpected number of prefetched files : {}".format(len(loader)))
+    exit(1)
+
+config = JConfig(jconfig_file=config_file, root_dir="$EXAMPLE_DIR/", loader=loader)
+config.parse()
+if len(config.get_childs()) != 4:
+    print("✗ Child configs are not created from prefetched file")
+    exit(1)
+print("✓ Parallel loader working")
+exit(0)
+EOF
+        log_success "Parallel loader working correctly"
+        return 0
+    else
+        log_error "Parallel loader test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 9: Headless Resolver Test
+##############################################################################
+
+test_headless_resolver() {
+    log_section "Test 9: Headless Resolver Test"
+
+    log_info "Testing non-interactive resolution of a config tree..."
+
+    mkdir -p "$TEST_OUTPUT_DIR/resolver/ARM"
+    cat > "$TEST_OUTPUT_DIR/resolver/config.json" << 'JSON'
+{
+  "ARCH": {"type": "enum", "default": 0, "enum": ["ARM", "MIPS"]},
+  "USE_FPU": {"type": "bool", "default": "n"},
+  "FPU_TYPE": {"type": "int", "default": 1, "depend": {"USE_FPU": "y"}},
+  "ARCH_CONFIG": {"type": "config", "path": "./$ARCH/config.json"}
+}
+JSON
+    cat > "$TEST_OUTPUT_DIR/resolver/ARM/config.json" << 'JSON'
+{
+  "CORE": {"type": "enum", "default": 0, "enum": ["cortex-m3", "cortex-m4"]}
+}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+from jconfigpy import JConfig, Monitor, Resolver
+
+config = JConfig(jconfig_file="$TEST_OUTPUT_DIR/resolver/config.json")
+Resolver({'USE_FPU': 'y', 'CORE': 'cortex-m4'}).resolve(config)
+monitor = Monitor()
+expected = {'ARCH': 'ARM', 'USE_FPU': 'y', 'FPU_TYPE': 1, 'CORE': 'cortex-m4'}
+for key in expected:
+    if monitor.lookup_variable(key) != expected[key]:
+        print("✗ {} is resolved to {}".format(key, monitor.lookup_variable(key)))
+        exit(1)
+print("✓ Config tree resolved without prompt")
+exit(0)
+EOF
+        log_success "Headless resolver working correctly"
+        return 0
+    else
+        log_error "Headless resolver test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 10: Saved Config Reader Test
+##############################################################################
+
+test_saved_config_reader() {
+    log_section "Test 10: Saved Config Reader Test"
+
+    log_info "Testing reader of saved configuration..."
+
+    mkdir -p "$TEST_OUTPUT_DIR"
+    cat > "$TEST_OUTPUT_DIR/saved.config" << 'CONFIG'
+# generated configuration
+CONFIG_ARCH=ARM
+CONFIG_NAME="value with CONFIG_X=y"
+# CONFIG_USE_MMU is not set
+include /path/to/recipe.mk
+
+DEF+= CONFIG_PAGE_SIZE=1024
+CONFIG
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+from jconfigpy.SavedConfig import SavedConfigReader
+
+expected = {'ARCH': 'ARM', 'NAME': 'value with CONFIG_X=y', 'USE_MMU': 'n'}
+for use_mmap in (False, True):
+    kv_map = SavedConfigReader().read("$TEST_OUTPUT_DIR/saved.config", use_mmap)
+    if kv_map != expected:
+        print("✗ Unexpected result : {}".format(kv_map))
+        exit(1)
+print("✓ Saved configuration read correctly")
+exit(0)
+EOF
+        log_success "Saved config reader working correctly"
+        return 0
+    else
+        log_error "Saved config reader test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 11: Repo Fetcher Test
+##############################################################################
+
+test_repo_fetcher() {
+    log_section "Test 11: Repo Fetcher Test"
+
+    log_info "Testing parallel fetch & build of repos from local bare repositories..."
+
+    local fetch_dir="$TEST_OUTPUT_DIR/fetcher"
+    for lib in foo bar; do
+        mkdir -p "$fetch_dir/work/$lib/inc" "$fetch_dir/$lib"
+        cat > "$fetch_dir/work/$lib/package.json" << JSON
+{"name": "$lib", "buildcmd": ["touch lib$lib.a"], "include": ["inc"], "output": ["lib$lib.a"]}
+JSON
+        touch "$fetch_dir/work/$lib/inc/.keep"
+        git -C "$fetch_dir/work/$lib" init -q
+        git -C "$fetch_dir/work/$lib" add -A
+        git -C "$fetch_dir/work/$lib" -c user.name=test -c user.email=test@test commit -q -m init
+        git clone -q --bare "$fetch_dir/work/$lib" "$fetch_dir/$lib.git"
+        cat > "$fetch_dir/$lib/config.json" << JSON
+{"LIB_${lib^^}": {"type": "repo", "name": "$lib", "url": "$fetch_dir/$lib.git", "out": "./dep"}}
+JSON
+    done
+    cat > "$fetch_dir/config.json" << 'JSON'
+{
+  "FOO": {"type": "config", "path": "./foo/config.json"},
+  "BAR": {"type": "config", "path": "./bar/config.json"}
+}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+from jconfigpy import JConfig, Resolver, RepoFetcher
+
+cwd = os.getcwd()
+fetcher = RepoFetcher(workers=2)
+config = JConfig(jconfig_file="$fetch_dir/config.json", root_dir="$fetch_dir", fetcher=fetcher)
+Resolver().resolve(config)
+if len(fetcher) != 2:
+    print("✗ repos are not collected : {}".format(len(fetcher)))
+    exit(1)
+timings = fetcher.run()
+if os.getcwd() != cwd or [t[0] for t in timings] != ['foo', 'bar']:
+    print("✗ Unexpected timings {} or working directory {}".format(timings, os.getcwd()))
+    exit(1)
+for lib in ('foo', 'bar'):
+    if not os.path.exists("$fetch_dir/{0}/dep/lib{0}.a".format(lib)):
+        print("✗ output of {} is not copied".format(lib))
+        exit(1)
+    with open("$fetch_dir/{}/autorecipe.mk".format(lib)) as fp:
+        if 'SLIB-y+=lib{}.a'.format(lib) not in fp.read():
+            print("✗ autorecipe.mk of {} is not written".format(lib))
+            exit(1)
+print("✓ Repos fetched and built in parallel")
+exit(0)
+EOF
+        log_success "Repo fetcher working correctly"
+        return 0
+    else
+        log_error "Repo fetcher test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 12: Repo Build Cache Test
+##############################################################################
+
+test_repo_build_cache() {
+    log_section "Test 12: Repo Build Cache Test"
+
+    log_info "Testing restore of repo outputs from build cache..."
+
+    local cache_dir="$TEST_OUTPUT_DIR/build_cache"
+    mkdir -p "$cache_dir/work" "$cache_dir/baz"
+    cat > "$cache_dir/work/package.json" << 'JSON'
+{"name": "baz", "buildcmd": ["touch libbaz.a", "echo built $BAZ_FLAGS >> ../../builds.log"], "include": [], "output": ["libbaz.a"]}
+JSON
+    echo 'int baz;' > "$cache_dir/work/baz.c"
+    git -C "$cache_dir/work" init -q
+    git -C "$cache_dir/work" add -A
+    git -C "$cache_dir/work" -c user.name=test -c user.email=test@test commit -q -m init
+    git clone -q --bare "$cache_dir/work" "$cache_dir/baz.git"
+    cat > "$cache_dir/baz/config.json" << JSON
+{"LIB_BAZ": {"type": "repo", "name": "baz", "url": "$cache_dir/baz.git", "out": "./dep"}}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+import shutil
+from jconfigpy import JConfig, Resolver, RepoFetcher
+from jconfigpy.Cache import RepoBuildCache
+
+steps = []
+def run():
+    shutil.rmtree("$cache_dir/baz/dep", ignore_errors=True)
+    fetcher = RepoFetcher(build_cache=RepoBuildCache("$cache_dir/cache"))
+    Resolver().resolve(JConfig(jconfig_file="$cache_dir/baz/config.json", fetcher=fetcher))
+    steps.append(fetcher.run()[0][1][1][0])
+    if not os.path.exists("$cache_dir/baz/dep/libbaz.a"):
+        print("✗ output is not installed")
+        exit(1)
+
+def count_builds():
+    with open("$cache_dir/builds.log") as fp:
+        return len(fp.readlines())
+
+os.environ.pop('BAZ_FLAGS', None)
+for _ in range(2):
+    run()
+if steps != ['build', 'cached'] or count_builds() != 1:
+    print("✗ Unexpected steps {} / builds {}".format(steps, count_builds()))
+    exit(1)
+# environment variable expanded by build command is a part of the key
+os.environ['BAZ_FLAGS'] = '-O2'
+for _ in range(2):
+    run()
+# modified source is never taken from nor stored into the cache
+with open("$cache_dir/baz/source/baz.c", 'a') as fp:
+    fp.write('int local;\n')
+for _ in range(2):
+    run()
+if steps[2:] != ['build', 'cached', 'build', 'build'] or count_builds() != 4:
+    print("✗ Unexpected steps {} / builds {}".format(steps, count_builds()))
+    exit(1)
+print("✓ Unchanged repo restored from build cache")
+exit(0)
+EOF
+        log_success "Repo build cache working correctly"
+        return 0
+    else
+        log_error "Repo build cache test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 13: Incremental Update Test
+##############################################################################
+
+test_incremental_update() {
+    log_section "Test 13: Incremental Update Test"
+
+    log_info "Testing re-resolution of the subtree affected by changed values..."
+
+    local inc_dir="$TEST_OUTPUT_DIR/incremental"
+    mkdir -p "$inc_dir/ARM" "$inc_dir/MIPS"
+    cat > "$inc_dir/config.json" << 'JSON'
+{
+  "ARCH": {"type": "enum", "default": 0, "enum": ["ARM", "MIPS"]},
+  "USE_FPU": {"type": "bool", "default": "n"},
+  "FPU_TYPE": {"type": "int", "default": 1, "depend": {"USE_FPU": "y"}},
+  "ARCH_CONFIG": {"type": "config", "path": "./$ARCH/config.json"}
+}
+JSON
+    cat > "$inc_dir/ARM/config.json" << 'JSON'
+{"CORE": {"type": "enum", "default": 0, "enum": ["cortex-m3", "cortex-m4"]}}
+JSON
+    cat > "$inc_dir/MIPS/config.json" << 'JSON'
+{"ISA": {"type": "enum", "default": 0, "enum": ["mips32", "mips64"]}}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+from jconfigpy import JConfig, Monitor, Resolver
+from jconfigpy.Writer import ConfigWriter
+
+def variables():
+    var_map = {}
+    Monitor().get_update(var_map)
+    return var_map
+
+config = JConfig(jconfig_file="$inc_dir/config.json")
+resolver = Resolver({'CORE': 'cortex-m4'})
+resolver.resolve(config)
+arch_config = config.get_childs()[0]
+resolver.update(config, {'USE_FPU': 'y'})
+if variables() != {'ARCH': 'ARM', 'USE_FPU': 'y', 'FPU_TYPE': 1, 'CORE': 'cortex-m4'}:
+    print("✗ Unexpected result after USE_FPU : {}".format(variables()))
+    exit(1)
+config_file, header_file = "$inc_dir/.config", "$inc_dir/autogen.h"
+ConfigWriter(config).emit(config_file, header_file)
+for name in (config_file, header_file):
+    os.utime(name, ns=(0, 0))
+resolver.update(config, {'ARCH': 'MIPS', 'USE_FPU': 'n'})
+if variables() != {'ARCH': 'MIPS', 'USE_FPU': 'n', 'ISA': 'mips32'}:
+    print("✗ Unexpected result after ARCH : {}".format(variables()))
+    exit(1)
+if config.get_childs()[0] is not arch_config or arch_config.get_resolved_file() != "$inc_dir/MIPS/config.json":
+    print("✗ Child config is not re-parsed in place")
+    exit(1)
+# reverted update gives back the same outputs, which are kept as they are
+resolver.update(config, {'ARCH': 'ARM', 'USE_FPU': 'y'})
+if ConfigWriter(config).emit(config_file, header_file, keep_unchanged=True) != []:
+    print("✗ Outputs are rewritten after reverted update")
+    exit(1)
+if any(os.stat(name).st_mtime_ns != 0 for name in (config_file, header_file)):
+    print("✗ mtime of unchanged output is touched")
+    exit(1)
+print("✓ Affected subtree re-resolved")
+exit(0)
+EOF
+        log_success "Incremental update working correctly"
+        return 0
+    else
+        log_error "Incremental update test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 14: Resolver Daemon Test
+##############################################################################
+
+test_resolver_daemon() {
+    log_section "Test 14: Resolver Daemon Test"
+
+    log_info "Testing requests to resolver daemon over unix socket..."
+
+    local daemon_dir="$TEST_OUTPUT_DIR/daemon"
+    mkdir -p "$daemon_dir"
+    cat > "$daemon_dir/config.json" << 'JSON'
+{
+  "USE_FPU": {"type": "bool", "default": "n"},
+  "FPU_TYPE": {"type": "int", "default": 1, "depend": {"USE_FPU": "y"}}
+}
+JSON
+    echo "CONFIG_USE_FPU=y" > "$daemon_dir/saved.config"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+import subprocess
+import sys
+import time
+import jconfigpy
+from jconfigpy.Client import ConfigClient
+
+sock = "$daemon_dir/jconfig.sock"
+env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(jconfigpy.__file__)))
+server = subprocess.Popen([sys.executable, '-m', 'jconfigpy', 'serve', '-i', "$daemon_dir/config.json",
+                           '-s', "$daemon_dir/saved.config", '-S', sock], env=env, stdout=subprocess.DEVNULL)
+for _ in range(100):
+    if os.path.exists(sock):
+        break
+    time.sleep(0.05)
+try:
+    with ConfigClient(sock) as conn:
+        if conn.query() != {'USE_FPU': 'y', 'FPU_TYPE': 1}:
+            print("✗ Unexpected values {}".format(conn.query()))
+            exit(1)
+        with open("$daemon_dir/saved.config", 'w') as fp:
+            fp.write("CONFIG_USE_FPU=n\\n")
+        os.utime("$daemon_dir/saved.config", ns=(0, 0))
+        if conn.query() != {'USE_FPU': 'n'}:
+            print("✗ Saved configuration is not reloaded {}".format(conn.query()))
+            exit(1)
+        conn.emit("$daemon_dir/.config", "$daemon_dir/autogen.h")
+        if not os.path.exists("$daemon_dir/autogen.h"):
+            print("✗ Output is not written")
+            exit(1)
+        conn.request('shutdown')
+    server.wait(timeout=10)
+finally:
+    if server.poll() is None:
+        server.kill()
+print("✓ Daemon answered requests")
+exit(0)
+EOF
+        log_success "Resolver daemon working correctly"
+        return 0
+    else
+        log_error "Resolver daemon test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 15: Async Loader Test
+##############################################################################
+
+test_async_loader() {
+    log_section "Test 15: Async Loader Test"
+
+    log_info "Testing resolution of config tree on asyncio event loop..."
+
+    local async_dir="$TEST_OUTPUT_DIR/async"
+    mkdir -p "$async_dir/ARM" "$async_dir/common"
+    cat > "$async_dir/config.json" << 'JSON'
+{
+  "ARCH": {"type": "enum", "default": 0, "enum": ["ARM", "MIPS"]},
+  "ARCH_CONFIG": {"type": "config", "path": "./$ARCH/config.json"},
+  "COMMON_CONFIG": {"type": "config", "path": "./common/config.json"}
+}
+JSON
+    cat > "$async_dir/ARM/config.json" << 'JSON'
+{"CORE": {"type": "enum", "default": 0, "enum": ["cortex-m3", "cortex-m4"]}}
+JSON
+    cat > "$async_dir/common/config.json" << 'JSON'
+{"HEAP_SIZE": {"type": "int", "default": 1024}}
+JSON
+    touch "$async_dir/common/autorecipe.mk"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import asyncio
+import os
+from jconfigpy import JConfig, Monitor, Resolver
+from jconfigpy.Loader import AsyncLoader
+
+async def load(loader):
+    config = JConfig(jconfig_file="$async_dir/config.json", loader=loader)
+    return await Resolver({'CORE': 'cortex-m4'}).resolve_async(config)
+
+loader = AsyncLoader(workers=4)
+asyncio.run(load(loader))
+loader.close()
+var_map = {}
+Monitor().get_update(var_map)
+if var_map != {'ARCH': 'ARM', 'CORE': 'cortex-m4', 'HEAP_SIZE': 1024}:
+    print("✗ Unexpected result {}".format(var_map))
+    exit(1)
+if os.path.exists("$async_dir/common/autorecipe.mk"):
+    print("✗ Stale autorecipe.mk is not removed")
+    exit(1)
+print("✓ Config tree resolved on event loop")
+exit(0)
+EOF
+        log_success "Async loader working correctly"
+        return 0
+    else
+        log_error "Async loader test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 16: Matrix Resolution Test
+##############################################################################
+
+test_matrix_resolution() {
+    log_section "Test 16: Matrix Resolution Test"
+
+    log_info "Testing resolution of variants in isolated monitor scopes..."
+
+    local matrix_dir="$TEST_OUTPUT_DIR/matrix"
+    mkdir -p "$matrix_dir"
+    cat > "$matrix_dir/config.json" << 'JSON'
+{
+  "USE_FPU": {"type": "bool", "default": "n"},
+  "FPU_TYPE": {"type": "int", "default": 1, "depend": {"USE_FPU": "y"}, "gen-list": {"FPU_REGS": "this * 16"}}
+}
+JSON
+    echo "CONFIG_USE_FPU=y" > "$matrix_dir/fpu.config"
+    echo "CONFIG_USE_FPU=n" > "$matrix_dir/nofpu.config"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+from jconfigpy import Monitor
+from jconfigpy.Matrix import MatrixResolver
+from jconfigpy.SavedConfig import SavedConfigReader
+
+matrix = MatrixResolver("$matrix_dir/config.json")
+for workers in (None, 2):
+    result = matrix.run(["$matrix_dir/fpu.config", "$matrix_dir/nofpu.config"], "$matrix_dir/out", workers)
+    if sorted(result) != ['fpu', 'nofpu']:
+        print("✗ Unexpected variants {}".format(result))
+        exit(1)
+    fpu = SavedConfigReader().read("$matrix_dir/out/fpu/.config")
+    nofpu = SavedConfigReader().read("$matrix_dir/out/nofpu/.config")
+    if fpu != {'USE_FPU': 'y', 'FPU_TYPE': '1'} or nofpu != {'USE_FPU': 'n'}:
+        print("✗ Variants are not isolated {} / {}".format(fpu, nofpu))
+        exit(1)
+with open("$matrix_dir/out/fpu/autogen.h") as fp:
+    if '#define FPU_REGS 16' not in fp.read():
+        print("✗ autogen.h of variant is not written")
+        exit(1)
+if Monitor().lookup_variable('USE_FPU') is not None:
+    print("✗ Variant leaked into process wide monitor")
+    exit(1)
+print("✓ Variants resolved in isolation")
+exit(0)
+EOF
+        log_success "Matrix resolution working correctly"
+        return 0
+    else
+        log_error "Matrix resolution test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 17: What-If Evaluation Test
+##############################################################################
+
+test_what_if() {
+    log_section "Test 17: What-If Evaluation Test"
+
+    log_info "Testing hypothetical assignment on resolved config tree..."
+
+    local whatif_dir="$TEST_OUTPUT_DIR/whatif"
+    mkdir -p "$whatif_dir/mmu"
+    cat > "$whatif_dir/config.json" << 'JSON'
+{
+  "USE_MMU": {"type": "bool", "default": "n"},
+  "PAGE_SIZE": {"type": "int", "default": 4096, "depend": {"USE_MMU": "y"}, "gen-list": {"PAGE_WORDS": "this // 4"}},
+  "MMU_CONFIG": {"type": "config", "path": "./mmu/config.json", "depend": {"USE_MMU": "y"}},
+  "CLOCK": {"type": "int", "default": 8}
+}
+JSON
+    cat > "$whatif_dir/mmu/config.json" << 'JSON'
+{"MMU_RECIPE": {"type": "recipe", "path": "./recipe.mk"}}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import io
+from jconfigpy import JConfig, Resolver, Monitor
+from jconfigpy.Writer import ConfigWriter
+
+def render(config):
+    ofp, agen = io.StringIO(), io.StringIO()
+    ConfigWriter(config).write(ofp, agen)
+    return ofp.getvalue(), agen.getvalue()
+
+config = JConfig(jconfig_file="$whatif_dir/config.json")
+resolver = Resolver()
+resolver.resolve(config)
+before = render(config)
+with resolver.what_if(config, {'USE_MMU': 'y'}):
+    ofp, agen = render(config)
+    if 'CONFIG_PAGE_SIZE=4096' not in ofp or 'mmu/recipe.mk' not in ofp or 'PAGE_WORDS 1024' not in agen:
+        print("✗ Hypothetical values are not applied")
+        exit(1)
+if render(config) != before:
+    print("✗ Resolved state is not restored")
+    exit(1)
+# variables reset by the round trip are written where they were
+with Monitor.scope():
+    config = JConfig(jconfig_file="$whatif_dir/config.json")
+resolver = Resolver({'USE_MMU': 'y'})
+resolver.resolve(config)
+before = render(config)
+with resolver.what_if(config, {'USE_MMU': 'n'}):
+    pass
+if render(config) != before:
+    print("✗ Output changes after round trip : {}".format(render(config)[0]))
+    exit(1)
+print("✓ What-if evaluated and reverted")
+exit(0)
+EOF
+        log_success "What-if evaluation working correctly"
+        return 0
+    else
+        log_error "What-if evaluation test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 18: CLI Fast Path Test
+##############################################################################
+
+test_cli_fast_path() {
+    log_section "Test 18: CLI Fast Path Test"
+
+    log_info "Testing lazy package import, query and skipped up to date run..."
+
+    local fast_dir="$TEST_OUTPUT_DIR/fast"
+    mkdir -p "$fast_dir"
+    cat > "$fast_dir/config.json" << 'JSON'
+{
+  "USE_FPU": {"type": "bool", "default": "y"},
+  "CLOCK_HZ": {"type": "int", "default": 1000}
+}
+JSON
+    printf 'CONFIG_USE_FPU=y\nCONFIG_CLOCK_HZ=100\n' > "$fast_dir/saved.config"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import subprocess
+import sys
+import jconfigpy
+
+if 'jconfigpy.Config' in sys.modules:
+    print("✗ Config is imported with the package")
+    exit(1)
+
+CODE = 'import sys; from jconfigpy.__main__ import main; main(["jconfigpy"] + sys.argv[1:]); print("jconfigpy.Item" in sys.modules)'
+
+def run(*args):
+    out = subprocess.run([sys.executable, '-c', CODE] + list(args), cwd="$fast_dir",
+                         stdout=subprocess.PIPE, check=True).stdout.decode('utf-8').splitlines()
+    return out[:-1], out[-1] == 'True'
+
+args = ['-s', '-i', 'saved.config', '-t', 'config.json', '-o', 'out.config', '-g', 'out.h', '-n', '-m', 'cache']
+if not run(*args)[1]:
+    print("✗ First run is skipped")
+    exit(1)
+out, loaded = run(*args)
+if loaded or 'out.config is up to date' not in out:
+    print("✗ Up to date run loads config tree")
+    exit(1)
+with open("$fast_dir/saved.config", 'a') as fp:
+    fp.write('CONFIG_CLOCK_HZ=250\n')
+if not run(*args)[1] or 'CONFIG_CLOCK_HZ=250' not in open("$fast_dir/out.config").read():
+    print("✗ Modified input is not resolved again")
+    exit(1)
+with open("$fast_dir/order.json", 'w') as fp:
+    fp.write('{"USE_FPU": 0, "CLOCK_HZ": 0}')
+args += ['-O', 'order.json']
+run(*args)
+if run(*args)[1]:
+    print("✗ Up to date run with order file loads config tree")
+    exit(1)
+with open("$fast_dir/order.json", 'w') as fp:
+    fp.write('{"USE_FPU": 0, "CLOCK_HZ": 1}')
+if not run(*args)[1]:
+    print("✗ Modified order file is not resolved again")
+    exit(1)
+out, loaded = run('query', '-i', 'out.config', 'CLOCK_HZ', 'MISSING')
+if loaded or out != ['CONFIG_CLOCK_HZ=250', '# CONFIG_MISSING is not set']:
+    print("✗ Unexpected query output : {}".format(out))
+    exit(1)
+print("✓ Fast path working")
+exit(0)
+EOF
+        log_success "CLI fast path working correctly"
+        return 0
+    else
+        log_error "CLI fast path test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 19: Benchmark Test
+##############################################################################
+
+test_benchmark() {
+    log_section "Test 19: Benchmark Test"
+
+    log_info "Testing synthetic tree generation and phase timing..."
+
+    local bench_dir="$TEST_OUTPUT_DIR/bench"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import json
+from jconfigpy.Benchmark import Benchmark, TreeGenerator
+
+generator = TreeGenerator(depth=2, fanout=2, items=8, depend=0.5, var_path=0.5, genlist=0.5, seed=7)
+config_file, values_file = generator.generate("$bench_dir")
+stats = generator.get_stats()
+if stats['configs'] != 7 or stats['items'] != 56:
+    print("✗ Unexpected tree : {}".format(stats))
+    exit(1)
+again = TreeGenerator(depth=2, fanout=2, items=8, depend=0.5, var_path=0.5, genlist=0.5, seed=7)
+again.generate("$bench_dir/again")
+if open(config_file).read() != open("$bench_dir/again/config.json").read():
+    print("✗ Tree is not reproducible")
+    exit(1)
+result = json.loads(json.dumps(Benchmark(config_file, values_file, generator.get_path_vars()).run(repeat=2)))
+if list(result['phases']) != list(Benchmark.PHASES):
+    print("✗ Missing phases : {}".format(list(result['phases'])))
+    exit(1)
+if any(len(result['phases'][phase]['runs']) != 2 for phase in Benchmark.PHASES):
+    print("✗ Unexpected number of runs")
+    exit(1)
+if set(Benchmark.compare(result, result).values()) != {1.0}:
+    print("✗ Unexpected comparison")
+    exit(1)
+print("✓ Benchmark working")
+exit(0)
+EOF
+        log_success "Benchmark working correctly"
+        return 0
+    else
+        log_error "Benchmark test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 20: Profiler Test
+##############################################################################
+
+test_profiler() {
+    log_section "Test 20: Profiler Test"
+
+    log_info "Testing phase timing, slowest files and notification fan-out..."
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+from jconfigpy import JConfig, Resolver, Monitor, RepoFetcher
+from jconfigpy.Profile import Profiler
+from jconfigpy.Writer import ConfigWriter
+import io
+
+original = JConfig.parse
+with Profiler() as profiler:
+    if JConfig.parse is original:
+        print("✗ Hooks are not installed")
+        exit(1)
+    with Monitor.scope():
+        # repos are only collected, not fetched
+        config = JConfig(jconfig_file="$EXAMPLE_DIR/config.json", fetcher=RepoFetcher())
+    Resolver().resolve(config)
+    ConfigWriter(config).write(io.StringIO(), io.StringIO())
+if JConfig.parse is not original:
+    print("✗ Hooks are not removed")
+    exit(1)
+phases = profiler.get_phases()
+if any(phase not in phases for phase in ('load', 'parse', 'notify', 'emit')) or phases['emit'][0] != 1:
+    print("✗ Unexpected phases : {}".format(phases))
+    exit(1)
+files = profiler.get_slowest_files(3)
+if len(files) != 3 or files[0][0] < files[-1][0] or phases['parse'][0] < 3:
+    print("✗ Unexpected slowest files : {}".format(files))
+    exit(1)
+if profiler.get_fanout(1)[0][0] < 1 or 'Slowest config files' not in profiler.report():
+    print("✗ Unexpected fan-out report")
+    exit(1)
+print("✓ Profiler working")
+exit(0)
+EOF
+        log_success "Profiler working correctly"
+        return 0
+    else
+        log_error "Profiler test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 21: Config Bundle Test
+##############################################################################
+
+test_config_bundle() {
+    log_section "Test 21: Config Bundle Test"
+
+    log_info "Testing compile of config tree into bundle and resolution from it..."
+
+    local bundle_dir="$TEST_OUTPUT_DIR/bundle"
+    mkdir -p "$bundle_dir"
+    cp -r "$EXAMPLE_DIR/." "$bundle_dir/"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import io
+import os
+import re
+from jconfigpy import JConfig, Resolver, Monitor, RepoFetcher
+from jconfigpy.Bundle import BundleCompiler, SchemaBundle
+from jconfigpy.Writer import ConfigWriter
+
+def resolve(loader=None):
+    with Monitor.scope():
+        # repos are only collected, not fetched
+        config = JConfig(jconfig_file="$bundle_dir/config.json", root_dir="$bundle_dir", loader=loader,
+                         fetcher=RepoFetcher())
+    Resolver({'ARCH': 'ARM', 'SOC_VENDOR': 'ST_Micro'}).resolve(config)
+    ofp, agen = io.StringIO(), io.StringIO()
+    ConfigWriter(config).write(ofp, agen)
+    # MUTEX_CLASS_KEY is random on each resolution
+    return [re.sub('MUTEX_CLASS_KEY[ =][0-9]+', '', output.getvalue()) for output in (ofp, agen)]
+
+expected = resolve()
+compiler = BundleCompiler("$bundle_dir/config.json").compile("$bundle_dir/config.json")
+compiler.write("$bundle_dir/config.jcb")
+if 'kernel/config.json' not in compiler.get_files():
+    print("✗ Static child is not compiled : {}".format(compiler.get_files()))
+    exit(1)
+if not any('\$ARCH' in reference[2] for reference in compiler.get_references()):
+    print("✗ \$VAR path is not kept as reference")
+    exit(1)
+# files of the bundle are never read again
+os.rename("$bundle_dir/kernel/config.json", "$bundle_dir/kernel/config.json.orig")
+bundle = SchemaBundle("$bundle_dir/config.jcb")
+if not bundle.is_trusted("$bundle_dir/kernel/config.json"):
+    print("✗ Unexpected bundle content")
+    exit(1)
+if resolve(bundle) != expected:
+    print("✗ Tree resolved from bundle differs")
+    exit(1)
+print("✓ Config bundle working")
+exit(0)
+EOF
+        log_success "Config bundle working correctly"
+        return 0
+    else
+        log_error "Config bundle test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 22: Static Analysis Test
+##############################################################################
+
+test_static_analysis() {
+    log_section "Test 22: Static Analysis Test"
+
+    log_info "Testing cycle, dangling, duplicate and dead path detection and order..."
+
+    local analysis_dir="$TEST_OUTPUT_DIR/analysis"
+    mkdir -p "$analysis_dir/boards/b1" "$analysis_dir/boards/b2" "$analysis_dir/common" "$analysis_dir/order"
+    cat > "$analysis_dir/config.json" << 'JSON'
+{
+  "LATE_USER": {"type": "int", "default": 5, "depend": {"FEATURE": "y"}},
+  "FEATURE": {"type": "bool", "default": "y"},
+  "CYCLE_A": {"type": "bool", "default": "y", "depend": {"CYCLE_B": "y"}},
+  "CYCLE_B": {"type": "bool", "default": "y", "depend": {"CYCLE_A": "y"}},
+  "GHOST_USER": {"type": "bool", "default": "y", "depend": {"GHOST": "y"}},
+  "BOARD": {"type": "string", "default": "b1"},
+  "BOARD_CONFIG": {"type": "config", "path": "./boards/$BOARD/config.json"},
+  "COMMON_CONFIG": {"type": "config", "path": "./common/config.json"},
+  "MISSING_CONFIG": {"type": "config", "path": "./missing/config.json"}
+}
+JSON
+    echo '{"CLOCK": {"type": "int", "default": 1}}' > "$analysis_dir/boards/b1/config.json"
+    echo '{"CLOCK": {"type": "int", "default": 2}}' > "$analysis_dir/boards/b2/config.json"
+    echo '{"FEATURE": {"type": "bool", "default": "n"}}' > "$analysis_dir/common/config.json"
+    cat > "$analysis_dir/order/config.json" << 'JSON'
+{
+  "LATE_USER": {"type": "int", "default": 5, "depend": {"FEATURE": "y"}},
+  "FEATURE": {"type": "bool", "default": "y"}
+}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+from jconfigpy import JConfig, Resolver, Monitor
+from jconfigpy.Analyzer import Analyzer
+
+analyzer = Analyzer("$analysis_dir/config.json").run()
+if not any('CYCLE_A' in cycle and 'CYCLE_B' in cycle for cycle in analyzer.get_cycles()):
+    print("✗ Cycle is not found : {}".format(analyzer.get_cycles()))
+    exit(1)
+if [dangling[1:] for dangling in analyzer.get_dangling()] != [('GHOST_USER', 'GHOST')]:
+    print("✗ Unexpected dangling : {}".format(analyzer.get_dangling()))
+    exit(1)
+if [name for name, _ in analyzer.get_duplicates()] != ['FEATURE']:
+    print("✗ Unexpected duplicates : {}".format(analyzer.get_duplicates()))
+    exit(1)
+if [dead[1] for dead in analyzer.get_dead_paths()] != ['MISSING_CONFIG'] or not analyzer.has_errors():
+    print("✗ Unexpected dead paths : {}".format(analyzer.get_dead_paths()))
+    exit(1)
+order = analyzer.get_order()
+if order.index('FEATURE') > order.index('LATE_USER') or 'CYCLE_A' in order:
+    print("✗ Unexpected order : {}".format(order))
+    exit(1)
+
+def resolve(order=None):
+    with Monitor.scope():
+        config = JConfig(jconfig_file="$analysis_dir/order/config.json")
+    Resolver(order=order).resolve(config)
+    return config.get_monitor().lookup_variable('LATE_USER')
+
+ranks = Analyzer("$analysis_dir/order/config.json").run().get_ranks()
+if resolve() is not None or resolve(ranks) != 5:
+    print("✗ Order is not used by resolver")
+    exit(1)
+print("✓ Static analysis working")
+exit(0)
+EOF
+        log_success "Static analysis working correctly"
+        return 0
+    else
+        log_error "Static analysis test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 23: Symbol Index Test
+##############################################################################
+
+test_symbol_index() {
+    log_section "Test 23: Symbol Index Test"
+
+    log_info "Testing lookup, prefix search, reverse dependency and query command..."
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import io
+import contextlib
+from jconfigpy import JConfig, Resolver, Monitor, RepoFetcher
+from jconfigpy.__main__ import main
+
+with Monitor.scope():
+    config = JConfig(jconfig_file="$EXAMPLE_DIR/config.json", fetcher=RepoFetcher())
+resolver = Resolver({'ARCH': 'ARM', 'SOC_VENDOR': 'ST_Micro', 'SUB_ARCH': 'cortex-m4'})
+resolver.resolve(config)
+symbols = config.get_symbols()
+info = symbols.describe('PAGE_SHIFT_SIZE')
+if not info['file'].endswith('kernel/config.json') or 'CONFIG_PAGE_SIZE' not in info['gen-list']:
+    print("✗ Unexpected symbol : {}".format(info))
+    exit(1)
+if symbols.find_output('CONFIG_PAGE_SIZE') is not symbols.get_item('PAGE_SHIFT_SIZE'):
+    print("✗ Gen-list output is not indexed")
+    exit(1)
+if 'MMU_CONFIG' not in [dependant.get_name() for dependant in symbols.get_dependants('USE_MMU')]:
+    print("✗ Unexpected dependants : {}".format(symbols.describe('USE_MMU')))
+    exit(1)
+names = symbols.search('PAGE')
+if names != sorted(names) or 'PAGE_SHIFT_SIZE' not in names or any(not n.startswith('PAGE') for n in names):
+    print("✗ Unexpected prefix search : {}".format(names))
+    exit(1)
+# index follows childs parsed again on update
+resolver.update(config, {'SUB_ARCH': 'cortex-m3'})
+if not symbols.get_file('FLOAT').endswith('cortex-m3/config.json') or len(symbols.lookup_all('FLOAT')) != 1:
+    print("✗ Index is not updated : {}".format(symbols.lookup_all('FLOAT')))
+    exit(1)
+if set(symbols.search('')) != set(item.get_name() for c in config.walk() for item in c.get_items()):
+    print("✗ Index differs from tree")
+    exit(1)
+config.reset()
+if len(symbols) != 0:
+    print("✗ Index is not emptied on reset")
+    exit(1)
+
+out = io.StringIO()
+with contextlib.redirect_stdout(out):
+    main(["jconfigpy", "query", "-i", "$TEST_OUTPUT_DIR/none.config", "-t", "$EXAMPLE_DIR/config.json",
+          "-p", "PAGE_SHIFT", "USE_MMU"])
+if 'dependants : MMU_CONFIG' not in out.getvalue() or 'gen-list   : CONFIG_PAGE_SIZE=' not in out.getvalue():
+    print("✗ Unexpected query output : {}".format(out.getvalue()))
+    exit(1)
+print("✓ Symbol index working")
+exit(0)
+EOF
+        log_success "Symbol index working correctly"
+        return 0
+    else
+        log_error "Symbol index test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 24: Repo Under Variable Path Test
+##############################################################################
+
+test_repo_var_path() {
+    log_section "Test 24: Repo Under Variable Path Test"
+
+    log_info "Testing fetch & install of repo in config under \$VAR directory..."
+
+    local var_dir="$TEST_OUTPUT_DIR/var_repo"
+    mkdir -p "$var_dir/work" "$var_dir/arch/ARM"
+    cat > "$var_dir/work/package.json" << 'JSON'
+{"name": "mod", "buildcmd": ["touch libmod.a"], "include": [], "output": ["libmod.a"]}
+JSON
+    git -C "$var_dir/work" init -q
+    git -C "$var_dir/work" add -A
+    git -C "$var_dir/work" -c user.name=test -c user.email=test@test commit -q -m init
+    git clone -q --bare "$var_dir/work" "$var_dir/mod.git"
+    cat > "$var_dir/config.json" << 'JSON'
+{
+  "ARCH": {"type": "enum", "default": 0, "enum": ["ARM", "MIPS"]},
+  "ARCH_CONFIG": {"type": "config", "path": "./arch/$ARCH/config.json"}
+}
+JSON
+    cat > "$var_dir/arch/ARM/config.json" << JSON
+{"LIB_MOD": {"type": "repo", "name": "mod", "url": "$var_dir/mod.git", "out": "./dep"}}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+from jconfigpy import JConfig, Resolver, Monitor, RepoFetcher
+
+fetcher = RepoFetcher()
+with Monitor.scope():
+    config = JConfig(jconfig_file="$var_dir/config.json", root_dir="$var_dir", fetcher=fetcher)
+Resolver({'ARCH': 'ARM'}).resolve(config)
+fetcher.run()
+if not os.path.exists("$var_dir/arch/ARM/dep/libmod.a"):
+    print("✗ output of repo is not copied")
+    exit(1)
+with open("$var_dir/arch/ARM/autorecipe.mk") as fp:
+    if 'SLIB-y+=libmod.a' not in fp.read():
+        print("✗ autorecipe.mk is not written")
+        exit(1)
+print("✓ Repo under \$VAR path fetched")
+exit(0)
+EOF
+        log_success "Repo under variable path working correctly"
+        return 0
+    else
+        log_error "Repo under variable path test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 25: Help Test
+##############################################################################
+
+test_help() {
+    log_section "Test 25: Help Test"
+
+    log_info "Testing help of command line..."
+
+    local help_out
+    if help_out=$($PYTHON3 -m jconfigpy -h 2>&1) && echo "$help_out" | grep -q "{.config,autogen.h}"; then
+        log_success "Help printed correctly"
+        return 0
+    else
+        log_error "Help test failed"
+        echo "$help_out" | tail -3
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 26: Daemon Bad Path Test
+##############################################################################
+
+test_daemon_bad_path() {
+    log_section "Test 26: Daemon Bad Path Test"
+
+    log_info "Testing error reply and rollback of request selecting a missing config..."
+
+    local bad_dir="$TEST_OUTPUT_DIR/daemon_bad"
+    mkdir -p "$bad_dir/arch/ARM"
+    cat > "$bad_dir/config.json" << 'JSON'
+{
+  "ARCH": {"type": "enum", "default": 0, "enum": ["ARM", "MIPS"]},
+  "ARCH_CONFIG": {"type": "config", "path": "./arch/$ARCH/config.json"}
+}
+JSON
+    echo '{"CLOCK": {"type": "int", "default": 8}}' > "$bad_dir/arch/ARM/config.json"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+import subprocess
+import sys
+import time
+import jconfigpy
+from jconfigpy.Client import ConfigClient
+
+sock = "$bad_dir/jconfig.sock"
+env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(jconfigpy.__file__)))
+server = subprocess.Popen([sys.executable, '-m', 'jconfigpy', 'serve', '-i', "$bad_dir/config.json", '-S', sock],
+                          env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+for _ in range(100):
+    if os.path.exists(sock):
+        break
+    time.sleep(0.05)
+try:
+    with ConfigClient(sock) as conn:
+        expected = conn.query()
+        try:
+            conn.resolve({'ARCH': 'MIPS'})
+            print("✗ Missing config is accepted")
+            exit(1)
+        except ValueError as err:
+            if 'FileNotExistError' not in str(err):
+                print("✗ Unexpected error {}".format(err))
+                exit(1)
+        if conn.query() != expected or expected.get('CLOCK') != 8:
+            print("✗ Request is not rolled back {}".format(conn.query()))
+            exit(1)
+        conn.request('shutdown')
+    server.wait(timeout=10)
+    if b'Traceback' in server.stderr.read():
+        print("✗ Server logged traceback")
+        exit(1)
+finally:
+    if server.poll() is None:
+        server.kill()
+print("✓ Bad path answered and rolled back")
+exit(0)
+EOF
+        log_success "Daemon bad path handled correctly"
+        return 0
+    else
+        log_error "Daemon bad path test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 27: Lazy Validation Test
+##############################################################################
+
+test_lazy_validation() {
+    log_section "Test 27: Lazy Validation Test"
+
+    log_info "Testing that lazy parse validates the spec before file is trusted..."
+
+    local lazy_dir="$TEST_OUTPUT_DIR/lazy_validation"
+    mkdir -p "$lazy_dir"
+    cat > "$lazy_dir/config.json" << 'JSON'
+{"ADDR": {"type": "hex", "default": "0x12", "range": ["10", "0x20"]}}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+from jconfigpy import JConfig, Monitor
+from jconfigpy.Cache import ParseCache
+
+# lazy run first (as -s -n -m), then eager run with the same cache
+for lazy in (True, False):
+    loader = ParseCache("$lazy_dir/cache")
+    try:
+        with Monitor.scope():
+            config = JConfig(jconfig_file="$lazy_dir/config.json", loader=loader, lazy=lazy)
+        config.parse()
+        print("✗ Invalid range is accepted (lazy={})".format(lazy))
+        exit(1)
+    except ValueError:
+        pass
+    if loader.is_trusted("$lazy_dir/config.json"):
+        print("✗ Invalid file is trusted (lazy={})".format(lazy))
+        exit(1)
+print("✓ Lazy parse validated")
+exit(0)
+EOF
+        log_success "Lazy validation working correctly"
+        return 0
+    else
+        log_error "Lazy validation test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 28: Symbol Headers Test
+##############################################################################
+
+test_symbol_headers() {
+    log_section "Test 28: Symbol Headers Test"
+
+    log_info "Testing per symbol headers of mixed case symbols across runs..."
+
+    local sym_dir="$TEST_OUTPUT_DIR/symbol_headers"
+    mkdir -p "$sym_dir"
+    cat > "$sym_dir/config.json" << 'JSON'
+{
+  "Foo_En": {"type": "bool", "default": "y"},
+  "CLOCK_HZ": {"type": "int", "default": 100, "gen-list": {"TICK_HZ": "this"}}
+}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+from jconfigpy import JConfig, Resolver, Monitor
+from jconfigpy.Writer import ConfigWriter
+
+def emit(values):
+    with Monitor.scope():
+        config = JConfig(jconfig_file="$sym_dir/config.json")
+    Resolver(values).resolve(config)
+    return ConfigWriter(config).emit_symbols("$sym_dir/include")
+
+def read(name):
+    with open(os.path.join("$sym_dir/include", name)) as fp:
+        return fp.read()
+
+if sorted(emit({})) != ['CLOCK_HZ', 'Foo_En']:
+    print("✗ Unexpected first run")
+    exit(1)
+os.utime("$sym_dir/include/Foo_En.h", ns=(0, 0))
+if emit({}) != [] or read('Foo_En.h') != '/* CONFIG_Foo_En=y */\n':
+    print("✗ Mixed case symbol is rewritten : {}".format(read('Foo_En.h')))
+    exit(1)
+if os.stat("$sym_dir/include/Foo_En.h").st_mtime_ns != 0:
+    print("✗ mtime of unchanged header is touched")
+    exit(1)
+if emit({'CLOCK_HZ': '250'}) != ['CLOCK_HZ'] or '#define TICK_HZ 250' not in read('CLOCK_HZ.h'):
+    print("✗ Changed symbol is not written")
+    exit(1)
+print("✓ Symbol headers written")
+exit(0)
+EOF
+        log_success "Symbol headers working correctly"
+        return 0
+    else
+        log_error "Symbol headers test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 29: Parallel Matrix Loader Test
+##############################################################################
+
+test_matrix_workers_loader() {
+    log_section "Test 29: Parallel Matrix Loader Test"
+
+    log_info "Testing parse cache and bundle used by matrix workers..."
+
+    local pmatrix_dir="$TEST_OUTPUT_DIR/matrix_workers"
+    mkdir -p "$pmatrix_dir/fpu"
+    cat > "$pmatrix_dir/config.json" << 'JSON'
+{
+  "USE_FPU": {"type": "bool", "default": "n"},
+  "FPU_CONFIG": {"type": "config", "path": "./fpu/config.json"}
+}
+JSON
+    echo '{"FPU_TYPE": {"type": "int", "default": 1, "depend": {"USE_FPU": "y"}}}' > "$pmatrix_dir/fpu/config.json"
+    echo "CONFIG_USE_FPU=y" > "$pmatrix_dir/fpu.config"
+    echo "CONFIG_USE_FPU=n" > "$pmatrix_dir/nofpu.config"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+from jconfigpy.__main__ import main
+from jconfigpy.Cache import ParseCache
+from jconfigpy.SavedConfig import SavedConfigReader
+
+os.chdir("$pmatrix_dir")
+main(["jconfigpy", "matrix", "-t", "config.json", "-o", "out", "-j", "2", "-m", "cache",
+      "fpu.config", "nofpu.config"])
+if not os.path.exists(ParseCache("cache").entry_file(os.path.abspath("config.json"))):
+    print("✗ Parse cache is not used by workers")
+    exit(1)
+main(["jconfigpy", "compile", "-t", "config.json", "-o", "config.jcb"])
+# workers can only resolve the child from the bundle
+os.rename("fpu/config.json", "fpu/config.json.orig")
+main(["jconfigpy", "matrix", "-t", "config.json", "-o", "bundled", "-j", "2", "-b", "config.jcb",
+      "fpu.config", "nofpu.config"])
+if SavedConfigReader().read("bundled/fpu/.config") != {'USE_FPU': 'y', 'FPU_TYPE': '1'}:
+    print("✗ Bundle is not used by workers")
+    exit(1)
+print("✓ Matrix workers use cache and bundle")
+exit(0)
+EOF
+        log_success "Parallel matrix loader working correctly"
+        return 0
+    else
+        log_error "Parallel matrix loader test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 30: Parse Cache Test
+##############################################################################
+
+test_parse_cache() {
+    log_section "Test 30: Parse Cache Test"
+
+    log_info "Testing parse cache hit, miss and invalidation on edit..."
+
+    local pcache_dir="$TEST_OUTPUT_DIR/parse_cache"
+    mkdir -p "$pcache_dir"
+    echo '{"CLOCK": {"type": "int", "default": 8}}' > "$pcache_dir/config.json"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+from jconfigpy import JConfig, Resolver, Monitor
+from jconfigpy.Cache import ParseCache
+
+def resolve():
+    loader = ParseCache("$pcache_dir/cache")
+    with Monitor.scope():
+        config = JConfig(jconfig_file="$pcache_dir/config.json", loader=loader)
+    Resolver().resolve(config)
+    return loader, config.get_monitor().lookup_variable('CLOCK')
+
+loader, clock = resolve()
+if (loader.hits, loader.misses, clock) != (0, 1, 8):
+    print("✗ First run is not a miss : {} {} {}".format(loader.hits, loader.misses, clock))
+    exit(1)
+loader, clock = resolve()
+if (loader.hits, loader.misses) != (1, 0) or not loader.is_trusted("$pcache_dir/config.json"):
+    print("✗ Second run is not a hit")
+    exit(1)
+# touched but unchanged file is still a hit
+os.utime("$pcache_dir/config.json", ns=(0, 0))
+if resolve()[0].hits != 1:
+    print("✗ Touched file is not a hit")
+    exit(1)
+with open("$pcache_dir/config.json", 'w') as fp:
+    fp.write('{"CLOCK": {"type": "int", "default": 16}}')
+loader, clock = resolve()
+if (loader.hits, loader.misses, clock) != (0, 1, 16):
+    print("✗ Edited file is not invalidated : {} {} {}".format(loader.hits, loader.misses, clock))
+    exit(1)
+print("✓ Parse cache hit, miss and invalidation")
+exit(0)
+EOF
+        log_success "Parse cache working correctly"
+        return 0
+    else
+        log_error "Parse cache test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 31: Compiled Gen-list Test
+##############################################################################
+
+test_compiled_genlist() {
+    log_section "Test 31: Compiled Gen-list Test"
+
+    log_info "Testing gen-list compiled at load and cached until value changes..."
+
+    local genlist_dir="$TEST_OUTPUT_DIR/compiled_genlist"
+    mkdir -p "$genlist_dir"
+    cat > "$genlist_dir/config.json" << 'JSON'
+{
+  "SCALE": {"type": "int", "default": 2},
+  "CLOCK": {"type": "int", "default": 8, "depend": {"SCALE": 2}, "gen-list": {"TICKS": "this * 2"}}
+}
+JSON
+    echo '{"BROKEN": {"type": "int", "default": 1, "gen-list": {"X": "this *"}}}' > "$genlist_dir/broken.json"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+from jconfigpy import JConfig, Resolver, Monitor
+
+with Monitor.scope():
+    config = JConfig(jconfig_file="$genlist_dir/config.json")
+Resolver().resolve(config)
+item = [item for item in config.get_items() if item.get_name() == 'CLOCK'][0]
+gen = item.get_resolved_genlist()
+if gen != {'TICKS': 16} or item.get_resolved_genlist() is not gen:
+    print("✗ Gen-list is not cached : {}".format(gen))
+    exit(1)
+item.set_user_value(10)
+if item.get_resolved_genlist() != {'TICKS': 20}:
+    print("✗ Gen-list is not evaluated again after value change")
+    exit(1)
+with Monitor.scope():
+    broken = JConfig(jconfig_file="$genlist_dir/broken.json")
+try:
+    broken.parse()
+    print("✗ Invalid expression is not reported at load")
+    exit(1)
+except ValueError:
+    pass
+print("✓ Compiled gen-list working")
+exit(0)
+EOF
+        log_success "Compiled gen-list working correctly"
+        return 0
+    else
+        log_error "Compiled gen-list test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 32: Dependency Counter Test
+##############################################################################
+
+test_dependency_counter() {
+    log_section "Test 32: Dependency Counter Test"
+
+    log_info "Testing counter based depend while toggling variables back and forth..."
+
+    if $PYTHON3 << 'EOF' 2>/dev/null; then
+import itertools
+from jconfigpy import Monitor
+
+class Subscriber:
+    def __init__(self, name='SUB', notified=None):
+        self.name = name
+        self.updates = []
+        self.notified = notified
+
+    def get_name(self):
+        return self.name
+
+    def on_update_vars(self, updates):
+        self.updates.append(dict(updates))
+        if self.notified is not None:
+            self.notified.append(self.name)
+
+depend = {'USE_A': 'y', 'USE_B': 'n', 'LEVEL': 2}
+with Monitor.scope():
+    monitor = Monitor()
+sub = Subscriber()
+if monitor.subscribe_depend(sub, depend) or monitor.is_satisfied(sub):
+    print("✗ Depend is satisfied without variables")
+    exit(1)
+values = {'USE_A': ['y', 'n'], 'USE_B': ['y', 'n'], 'LEVEL': [1, 2]}
+# every variable is toggled back and forth through all combinations, twice
+for _ in range(2):
+    for combo in itertools.product(*values.values()):
+        for var, val in zip(values, combo):
+            monitor.notify_variable_change(var, val)
+            if monitor.is_satisfied(sub) != monitor.check_depend(**depend):
+                print("✗ Counter differs from depend after {}={}".format(var, val))
+                exit(1)
+monitor.unset_variable('LEVEL')
+monitor.notify_variables({'USE_A': 'y', 'USE_B': 'n'})
+if monitor.is_satisfied(sub):
+    print("✗ Unset variable still counts")
+    exit(1)
+monitor.notify_variable_change('LEVEL', 2)
+if not monitor.is_satisfied(sub):
+    print("✗ Depend is not satisfied")
+    exit(1)
+monitor.unsubscribe_depend(sub)
+count = len(sub.updates)
+monitor.notify_variable_change('USE_A', 'n')
+if len(sub.updates) != count or not monitor.is_satisfied(sub):
+    print("✗ Unsubscribed item is still notified")
+    exit(1)
+
+# a batch notifies each subscriber once, a subscriber after the one setting its variable
+notified = []
+with Monitor.scope():
+    monitor = Monitor()
+leaf = Subscriber('LEAF', notified)
+monitor.subscribe_depend(leaf, {'LEVEL': 2, 'USE_A': 'y'})
+level = Subscriber('LEVEL', notified)
+monitor.subscribe_depend(level, {'USE_A': 'y'})
+with monitor.batch():
+    monitor.notify_variables({'USE_A': 'y', 'LEVEL': 2})
+    monitor.notify_variable_change('USE_B', 'n')
+if notified != ['LEVEL', 'LEAF'] or leaf.updates != [{'USE_A': 'y', 'LEVEL': 2}]:
+    print("✗ Unexpected notification {} {}".format(notified, leaf.updates))
+    exit(1)
+print("✓ Dependency counters consistent")
+exit(0)
+EOF
+        log_success "Dependency counter working correctly"
+        return 0
+    else
+        log_error "Dependency counter test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 33: Batch Rollback Test
+##############################################################################
+
+test_batch_rollback() {
+    log_section "Test 33: Batch Rollback Test"
+
+    log_info "Testing rollback of values and visibility after error within batch..."
+
+    local batch_dir="$TEST_OUTPUT_DIR/batch"
+    mkdir -p "$batch_dir"
+    cat > "$batch_dir/config.json" << 'JSON'
+{
+  "USE_FPU": {"type": "bool", "default": "n"},
+  "FPU_TYPE": {"type": "int", "default": 1, "depend": {"USE_FPU": "y"}},
+  "CLOCK": {"type": "int", "default": 8, "range": [1, 100]}
+}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+from jconfigpy import JConfig, Resolver, Monitor
+
+with Monitor.scope():
+    config = JConfig(jconfig_file="$batch_dir/config.json")
+Resolver().resolve(config)
+monitor = config.get_monitor()
+items = {item.get_name(): item for item in config.get_items()}
+before = {}
+monitor.get_update(before)
+try:
+    with monitor.batch():
+        items['USE_FPU'].set_user_value('y')
+        items['CLOCK'].set_user_value(50)
+        if not items['FPU_TYPE'].is_visible():
+            print("✗ Visibility is not updated within batch")
+            exit(1)
+        items['CLOCK'].set_user_value(1000)
+    print("✗ Out of range value is accepted")
+    exit(1)
+except ValueError:
+    pass
+after = {}
+monitor.get_update(after)
+if after != before or items['USE_FPU'].get_user_value() != 'n' or items['CLOCK'].get_user_value() != 8:
+    print("✗ Values are not rolled back : {}".format(after))
+    exit(1)
+if items['FPU_TYPE'].is_visible() or monitor.in_batch():
+    print("✗ Visibility is not rolled back")
+    exit(1)
+print("✓ Batch rolled back")
+exit(0)
+EOF
+        log_success "Batch rollback working correctly"
+        return 0
+    else
+        log_error "Batch rollback test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 34: Single Pass Writer Test
+##############################################################################
+
+test_single_pass_writer() {
+    log_section "Test 34: Single Pass Writer Test"
+
+    log_info "Testing .config and autogen.h written in one pass match per-part output..."
+
+    local writer_dir="$TEST_OUTPUT_DIR/writer"
+    mkdir -p "$writer_dir/fpu" "$writer_dir/mmu"
+    cat > "$writer_dir/config.json" << 'JSON'
+{
+  "USE_FPU": {"type": "bool", "default": "y", "gen-list": {"HAS_FPU": "to_string(this)"}},
+  "USE_MMU": {"type": "bool", "default": "n"},
+  "FPU_CONFIG": {"type": "config", "path": "./fpu/config.json", "depend": {"USE_FPU": "y"}},
+  "MMU_CONFIG": {"type": "config", "path": "./mmu/config.json", "depend": {"USE_MMU": "y"}},
+  "MAKE": {"type": "recipe", "path": "./Makefile"}
+}
+JSON
+    cat > "$writer_dir/fpu/config.json" << 'JSON'
+{
+  "FPU_REGS": {"type": "int", "default": 16, "gen-list": {"FPU_REGS": "this", "FPU_BYTES": "this * 8"}},
+  "FPU_MAKE": {"type": "recipe", "path": "./fpu.mk"}
+}
+JSON
+    echo '{"PAGE": {"type": "hex", "default": "0x1000", "gen-list": {"PAGE_SIZE": "this"}}}' > "$writer_dir/mmu/config.json"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import io
+import os
+from jconfigpy import JConfig, Resolver, Monitor
+from jconfigpy.Writer import ConfigWriter
+
+with Monitor.scope():
+    config = JConfig(jconfig_file="$writer_dir/config.json")
+Resolver().resolve(config)
+
+# output as composed part by part before the single pass writer
+ofp, agen = io.StringIO(), io.StringIO()
+config.get_monitor().write(ofp)
+config.write_recipe(ofp)
+ofp.write('\nDEF+=')
+config.write_genlist(ofp, ' {0}={1}')
+ofp.write('\n')
+agen.write('#ifndef ___AUTO_GEN_H\n#define ___AUTO_GEN_H\n')
+config.write_genlist(agen)
+agen.write('#endif\n')
+
+written = ConfigWriter(config).emit("$writer_dir/.config", "$writer_dir/autogen.h")
+with open("$writer_dir/.config") as fp:
+    result = fp.read()
+with open("$writer_dir/autogen.h") as fp:
+    header = fp.read()
+if result != ofp.getvalue() or header != agen.getvalue():
+    print("✗ Output differs :\n{}\n{}".format(result, header))
+    exit(1)
+if 'fpu.mk' not in result or '#define FPU_BYTES 128' not in header or 'PAGE_SIZE' in header:
+    print("✗ Unexpected output :\n{}\n{}".format(result, header))
+    exit(1)
+if len(written) != 2 or sorted(os.listdir("$writer_dir")) != ['.config', 'autogen.h', 'config.json', 'fpu', 'mmu']:
+    print("✗ Temporary files are left : {}".format(os.listdir("$writer_dir")))
+    exit(1)
+print("✓ Single pass output matches")
+exit(0)
+EOF
+        log_success "Single pass writer working correctly"
+        return 0
+    else
+        log_error "Single pass writer test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 35: Keep Unchanged Test
+##############################################################################
+
+test_keep_unchanged() {
+    log_section "Test 35: Keep Unchanged Test"
+
+    log_info "Testing unchanged outputs keep their mtime and changed keys are reported..."
+
+    local keep_dir="$TEST_OUTPUT_DIR/keep"
+    mkdir -p "$keep_dir"
+    cat > "$keep_dir/config.json" << 'JSON'
+{
+  "USE_FPU": {"type": "bool", "default": "y", "gen-list": {"HAS_FPU": "to_string(this)"}},
+  "CLOCK": {"type": "int", "default": 8}
+}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+from jconfigpy import JConfig, Resolver, Monitor
+from jconfigpy.Writer import AtomicFile, ConfigWriter
+
+def emit(values):
+    with Monitor.scope():
+        config = JConfig(jconfig_file="$keep_dir/config.json")
+    Resolver(values).resolve(config)
+    writer = ConfigWriter(config)
+    written = writer.emit("$keep_dir/.config", "$keep_dir/autogen.h", keep_unchanged=True)
+    return written, writer.get_changed_keys()
+
+emit({})
+for name in ('.config', 'autogen.h'):
+    os.utime(os.path.join("$keep_dir", name), ns=(0, 0))
+if emit({}) != ([], []):
+    print("✗ Unchanged outputs are written")
+    exit(1)
+if any(os.stat(os.path.join("$keep_dir", name)).st_mtime_ns != 0 for name in ('.config', 'autogen.h')):
+    print("✗ mtime of unchanged output is touched")
+    exit(1)
+written, changed = emit({'CLOCK': '16'})
+if written != ["$keep_dir/.config"] or changed != ['CLOCK']:
+    print("✗ Unexpected change : {} {}".format(written, changed))
+    exit(1)
+if os.stat("$keep_dir/autogen.h").st_mtime_ns != 0:
+    print("✗ Unchanged header is touched")
+    exit(1)
+# a failing write leaves the target as it is
+try:
+    with AtomicFile("$keep_dir/autogen.h") as fp:
+        fp.write('partial')
+        raise ValueError('failed')
+except ValueError:
+    pass
+with open("$keep_dir/autogen.h") as fp:
+    if 'partial' in fp.read() or len(os.listdir("$keep_dir")) != 3:
+        print("✗ Failed write is not discarded")
+        exit(1)
+print("✓ Unchanged outputs kept")
+exit(0)
+EOF
+        log_success "Keep unchanged working correctly"
+        return 0
+    else
+        log_error "Keep unchanged test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 36: Slotted Item Test
+##############################################################################
+
+test_slotted_item() {
+    log_section "Test 36: Slotted Item Test"
+
+    log_info "Testing slotted items, gen-list allow-list and bounded gen-list cache..."
+
+    local slot_dir="$TEST_OUTPUT_DIR/slotted"
+    mkdir -p "$slot_dir"
+    cat > "$slot_dir/config.json" << 'JSON'
+{
+  "CLOCK": {"type": "int", "default": 8, "prompt": "Clock", "help": ["clock in MHz"], "range": [1, 100],
+            "gen-list": {"TICKS": "this * 2"}}
+}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import json
+from jconfigpy import JConfig, Monitor
+from jconfigpy.Item import JConfigItem
+
+with Monitor.scope():
+    config = JConfig(jconfig_file="$slot_dir/config.json")
+config.parse()
+item = config.get_items()[0]
+if hasattr(item, '__dict__') or sorted(item._spec) != ['help', 'prompt']:
+    print("✗ Eager item keeps more than needed : {}".format(item._spec))
+    exit(1)
+if item.get_prompt() != 'Clock' or item.get_help() != ['clock in MHz']:
+    print("✗ Prompt / help are lost")
+    exit(1)
+
+for expr in ("__import__('os').system('true')", "open('/etc/passwd')", "this.__class__", "this *"):
+    with open("$slot_dir/bad.json", 'w') as fp:
+        json.dump({'BAD': {'type': 'int', 'default': 1, 'gen-list': {'X': expr}}}, fp)
+    with Monitor.scope():
+        bad = JConfig(jconfig_file="$slot_dir/bad.json")
+    try:
+        bad.parse()
+        print("✗ Disallowed expression is accepted : {}".format(expr))
+        exit(1)
+    except ValueError:
+        pass
+# compiled without validation (trusted file) is validated when asked
+JConfigItem.compile_genlist('TRUSTED', {'X': "open('f')"}, validate=False)
+try:
+    JConfigItem.compile_genlist('TRUSTED', {'X': "open('f')"})
+    print("✗ Cached gen-list skips validation")
+    exit(1)
+except ValueError:
+    pass
+
+JConfigItem._GENLIST_CACHE_SIZE = 4
+for idx in range(10):
+    JConfigItem.compile_genlist('ITEM{}'.format(idx), {'X': 'this + {}'.format(idx)})
+if len(JConfigItem._GENLIST_CACHE) > 4:
+    print("✗ Gen-list cache is not bounded : {}".format(len(JConfigItem._GENLIST_CACHE)))
+    exit(1)
+print("✓ Slotted items and gen-list checks working")
+exit(0)
+EOF
+        log_success "Slotted item working correctly"
+        return 0
+    else
+        log_error "Slotted item test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 37: Lazy Mode Output Test
+##############################################################################
+
+test_lazy_output() {
+    log_section "Test 37: Lazy Mode Output Test"
+
+    log_info "Testing lazy mode writes the same outputs as eager mode..."
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import io
+import re
+from jconfigpy import JConfig, Resolver, Monitor, RepoFetcher
+from jconfigpy.Writer import ConfigWriter
+
+def resolve(lazy, values):
+    with Monitor.scope():
+        # repos are only collected, not fetched
+        config = JConfig(jconfig_file="$EXAMPLE_DIR/config.json", lazy=lazy, fetcher=RepoFetcher())
+    Resolver(values).resolve(config)
+    ofp, agen = io.StringIO(), io.StringIO()
+    ConfigWriter(config, bool_macros=True).write(ofp, agen)
+    prompts = [(item.get_prompt(), item.get_help()) for c in config.walk() for item in c.get_items()]
+    # MUTEX_CLASS_KEY is random
+    return re.sub('MUTEX_CLASS_KEY[ =][0-9]+', '', ofp.getvalue()), \
+        re.sub('MUTEX_CLASS_KEY[ =][0-9]+', '', agen.getvalue()), prompts
+
+for values in ({}, {'ARCH': 'ARM', 'SOC_VENDOR': 'ST_Micro', 'USE_MMU': 'y', 'SUB_ARCH': 'cortex-m3'}):
+    if resolve(True, values) != resolve(False, values):
+        print("✗ Lazy output differs for {}".format(values))
+        exit(1)
+print("✓ Lazy mode output matches eager mode")
+exit(0)
+EOF
+        log_success "Lazy mode output working correctly"
+        return 0
+    else
+        log_error "Lazy mode output test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 38: Option Parsing Test
+##############################################################################
+
+test_option_parsing() {
+    log_section "Test 38: Option Parsing Test"
+
+    log_info "Testing file names containing option letters are not taken as options..."
+
+    local opt_dir="$TEST_OUTPUT_DIR/options"
+    mkdir -p "$opt_dir"
+    echo '{"CLOCK": {"type": "int", "default": 8}}' > "$opt_dir/config-b.json"
+    echo 'CONFIG_CLOCK=16' > "$opt_dir/saved-m-j.config"
+
+    local mode_dir="$TEST_OUTPUT_DIR/options-mode"
+    mkdir -p "$mode_dir"
+    cp "$opt_dir/config-b.json" "$mode_dir/config-t-c.json"
+    cp "$opt_dir/saved-m-j.config" "$mode_dir/saved-h-o.config"
+
+    if (cd "$opt_dir" && $PYTHON3 -m jconfigpy -s -i saved-m-j.config -t config-b.json -o out-d-k.config \
+            -g out-O.h -n > /dev/null 2>&1) && grep -q "CONFIG_CLOCK=16" "$opt_dir/out-d-k.config" && \
+            [ -f "$opt_dir/out-O.h" ] && [ "$(ls -A "$opt_dir" | wc -l)" -eq 4 ] && \
+            (cd "$mode_dir" && $PYTHON3 -m jconfigpy -i saved-h-o.config -t config-t-c.json -o out-s-i.config \
+            -g out-g.h -s -n > /dev/null 2>&1) && grep -q "CONFIG_CLOCK=16" "$mode_dir/out-s-i.config" && \
+            [ -f "$mode_dir/out-g.h" ] && [ "$(ls -A "$mode_dir" | wc -l)" -eq 4 ]; then
+        log_success "Options parsed correctly"
+        return 0
+    else
+        log_error "Option parsing test failed"
+        ls -A "$opt_dir" "$mode_dir"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 39: Daemon Socket Ownership Test
+##############################################################################
+
+test_daemon_socket_owner() {
+    log_section "Test 39: Daemon Socket Ownership Test"
+
+    log_info "Testing second server refuses running socket and takes over stale one..."
+
+    local owner_dir="$TEST_OUTPUT_DIR/daemon_owner"
+    mkdir -p "$owner_dir"
+    echo '{"CLOCK": {"type": "int", "default": 8}}' > "$owner_dir/config.json"
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+import subprocess
+import sys
+import time
+import jconfigpy
+from jconfigpy.Client import ConfigClient
+
+sock = "$owner_dir/jconfig.sock"
+env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(jconfigpy.__file__)))
+command = [sys.executable, '-m', 'jconfigpy', 'serve', '-i', "$owner_dir/config.json", '-S', sock]
+
+def start():
+    server = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    for _ in range(100):
+        if server.poll() is not None:
+            break
+        try:
+            with ConfigClient(sock) as conn:
+                conn.request('ping')
+            break
+        except OSError:
+            time.sleep(0.05)
+    return server
+
+servers = []
+try:
+    first = start()
+    servers.append(first)
+    second = subprocess.run(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30)
+    if second.returncode == 0 or b'another server is running' not in second.stderr:
+        print("✗ Second server is started : {}".format(second.stderr))
+        exit(1)
+    with ConfigClient(sock) as conn:
+        if conn.query(['CLOCK']) != {'CLOCK': 8}:
+            print("✗ First server lost its socket")
+            exit(1)
+    # killed server leaves its socket behind
+    first.kill()
+    first.wait(timeout=10)
+    if not os.path.exists(sock):
+        print("✗ Socket is not left by killed server")
+        exit(1)
+    third = start()
+    servers.append(third)
+    with ConfigClient(sock) as conn:
+        if conn.query(['CLOCK']) != {'CLOCK': 8}:
+            print("✗ Stale socket is not taken over")
+            exit(1)
+finally:
+    for server in servers:
+        if server.poll() is None:
+            server.kill()
+print("✓ Socket ownership respected")
+exit(0)
+EOF
+        log_success "Daemon socket ownership working correctly"
+        return 0
+    else
+        log_error "Daemon socket ownership test failed"
+        return 1
+    fi
+}
+
+##############################################################################
+# Test 40: Repo Fetcher Errors Test
+##############################################################################
+
+test_repo_fetcher_errors() {
+    log_section "Test 40: Repo Fetcher Errors Test"
+
+    log_info "Testing failed, missing and timed out repos are reported per repo..."
+
+    local err_dir="$TEST_OUTPUT_DIR/fetcher_errors"
+    local lib
+    for lib in good broken slow; do
+        mkdir -p "$err_dir/work/$lib" "$err_dir/$lib"
+        cat > "$err_dir/$lib/config.json" << JSON
+{"LIB_${lib^^}": {"type": "repo", "name": "$lib", "url": "$err_dir/$lib.git", "out": "./dep"}}
+JSON
+    done
+    echo '{"name": "good", "buildcmd": ["touch libgood.a"], "include": [], "output": ["libgood.a"]}' \
+        > "$err_dir/work/good/package.json"
+    echo '{"name": "broken", "buildcmd": ["echo missing-header.h >&2; false"], "include": [], "output": []}' \
+        > "$err_dir/work/broken/package.json"
+    echo '{"name": "slow", "buildcmd": ["echo compiling; sleep 5"], "include": [], "output": []}' \
+        > "$err_dir/work/slow/package.json"
+    for lib in good broken slow; do
+        git -C "$err_dir/work/$lib" init -q
+        git -C "$err_dir/work/$lib" add -A
+        git -C "$err_dir/work/$lib" -c user.name=test -c user.email=test@test commit -q -m init
+        git clone -q --bare "$err_dir/work/$lib" "$err_dir/$lib.git"
+    done
+    mkdir -p "$err_dir/missing"
+    cat > "$err_dir/missing/config.json" << JSON
+{"LIB_MISSING": {"type": "repo", "name": "missing", "url": "$err_dir/missing.git", "out": "./dep"}}
+JSON
+    cat > "$err_dir/config.json" << 'JSON'
+{
+  "BROKEN": {"type": "config", "path": "./broken/config.json"},
+  "MISSING": {"type": "config", "path": "./missing/config.json"},
+  "SLOW": {"type": "config", "path": "./slow/config.json"},
+  "GOOD": {"type": "config", "path": "./good/config.json"}
+}
+JSON
+
+    if $PYTHON3 << EOF 2>/dev/null; then
+import os
+from jconfigpy import JConfig, Resolver, Monitor, RepoFetcher
+
+fetcher = RepoFetcher(workers=2, timeout=1)
+with Monitor.scope():
+    config = JConfig(jconfig_file="$err_dir/config.json", root_dir="$err_dir", fetcher=fetcher)
+Resolver().resolve(config)
+try:
+    fetcher.run()
+    print("✗ Failed repos are not reported")
+    exit(1)
+except OSError as err:
+    message = str(err)
+errors = dict(fetcher.get_errors())
+if list(errors) != ['broken', 'missing', 'slow'] or [t[0] for t in fetcher.get_timings()] != ['good']:
+    print("✗ Unexpected errors {} / timings {}".format(list(errors), fetcher.get_timings()))
+    exit(1)
+if 'missing-header.h' not in errors['broken'] or 'timed out' not in errors['slow'] or \
+        'compiling' not in errors['slow'] or not all('Repo {}'.format(name) in message for name in errors):
+    print("✗ Output of failed command is lost : {}".format(message))
+    exit(1)
+if not os.path.exists("$err_dir/good/dep/libgood.a"):
+    print("✗ Repo is not built after others failed")
+    exit(1)
+print("✓ Repo errors reported per repo")
+exit(0)
+EOF
+        log_success "Repo fetcher errors working correctly"
+        return 0
+    else
+        log_error "Repo fetcher errors test failed"
+        return 1
+    fi
+}
+
 ##############################################################################
 # Cleanup
 ##############################################################################
@@ -311,6 +2259,39 @@ main() {
         test_file_io
         test_config_generation
         test_direct_script_execution
+        test_parallel_loader
+        test_headless_resolver
+        test_saved_config_reader
+        test_repo_fetcher
+        test_repo_build_cache
+        test_incremental_update
+        test_resolver_daemon
+        test_async_loader
+        test_matrix_resolution
+        test_what_if
+        test_cli_fast_path
+        test_benchmark
+        test_profiler
+        test_config_bundle
+        test_static_analysis
+        test_symbol_index
+        test_repo_var_path
+        test_help
+        test_daemon_bad_path
+        test_lazy_validation
+        test_symbol_headers
+        test_matrix_workers_loader
+        test_parse_cache
+        test_compiled_genlist
+        test_dependency_counter
+        test_batch_rollback
+        test_single_pass_writer
+        test_keep_unchanged
+        test_slotted_item
+        test_lazy_output
+        test_option_parsing
+        test_daemon_socket_owner
+        test_repo_fetcher_errors
     )
     
     for test in "${tests[@]}"; do
@@ -370,6 +2351,39 @@ TESTS:
     5. Syntax Validation       - Verify Python 3 syntax compliance
     6. Direct Execution Test   - Verify direct module usage
     7. File I/O Operations     - Verify file operations work
+    8. Parallel Loader         - Verify parallel prefetch of config files
+    9. Headless Resolver       - Verify resolution without prompt
+    10. Saved Config Reader    - Verify parsing of saved .config
+    11. Repo Fetcher           - Verify parallel fetch & build of repos
+    12. Repo Build Cache       - Verify restore of unchanged repo builds
+    13. Incremental Update     - Verify re-resolution of affected subtree
+    14. Resolver Daemon        - Verify requests to resolver over unix socket
+    15. Async Loader           - Verify resolution on asyncio event loop
+    16. Matrix Resolution      - Verify isolated resolution of variants
+    17. What-If Evaluation     - Verify hypothetical assignment and revert
+    18. CLI Fast Path          - Verify lazy import, query and skipped up to date run
+    19. Benchmark              - Verify synthetic tree generation and phase timing
+    20. Profiler               - Verify phase timing hooks, slowest files and fan-out
+    21. Config Bundle          - Verify compiled bundle resolves the same tree
+    22. Static Analysis        - Verify cycles, dangling depends, duplicates and order
+    23. Symbol Index           - Verify lookup, prefix search, dependants and query
+    24. Repo Under $VAR Path    - Verify fetch & install of repo in config under $VAR directory
+    25. Help                   - Verify help of command line is printed
+    26. Daemon Bad Path        - Verify error reply and rollback of request to missing config
+    27. Lazy Validation        - Verify lazy parse validates spec before file is trusted
+    28. Symbol Headers         - Verify per symbol headers of mixed case symbols across runs
+    29. Parallel Matrix Loader - Verify parse cache and bundle are used by matrix workers
+    30. Parse Cache            - Verify parse cache hit, miss and invalidation on edit
+    31. Compiled Gen-list      - Verify gen-list compiled at load and cached until value changes
+    32. Dependency Counter     - Verify counter based depend while toggling variables
+    33. Batch Rollback         - Verify values and visibility rolled back after error in batch
+    34. Single Pass Writer     - Verify .config and autogen.h of one pass match per-part output
+    35. Keep Unchanged         - Verify unchanged outputs keep mtime and changed keys
+    36. Slotted Item           - Verify slotted items, gen-list allow-list and bounded cache
+    37. Lazy Mode Output       - Verify lazy mode writes the same outputs as eager mode
+    38. Option Parsing         - Verify file names containing option letters are not options
+    39. Daemon Socket Owner    - Verify second server refuses running socket, takes over stale
+    40. Repo Fetcher Errors    - Verify failed, missing and timed out repos are reported per repo
 
 ENVIRONMENT:
     PYTHONPATH     Will be set to development directory automatically